@@ -3,12 +3,15 @@ from django.contrib import admin
 from .models import (
     Answer,
     Choice,
+    Job,
     Profile,
     Question,
     Response,
     Section,
     Survey,
+    bump_survey_structures,
 )
+from .services import queue_regrade
 
 
 class ChoiceInline(admin.TabularInline):
@@ -30,6 +33,32 @@ class QuestionAdmin(admin.ModelAdmin):
     list_filter = ('question_type', 'required')
     inlines = [ChoiceInline]
 
+    def save_related(self, request, form, formsets, change):
+        super().save_related(request, form, formsets, change)
+        # A new answer key changes how the stored answers should be graded
+        key_changed = 'question_type' in form.changed_data or any(
+            any('is_correct' in fields for _choice, fields in formset.changed_objects)
+            or any(choice.is_correct for choice in formset.deleted_objects)
+            for formset in formsets
+        )
+        if change and key_changed:
+            queue_regrade([form.instance.pk])
+
+    # Answers to a deleted mcq question no longer count towards scores
+    def delete_model(self, request, obj):
+        question_id = obj.pk
+        super().delete_model(request, obj)
+        if obj.question_type == 'mcq':
+            queue_regrade([question_id], survey_ids=[obj.survey_id])
+
+    def delete_queryset(self, request, queryset):
+        graded = list(queryset.filter(question_type='mcq').values_list('id', 'survey_id'))
+        super().delete_queryset(request, queryset)
+        queue_regrade(
+            [question_id for question_id, _survey_id in graded],
+            survey_ids=[survey_id for _question_id, survey_id in graded],
+        )
+
 
 @admin.register(Survey)
 class SurveyAdmin(admin.ModelAdmin):
@@ -65,16 +94,22 @@ class AnswerInline(admin.TabularInline):
     model = Answer
     extra = 0
     can_delete = False
+    readonly_fields = ('is_correct',)
 
 
 @admin.register(Response)
 class ResponseAdmin(admin.ModelAdmin):
-    list_display = ('survey', 'student', 'submitted_at', 'answer_count')
+    list_display = ('survey', 'student', 'submitted_at', 'score_display', 'answer_count')
     list_filter = ('submitted_at',)
+    readonly_fields = ('correct_count', 'score', 'max_score')
     search_fields = ('survey__title', 'student__username')
     list_select_related = ('survey', 'student')
     inlines = [AnswerInline]
 
+    @admin.display(ordering='score', description='Score')
+    def score_display(self, obj):
+        return f'{obj.score}/{obj.max_score}'
+
     @admin.display(description='Answers')
     def answer_count(self, obj):
         return obj.answers.count()
@@ -84,6 +119,7 @@ class ResponseAdmin(admin.ModelAdmin):
 class ProfileAdmin(admin.ModelAdmin):
     list_display = ('user', 'role', 'section')
     list_filter = ('role', 'section')
+    list_select_related = ('user', 'section')
     search_fields = ('user__username', 'user__email', 'section__name')
     autocomplete_fields = ('section',)
 
@@ -94,7 +130,39 @@ class SectionAdmin(admin.ModelAdmin):
     search_fields = ('name',)
 
 
-admin.site.register(Choice)
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'kind', 'status', 'progress', 'total', 'created_by', 'created_at', 'finished_at')
+    list_filter = ('kind', 'status')
+    readonly_fields = ('started_at', 'finished_at', 'updated_at')
+
+
+@admin.register(Choice)
+class ChoiceAdmin(admin.ModelAdmin):
+    list_display = ('text', 'question', 'is_correct')
+    list_select_related = ('question',)
+
+    # Choices edited on their own skip the question's post_save, which
+    # normally refreshes the cached survey structure
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        bump_survey_structures(obj.question.survey_id)
+        if change and 'is_correct' in form.changed_data:
+            queue_regrade([obj.question_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        bump_survey_structures(obj.question.survey_id)
+        if obj.is_correct:
+            queue_regrade([obj.question_id])
+
+    def delete_queryset(self, request, queryset):
+        deleted = list(queryset.values_list('question_id', 'question__survey_id', 'is_correct'))
+        super().delete_queryset(request, queryset)
+        bump_survey_structures(*{survey_id for _question_id, survey_id, _is_correct in deleted})
+        queue_regrade([question_id for question_id, _survey_id, is_correct in deleted if is_correct])
+
+
 admin.site.register(Answer)
 
 
@@ -0,0 +1,142 @@
+"""Teacher reports computed with grouped aggregates.
+
+Everything is counted by the database, so the number of queries does not
+depend on the number of responses or students.
+"""
+from django.db.models import Count, F, Q
+
+from .caching import ALL_SECTIONS, cached_fragment
+from .models import Answer, Profile, Response, Section, Survey
+from .services import CHOICE_QUESTION_TYPES
+from .structure import get_survey_structure
+
+
+def _percent(part, whole):
+    return round(part * 100 / whole, 1) if whole else 0.0
+
+
+# === ANSWER DISTRIBUTIONS ===
+# One GROUP BY over the selected choices and one over the questions; labels
+# come from the cached survey structure.
+def question_distributions(survey, responses):
+    """Summarize the answers of ``responses`` (a filtered Response queryset) per question.
+
+    Returns ``{'responses': N, 'questions': [...]}``. Choice questions
+    carry per-choice counts and percentages of their answers, and MCQs
+    the share of correct answers. Text questions carry the number of text
+    answers received.
+    """
+    answers = Answer.objects.filter(response__in=responses)
+
+    per_question = {
+        row['question_id']: row
+        for row in answers.values('question_id').annotate(
+            answered=Count('id'),
+            correct=Count('id', filter=Q(is_correct=True)),
+            text_answers=Count('id', filter=Q(text_answer__isnull=False) & ~Q(text_answer='')),
+        ).order_by()
+    }
+    per_choice = {
+        row['selected_choice_id']: row['total']
+        for row in answers.filter(selected_choice__isnull=False)
+        .values('selected_choice_id').annotate(total=Count('id')).order_by()
+    }
+
+    questions = []
+    for question in get_survey_structure(survey.id)['questions']:
+        counts = per_question.get(question['id'], {})
+        answered = counts.get('answered', 0)
+        item = {
+            'id': question['id'],
+            'text': question['text'],
+            'question_type': question['question_type'],
+            'answered': answered,
+        }
+        if question['question_type'] in CHOICE_QUESTION_TYPES:
+            item['choices'] = [
+                {
+                    'id': choice['id'],
+                    'text': choice['text'],
+                    'is_correct': choice['is_correct'],
+                    'count': per_choice.get(choice['id'], 0),
+                    'percent': _percent(per_choice.get(choice['id'], 0), answered),
+                }
+                for choice in question['choices']
+            ]
+            if question['question_type'] == 'mcq':
+                item['correct'] = counts.get('correct', 0)
+                item['correct_percent'] = _percent(item['correct'], answered)
+        else:
+            item['text_answers'] = counts.get('text_answers', 0)
+        questions.append(item)
+
+    return {'responses': responses.count(), 'questions': questions}
+
+
+# === COMPLETION MATRIX ===
+def completion_matrix(teacher_id):
+    """Sections x surveys completion counts for one teacher, cached.
+
+    The cache is dropped when one of the teacher's surveys or responses
+    changes (the teacher scope) or when students or sections change (the
+    roster scope).
+    """
+    return cached_fragment(
+        f'completion:{teacher_id}',
+        [('teacher', teacher_id), ('roster', ALL_SECTIONS)],
+        lambda: build_completion_matrix(teacher_id),
+    )
+
+
+def build_completion_matrix(teacher_id):
+    """Return ``{'surveys': [...], 'sections': [...]}``.
+
+    Each section row holds one cell per survey, in the order of
+    ``surveys``. A cell is ``None`` when the survey is not assigned to that
+    section. Otherwise it holds the number of students expected (students
+    currently in the section), how many of them submitted, and the
+    completion percentage. Students without a section form a last row
+    that only sees surveys assigned to everyone.
+    """
+    surveys = list(
+        Survey.objects.filter(created_by_id=teacher_id)
+        .order_by('-created_at')
+        .values('id', 'title', 'is_active', 'due_date', 'assigned_to_all')
+    )
+    assigned = set(
+        Survey.assigned_sections.through.objects.filter(survey__created_by_id=teacher_id)
+        .values_list('survey_id', 'section_id')
+    )
+    expected = {
+        row['section_id']: row['students']
+        for row in Profile.objects.filter(role='student')
+        .values('section_id').annotate(students=Count('id')).order_by()
+    }
+    # The matrix itself: submissions grouped by survey and current section
+    submitted = {
+        (row['survey_id'], row['section_id']): row['submitted']
+        for row in Response.objects.filter(survey__created_by_id=teacher_id, student__profile__role='student')
+        .values('survey_id', section_id=F('student__profile__section_id'))
+        .annotate(submitted=Count('id')).order_by()
+    }
+
+    rows = [{'id': section.id, 'name': section.name} for section in Section.objects.order_by('name')]
+    if expected.get(None):
+        rows.append({'id': None, 'name': 'No section'})
+    for row in rows:
+        row['expected'] = expected.get(row['id'], 0)
+        row['cells'] = []
+        for survey in surveys:
+            if not (survey['assigned_to_all'] or (survey['id'], row['id']) in assigned):
+                row['cells'].append(None)
+                continue
+            done = submitted.get((survey['id'], row['id']), 0)
+            row['cells'].append({
+                'expected': row['expected'],
+                'submitted': done,
+                'percent': _percent(done, row['expected']),
+            })
+
+    for survey in surveys:
+        del survey['assigned_to_all']
+    return {'surveys': surveys, 'sections': rows}
@@ -0,0 +1,68 @@
+"""Async twins of the read-only JSON endpoints, for ASGI deployments.
+
+Under ASGI a synchronous view occupies a worker thread for its whole
+request. These views authenticate with ``request.auser()`` and query
+through the async ORM instead, so many polling clients can wait on the
+event loop at once. They return exactly the same JSON as the sync views
+they mirror; the payload builders are shared with views.py.
+"""
+from django.contrib.auth.views import redirect_to_login
+from django.http import JsonResponse
+from django.views import View
+
+from .models import Profile
+from .views import (
+    assigned_survey_payload,
+    current_user_payload,
+    history_entry_payload,
+    open_surveys_for_section,
+    student_history_entries,
+)
+
+
+class AsyncLoginRequiredMixin:
+    """``LoginRequiredMixin`` for async views: resolves the user without blocking."""
+
+    async def dispatch(self, request, *args, **kwargs):
+        user = await request.auser()
+        if not user.is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await super().dispatch(request, *args, **kwargs)
+
+
+async def _get_profile(user):
+    return await Profile.objects.select_related('section').filter(user=user).afirst()
+
+
+class AsyncCurrentUserView(AsyncLoginRequiredMixin, View):
+    """Async version of ``CurrentUserView``."""
+
+    async def get(self, request):
+        user = await request.auser()
+        profile = await _get_profile(user)
+        return JsonResponse(current_user_payload(user, profile), status=200)
+
+
+class AsyncAssignedSurveyListView(AsyncLoginRequiredMixin, View):
+    """Async version of ``AssignedSurveyListView``."""
+
+    async def get(self, request):
+        user = await request.auser()
+        profile = await _get_profile(user)
+        if not profile:
+            return JsonResponse([], safe=False)
+
+        payload = [
+            assigned_survey_payload(survey)
+            async for survey in open_surveys_for_section(profile.section_id)
+        ]
+        return JsonResponse(payload, safe=False)
+
+
+class AsyncStudentHistoryView(AsyncLoginRequiredMixin, View):
+    """Async version of the JSON branch of ``StudentHistoryView``."""
+
+    async def get(self, request):
+        user = await request.auser()
+        payload = [history_entry_payload(entry) async for entry in student_history_entries(user)]
+        return JsonResponse(payload, safe=False)
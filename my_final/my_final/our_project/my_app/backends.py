@@ -0,0 +1,30 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+
+UserModel = get_user_model()
+
+
+class ProfileModelBackend(ModelBackend):
+    """``ModelBackend`` that reads the user's profile in the same query as the user.
+
+    The login view picks its redirect from the profile, so this saves a
+    query per login. A user without a profile comes back with the missing
+    relation cached, which the view can check without another query.
+    """
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(UserModel.USERNAME_FIELD)
+        if username is None or password is None:
+            return
+        try:
+            user = UserModel._default_manager.select_related('profile').get(
+                **{UserModel.USERNAME_FIELD: username}
+            )
+        except UserModel.DoesNotExist:
+            # Hash once anyway, as ModelBackend does, so missing users take as long
+            UserModel().set_password(password)
+        else:
+            if user.check_password(password) and self.user_can_authenticate(user):
+                return user
@@ -0,0 +1,297 @@
+"""Endpoint benchmark driven through the Django test client.
+
+Every named route in ``my_app.urls`` has an entry in ``ROUTE_PLANS``
+describing who requests it and with what data. Each request, and any row
+its URL needs (such as a job), is wrapped in a transaction that is rolled
+back, so the dataset (usually produced by ``seed_data``) is identical for
+every iteration and commit.
+
+``run_async_comparison`` instead drives the sync JSON endpoints and their
+async twins through Django's ASGI handler with many requests in flight.
+"""
+import asyncio
+import json
+import tempfile
+import time
+from contextlib import contextmanager
+
+from django.contrib.auth.models import User
+from django.db import connection, transaction
+from asgiref.sync import async_to_sync
+from django.test import AsyncClient, Client, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from .jobs import enqueue, run_job
+from .management.commands.seed_data import SEED_PASSWORD
+from .models import Question, Response, Survey
+from .urls import urlpatterns
+
+
+class _Rollback(Exception):
+    pass
+
+
+@contextmanager
+def scratch_job_output():
+    """Send job output to a temporary directory removed afterwards.
+
+    The jobs made for routes that need one are rolled back with the
+    request, but the files they wrote are not.
+    """
+    with tempfile.TemporaryDirectory() as directory, override_settings(JOB_OUTPUT_DIR=directory):
+        yield
+
+
+# name -> (method, role, needs) where needs lists the URL kwargs to resolve
+ROUTE_PLANS = {
+    'home': ('GET', None, ()),
+    'register': ('POST', None, ()),
+    'login': ('POST', None, ()),
+    'logout': ('GET', 'student', ()),
+    'current_user': ('GET', 'student', ()),
+    'teacher_dashboard': ('GET', 'teacher', ()),
+    'completion_matrix': ('GET', 'teacher', ()),
+    'student_dashboard': ('GET', 'student', ()),
+    'survey_detail': ('GET', 'student', ('survey_id',)),
+    'create_survey_form': ('GET', 'teacher', ()),
+    'edit_survey': ('GET', 'teacher', ('survey_id',)),
+    'survey_questions': ('POST', 'teacher', ('survey_id',)),
+    'add_question': ('POST', 'teacher', ('survey_id',)),
+    'edit_question': ('POST', 'teacher', ('survey_id', 'question_id')),
+    'delete_question': ('POST', 'teacher', ('survey_id', 'question_id')),
+    'clone_survey': ('POST', 'teacher', ('survey_id',)),
+    'delete_survey': ('POST', 'teacher', ('survey_id',)),
+    'survey_responses': ('GET', 'teacher', ('survey_id',)),
+    'survey_analytics': ('GET', 'teacher', ('survey_id',)),
+    'question_text_summary': ('GET', 'teacher', ('survey_id', 'question_id')),
+    'export_survey_responses': ('GET', 'teacher', ('survey_id',)),
+    'export_survey_responses_job': ('POST', 'teacher', ('survey_id',)),
+    'job_status': ('GET', 'teacher', ('job_id',)),
+    'job_download': ('GET', 'teacher', ('job_id',)),
+    'assigned_surveys': ('GET', 'student', ()),
+    'submit_survey': ('POST', 'new_student', ('survey_id',)),
+    'student_history': ('GET', 'student', ()),
+    'async_current_user': ('GET', 'student', ()),
+    'async_assigned_surveys': ('GET', 'student', ()),
+    'async_student_history': ('GET', 'student', ()),
+}
+
+# sync route (with its JSON query string) -> async twin, for run_async_comparison
+ASYNC_TWINS = {
+    'current_user': ('', 'async_current_user'),
+    'assigned_surveys': ('', 'async_assigned_surveys'),
+    'student_history': ('?format=json', 'async_student_history'),
+}
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+class BenchmarkContext:
+    """Picks the teacher, student, survey and question every route is run against."""
+
+    def __init__(self):
+        survey = (
+            Survey.objects.filter(questions__isnull=False, responses__isnull=False)
+            .select_related('created_by')
+            .order_by('-id')
+            .first()
+        )
+        if survey is None:
+            raise ValueError("No survey with questions and responses; run seed_data first.")
+        self.survey = survey
+        self.teacher = survey.created_by
+        # A student who has answered something, so history/dashboard have data
+        self.student = Response.objects.filter(survey=survey).select_related('student').first().student
+        # ...and one who has not, so submissions take the full write path
+        self.new_student = (
+            User.objects.filter(profile__role='student')
+            .exclude(responses__survey=survey)
+            .first()
+        ) or self.student
+        self.question = Question.objects.filter(survey=survey).order_by('id').first()
+
+    def url_for(self, name, needs):
+        kwargs = {}
+        if 'survey_id' in needs:
+            kwargs['survey_id'] = self.survey.id
+        if 'question_id' in needs:
+            kwargs['question_id'] = self.question.id
+        if 'job_id' in needs:
+            # A finished export; callers resolve URLs inside their rolled back transaction
+            kwargs['job_id'] = run_job(enqueue('export_responses', self.teacher, survey_id=self.survey.id)).id
+        return reverse(name, kwargs=kwargs)
+
+    def post_data(self, name):
+        if name == 'register':
+            return {
+                'username': 'benchmark_user', 'email': 'benchmark_user@example.com',
+                'password': SEED_PASSWORD, 'password_confirm': SEED_PASSWORD,
+                'role': 'student', 'section': self.student.profile.section_id or '',
+            }
+        if name == 'login':
+            # Matches users created by seed_data; other datasets measure the failed-login path
+            return {'username': self.student.username, 'password': SEED_PASSWORD}
+        if name == 'add_question':
+            return {'text': 'Benchmark question', 'question_type': 'mcq', 'choices': ['A', 'B']}
+        if name == 'edit_question':
+            return {'text': 'Benchmark edit', 'required': 'on', 'choices': ['A', 'B', 'C']}
+        if name == 'survey_questions':
+            # Re-save the current question set unchanged, plus one new question
+            questions = [
+                {
+                    'id': question.id,
+                    'text': question.text,
+                    'question_type': question.question_type,
+                    'required': question.required,
+                    'choices': [
+                        {'id': choice.id, 'text': choice.text, 'is_correct': choice.is_correct}
+                        for choice in question.choices.all()
+                    ],
+                }
+                for question in self.survey.questions.prefetch_related('choices')
+            ]
+            questions.append({'text': 'Benchmark question', 'question_type': 'mcq',
+                              'choices': [{'text': 'A'}, {'text': 'B', 'is_correct': True}]})
+            return json.dumps({'questions': questions})
+        if name == 'submit_survey':
+            return {f'question_{self.question.id}': 'benchmark'}
+        return {}
+
+
+def _timed_request(client, method, url, data):
+    with CaptureQueriesContext(connection) as queries:
+        start = time.perf_counter()
+        if method == 'POST' and isinstance(data, str):
+            response = client.post(url, data, content_type='application/json')
+        elif method == 'POST':
+            response = client.post(url, data)
+        else:
+            response = client.get(url)
+        if response.streaming:
+            for _chunk in response.streaming_content:
+                pass
+        elapsed = (time.perf_counter() - start) * 1000
+    return response.status_code, elapsed, len(queries)
+
+
+@scratch_job_output()
+def run_benchmark(iterations=10, routes=None):
+    """Run every planned route ``iterations`` times and return a JSON-ready report."""
+    context = BenchmarkContext()
+    clients = {None: Client(HTTP_HOST='localhost')}
+    for role, user in (
+        ('teacher', context.teacher),
+        ('student', context.student),
+        ('new_student', context.new_student),
+    ):
+        clients[role] = Client(HTTP_HOST='localhost')
+        clients[role].force_login(user)
+
+    names = [pattern.name for pattern in urlpatterns if pattern.name]
+    report = {'routes': {}, 'unplanned': [name for name in names if name not in ROUTE_PLANS]}
+    for name in names:
+        if name not in ROUTE_PLANS or (routes and name not in routes):
+            continue
+        method, role, needs = ROUTE_PLANS[name]
+        data = context.post_data(name)
+        timings, query_counts, statuses = [], [], set()
+        for _i in range(iterations):
+            if role == 'student' and name == 'logout':
+                # logout ends the session; use a throwaway login each time
+                client = Client(HTTP_HOST='localhost')
+                client.force_login(context.student)
+            elif name in ('login', 'register'):
+                # Both start a session; keep it off the shared anonymous client
+                client = Client(HTTP_HOST='localhost')
+            else:
+                client = clients[role]
+            try:
+                with transaction.atomic():
+                    url = context.url_for(name, needs)
+                    status, elapsed, count = _timed_request(client, method, url, data)
+                    raise _Rollback()
+            except _Rollback:
+                pass
+            statuses.add(status)
+            timings.append(elapsed)
+            query_counts.append(count)
+        report['routes'][name] = {
+            'method': method,
+            'status': sorted(statuses),
+            'queries': max(query_counts),
+            'p50_ms': round(percentile(timings, 50), 2),
+            'p90_ms': round(percentile(timings, 90), 2),
+            'p99_ms': round(percentile(timings, 99), 2),
+            'max_ms': round(max(timings), 2),
+        }
+    report['dataset'] = {
+        'surveys': Survey.objects.count(),
+        'responses': Response.objects.count(),
+        'benchmark_survey_id': context.survey.id,
+        'iterations': iterations,
+    }
+    return report
+
+
+async def _load(client, url, total, concurrency):
+    """Issue ``total`` GETs with at most ``concurrency`` in flight; returns (seconds, statuses)."""
+    semaphore = asyncio.Semaphore(concurrency)
+    statuses = set()
+
+    async def one():
+        async with semaphore:
+            response = await client.get(url)
+            statuses.add(response.status_code)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one() for _i in range(total)))
+    return time.perf_counter() - start, statuses
+
+
+async def _compare(cookies, plans, total, concurrency):
+    client = AsyncClient(HTTP_HOST='localhost')
+    client.cookies = cookies
+    report = {}
+    for name, (sync_url, async_url) in plans.items():
+        row = {}
+        for kind, url in (('sync', sync_url), ('async', async_url)):
+            await client.get(url)  # warm up
+            elapsed, statuses = await _load(client, url, total, concurrency)
+            row[kind] = {
+                'status': sorted(statuses),
+                'requests_per_s': round(total / elapsed, 1),
+                'mean_ms': round(elapsed / total * 1000, 2),
+            }
+        row['speedup'] = round(row['async']['requests_per_s'] / row['sync']['requests_per_s'], 2)
+        report[name] = row
+    return report
+
+
+def run_async_comparison(requests=200, concurrency=50):
+    """Compare each sync JSON endpoint with its async twin under concurrent load.
+
+    Both run through the ASGI handler in this process, the way an ASGI
+    server would call them: sync views are handed to a worker thread per
+    request, async views stay on the event loop. Numbers reflect handler
+    and ORM overhead; SQLite itself still serializes the queries.
+    """
+    context = BenchmarkContext()
+    login = Client(HTTP_HOST='localhost')
+    login.force_login(context.student)
+    plans = {
+        name: (reverse(name) + query, reverse(twin))
+        for name, (query, twin) in ASYNC_TWINS.items()
+    }
+    report = async_to_sync(_compare)(login.cookies, plans, requests, concurrency)
+    return {
+        'routes': report,
+        'requests': requests,
+        'concurrency': concurrency,
+        'student_id': context.student.id,
+    }
@@ -0,0 +1,76 @@
+"""Versioned cache keys for the dashboard fragments and survey structures.
+
+Each scope (a teacher, a student, a section, "all sections", a survey, a
+survey's stored answers, or the roster of students and sections)
+owns a version number stored in the cache. Cached fragments embed the
+versions they were built from in their key, so bumping a version makes
+the old fragment unreachable without having to know or delete its key.
+The signal receivers in models.py bump only the scopes a change affects.
+"""
+import time
+
+from django.core.cache import cache
+
+
+DASHBOARD_TIMEOUT = 60 * 60
+ALL_SECTIONS = 'all'
+
+
+def _version_key(scope, ident):
+    return f'dashboard:v:{scope}:{ident}'
+
+
+def get_versions(*scopes):
+    """Return the current version for each ``(scope, ident)`` pair in one cache round trip."""
+    keys = [_version_key(scope, ident) for scope, ident in scopes]
+    found = cache.get_many(keys)
+    missing = {key: time.time_ns() for key in keys if key not in found}
+    if missing:
+        # Seed from the clock so an evicted version never comes back to an old value
+        cache.set_many(missing, None)
+        found.update(missing)
+    return [found[key] for key in keys]
+
+
+def bump(scope, *idents):
+    for ident in idents:
+        key = _version_key(scope, ident)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.set(key, time.time_ns(), None)
+
+
+def bump_teacher(user_id):
+    bump('teacher', user_id)
+
+
+def bump_student(user_id):
+    bump('student', user_id)
+
+
+def bump_sections(*section_ids):
+    bump('section', *section_ids)
+
+
+def bump_surveys(*survey_ids):
+    bump('survey', *survey_ids)
+
+
+def bump_answers(*survey_ids):
+    bump('answers', *survey_ids)
+
+
+def bump_roster():
+    bump('roster', ALL_SECTIONS)
+
+
+def cached_fragment(name, scopes, builder):
+    """Return ``builder()`` cached under ``name`` and the current versions of ``scopes``."""
+    versions = get_versions(*scopes)
+    key = ':'.join(['dashboard', name, *(str(v) for v in versions)])
+    value = cache.get(key)
+    if value is None:
+        value = builder()
+        cache.set(key, value, DASHBOARD_TIMEOUT)
+    return value
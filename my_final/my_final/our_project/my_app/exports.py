@@ -0,0 +1,75 @@
+import csv
+import json
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import Response
+
+
+EXPORT_FORMATS = ('csv', 'ndjson')
+
+EXPORT_COLUMNS = (
+    ('response_id', 'id'),
+    ('submitted_at', 'submitted_at'),
+    ('student_id', 'student_id'),
+    ('username', 'student__username'),
+    ('first_name', 'student__first_name'),
+    ('last_name', 'student__last_name'),
+    ('email', 'student__email'),
+    ('score', 'score'),
+    ('max_score', 'max_score'),
+    ('question_id', 'answers__question_id'),
+    ('question', 'answers__question__text'),
+    ('question_type', 'answers__question__question_type'),
+    ('choice_id', 'answers__selected_choice_id'),
+    ('choice', 'answers__selected_choice__text'),
+    ('is_correct', 'answers__is_correct'),
+    ('text_answer', 'answers__text_answer'),
+)
+
+# Rows fetched from the database per round trip while streaming
+EXPORT_CHUNK_SIZE = 2000
+
+
+class _Echo:
+    """File-like object whose ``write`` returns the value instead of buffering it."""
+
+    def write(self, value):
+        return value
+
+
+def export_rows(survey, responses=None):
+    """Yield one flat tuple per answer (or per response without answers).
+
+    ``responses`` is an optional, already filtered Response queryset. Rows
+    are read through a server-side iterator so memory stays flat no matter
+    how many answers the survey has.
+    """
+    if responses is None:
+        responses = Response.objects.filter(survey=survey)
+    rows = (
+        responses.order_by('submitted_at', 'id', 'answers__question_id')
+        .values_list(*(lookup for _name, lookup in EXPORT_COLUMNS))
+    )
+    return rows.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def iter_csv(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _lookup in EXPORT_COLUMNS])
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def iter_ndjson(rows):
+    names = [name for name, _lookup in EXPORT_COLUMNS]
+    for row in rows:
+        yield json.dumps(dict(zip(names, row)), cls=DjangoJSONEncoder) + '\n'
+
+
+def iter_export(survey, responses=None, export_format='csv'):
+    """Stream ``survey``'s responses as CSV or NDJSON text chunks."""
+    rows = export_rows(survey, responses)
+    if export_format == 'ndjson':
+        return iter_ndjson(rows)
+    return iter_csv(rows)
@@ -0,0 +1,186 @@
+"""Database-backed background jobs for long teacher operations.
+
+Views call ``enqueue`` and return at once. ``manage.py run_jobs`` workers
+claim queued rows, run the handler registered for the job's kind and
+record progress and the outcome on the row, which the job status endpoint
+reads. The database is the only broker, so this needs nothing beyond the
+one box the site already runs on; several workers may share the queue.
+"""
+import os
+import time
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+
+from .exports import EXPORT_CHUNK_SIZE, export_rows, iter_csv, iter_ndjson
+from .models import Answer, Job, Response, Survey
+from .services import filter_responses, rebuild_stats, regrade_questions
+
+
+# kind -> handler(job, progress) returning a JSON-ready result
+JOB_HANDLERS = {}
+
+# A running job whose heartbeat (its last progress report) is older than
+# this lost its worker; every handler reports progress well within it
+STALE_AFTER = timedelta(minutes=10)
+DELETE_BATCH_SIZE = 500
+
+
+def job_handler(kind):
+    """Register the decorated function as the handler for ``kind`` jobs."""
+    def register(func):
+        JOB_HANDLERS[kind] = func
+        return func
+    return register
+
+
+def enqueue(kind, created_by=None, **params):
+    """Queue a ``kind`` job with JSON-ready ``params``; returns the Job."""
+    if kind not in JOB_HANDLERS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    return Job.objects.create(kind=kind, created_by=created_by, params=params)
+
+
+def claim_next():
+    """Mark the oldest queued job as running and return it, or ``None`` if the queue is empty."""
+    while True:
+        job_id = Job.objects.filter(status='queued').order_by('id').values_list('id', flat=True).first()
+        if job_id is None:
+            return None
+        now = timezone.now()
+        # The status condition makes the claim a compare-and-swap: if another
+        # worker took the job first, nothing is updated and we try the next one
+        if Job.objects.filter(id=job_id, status='queued').update(status='running', started_at=now, updated_at=now):
+            return Job.objects.get(id=job_id)
+
+
+def requeue_stale(older_than=STALE_AFTER):
+    """Queue running jobs whose worker stopped reporting again; returns how many."""
+    now = timezone.now()
+    return Job.objects.filter(status='running', updated_at__lt=now - older_than).update(
+        status='queued', progress=0, updated_at=now
+    )
+
+
+def run_job(job):
+    """Run a claimed job to completion, recording its result or traceback."""
+    def progress(done, total=None):
+        fields = {'progress': done, 'updated_at': timezone.now()}
+        if total is not None:
+            fields['total'] = total
+        Job.objects.filter(id=job.id).update(**fields)
+
+    try:
+        handler = JOB_HANDLERS.get(job.kind)
+        if handler is None:
+            raise ValueError(f"Unknown job kind: {job.kind}")
+        result = handler(job, progress)
+    except Exception:
+        outcome = {'status': 'failed', 'error': traceback.format_exc()}
+    else:
+        outcome = {'status': 'done', 'result': result}
+    now = timezone.now()
+    Job.objects.filter(id=job.id).update(finished_at=now, updated_at=now, **outcome)
+    job.refresh_from_db()
+    return job
+
+
+def run_worker(poll=1.0, drain=False, max_jobs=None, log=None):
+    """Claim and run jobs until ``max_jobs`` ran, or the queue is empty when ``drain``.
+
+    Returns the number of jobs run. ``log`` is called with each finished job.
+    """
+    requeue_stale()
+    last_sweep = time.monotonic()
+    ran = 0
+    while max_jobs is None or ran < max_jobs:
+        job = claim_next()
+        if job is None:
+            if drain:
+                break
+            # Idle: drop connections past CONN_MAX_AGE, as a request would,
+            # and pick up jobs whose worker died since the last sweep
+            close_old_connections()
+            if time.monotonic() - last_sweep > STALE_AFTER.total_seconds() / 2:
+                requeue_stale()
+                last_sweep = time.monotonic()
+            time.sleep(poll)
+            continue
+        job = run_job(job)
+        ran += 1
+        if log:
+            log(job)
+    return ran
+
+
+def job_output_path(job):
+    """File a job writes its output to, under ``settings.JOB_OUTPUT_DIR``."""
+    os.makedirs(settings.JOB_OUTPUT_DIR, exist_ok=True)
+    extension = job.params.get('format', 'csv')
+    return os.path.join(settings.JOB_OUTPUT_DIR, f'job-{job.id}.{extension}')
+
+
+# === HANDLERS ===
+
+@job_handler('export_responses')
+def export_responses_job(job, progress):
+    params = job.params
+    survey = Survey.objects.get(id=params['survey_id'])
+    responses = filter_responses(
+        Response.objects.filter(survey=survey),
+        params.get('search', ''),
+        params.get('date_from', ''),
+        params.get('date_to', ''),
+    )
+    progress(0, Answer.objects.filter(response__in=responses).count())
+
+    written = 0
+
+    def counted(rows):
+        nonlocal written
+        for row in rows:
+            yield row
+            written += 1
+            if written % EXPORT_CHUNK_SIZE == 0:
+                progress(written)
+
+    rows = counted(export_rows(survey, responses))
+    chunks = iter_ndjson(rows) if params.get('format') == 'ndjson' else iter_csv(rows)
+    path = job_output_path(job)
+    with open(path, 'w', newline='', encoding='utf-8') as handle:
+        handle.writelines(chunks)
+    progress(written, written)
+    return {'file': os.path.basename(path), 'rows': written}
+
+
+@job_handler('delete_survey')
+def delete_survey_job(job, progress):
+    survey = Survey.objects.filter(id=job.params['survey_id']).first()
+    if survey is None:
+        return {'deleted': False}
+    # Answers are most of the rows; removing them in short transactions keeps
+    # submissions to other surveys from waiting on one long delete
+    response_ids = list(Response.objects.filter(survey=survey).values_list('id', flat=True))
+    progress(0, len(response_ids))
+    for start in range(0, len(response_ids), DELETE_BATCH_SIZE):
+        batch = response_ids[start:start + DELETE_BATCH_SIZE]
+        with transaction.atomic():
+            Answer.objects.filter(response_id__in=batch).delete()
+        progress(start + len(batch))
+    survey.delete()
+    return {'deleted': True, 'responses': len(response_ids)}
+
+
+@job_handler('rebuild_stats')
+def rebuild_stats_job(job, progress):
+    return rebuild_stats(progress=progress)
+
+
+@job_handler('regrade')
+def regrade_job(job, progress):
+    return regrade_questions(
+        job.params['question_ids'], progress=progress, survey_ids=job.params.get('survey_ids', ())
+    )
@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.benchmark import run_async_comparison, run_benchmark
+
+
+class Command(BaseCommand):
+    help = "Benchmark every my_app route against the current database and print a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iterations', type=int, default=20)
+        parser.add_argument('--route', action='append', dest='routes', help="Only run this URL name (repeatable).")
+        parser.add_argument('--output', '-o', help="Write the JSON report to this file instead of stdout.")
+        parser.add_argument('--compare-async', action='store_true',
+                            help="Compare the sync JSON endpoints with their async twins under concurrent load.")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint with --compare-async.")
+        parser.add_argument('--concurrency', type=int, default=50, help="Requests in flight with --compare-async.")
+
+    def handle(self, *args, **options):
+        try:
+            if options['compare_async']:
+                report = run_async_comparison(options['requests'], options['concurrency'])
+            else:
+                report = run_benchmark(options['iterations'], options['routes'])
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        payload = json.dumps(report, indent=2, sort_keys=True)
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as handle:
+                handle.write(payload + '\n')
+            self.stdout.write(self.style.SUCCESS(f"Wrote benchmark report to {options['output']}"))
+        else:
+            self.stdout.write(payload)
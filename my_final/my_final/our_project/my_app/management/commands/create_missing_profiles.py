@@ -0,0 +1,14 @@
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+
+from my_app.models import Profile
+
+
+class Command(BaseCommand):
+    help = "Create a Profile for every user that does not have one yet."
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        missing = User.objects.filter(profile__isnull=True)
+        created = Profile.objects.bulk_create(Profile(user=user) for user in missing)
+        self.stdout.write(self.style.SUCCESS(f"Created {len(created)} missing profiles."))
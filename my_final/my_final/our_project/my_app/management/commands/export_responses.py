@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.exports import EXPORT_FORMATS, iter_export
+from my_app.models import Response, Survey
+from my_app.services import filter_responses
+
+
+class Command(BaseCommand):
+    help = "Stream a survey's responses and answers as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument('survey_id', type=int)
+        parser.add_argument('--format', dest='export_format', choices=EXPORT_FORMATS, default='csv')
+        parser.add_argument('--search', default='', help="Same as the responses page search box.")
+        parser.add_argument('--date-from', default='', help="YYYY-MM-DD, inclusive.")
+        parser.add_argument('--date-to', default='', help="YYYY-MM-DD, inclusive.")
+        parser.add_argument('--output', '-o', help="Write to this file instead of stdout.")
+
+    def handle(self, *args, **options):
+        survey = Survey.objects.filter(id=options['survey_id']).first()
+        if survey is None:
+            raise CommandError(f"Survey {options['survey_id']} does not exist.")
+
+        responses = filter_responses(
+            Response.objects.filter(survey=survey),
+            options['search'].strip(),
+            options['date_from'].strip(),
+            options['date_to'].strip(),
+        )
+        chunks = iter_export(survey, responses, options['export_format'])
+        if options['output']:
+            with open(options['output'], 'w', newline='', encoding='utf-8') as handle:
+                handle.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
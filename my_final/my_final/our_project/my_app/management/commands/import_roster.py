@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.roster import RosterError, import_roster, read_roster
+
+
+class Command(BaseCommand):
+    help = (
+        "Create users and profiles from a CSV roster with columns "
+        "username,email[,password,role,section,first_name,last_name]. "
+        "Passwords are hashed across a process pool and rows are bulk inserted."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Roster CSV file.")
+        parser.add_argument('--workers', type=int, default=None,
+                            help="Hashing processes (default: one per CPU).")
+        parser.add_argument('--create-sections', action='store_true',
+                            help="Create sections named in the roster that do not exist yet.")
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['path'], newline='', encoding='utf-8-sig') as handle:
+                rows = read_roster(handle)
+            users = import_roster(rows, options['workers'], options['create_sections'])
+        except RosterError as e:
+            for message in e.errors:
+                self.stderr.write(message)
+            raise CommandError(f"Roster rejected: {len(e.errors)} problem(s); nothing was imported.") from e
+        except OSError as e:
+            raise CommandError(f"Could not read {options['path']}: {e}") from e
+
+        unusable = sum(1 for row in rows if not row['password'])
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(users)} users."))
+        if unusable:
+            self.stdout.write(f"{unusable} users have no password and cannot log in until one is set.")
@@ -0,0 +1,41 @@
+import json
+import sys
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.services import InvalidQuestionSet, import_surveys
+
+
+class Command(BaseCommand):
+    help = (
+        "Import surveys with their questions, choices and correct answers from a JSON file "
+        "(one survey object or a list of them) using bulk inserts."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="JSON file to import, or - for stdin.")
+        parser.add_argument('--teacher', required=True, help="Username of the teacher who will own the surveys.")
+
+    def handle(self, *args, **options):
+        teacher = User.objects.filter(username=options['teacher'], profile__role='teacher').first()
+        if teacher is None:
+            raise CommandError(f"No teacher with username '{options['teacher']}'.")
+
+        try:
+            if options['path'] == '-':
+                payload = json.load(sys.stdin)
+            else:
+                with open(options['path'], encoding='utf-8') as handle:
+                    payload = json.load(handle)
+        except (OSError, ValueError) as e:
+            raise CommandError(f"Could not read {options['path']}: {e}") from e
+
+        try:
+            surveys = import_surveys(payload, teacher)
+        except InvalidQuestionSet as e:
+            raise CommandError(str(e)) from e
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {len(surveys)} surveys: {', '.join(str(survey.id) for survey in surveys)}"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from my_app.search import fts_available, rebuild_search_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text index used by the survey responses search box."
+
+    def handle(self, *args, **options):
+        if not fts_available():
+            self.stdout.write(self.style.WARNING("Full-text index not available on this database; nothing to do."))
+            return
+        total = rebuild_search_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} responses."))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from my_app.jobs import enqueue
+from my_app.services import rebuild_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the survey, question and choice counters from the raw Answer table."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--background', action='store_true', help="Queue the rebuild for a run_jobs worker.")
+
+    def handle(self, *args, **options):
+        if options['background']:
+            job = enqueue('rebuild_stats')
+            self.stdout.write(self.style.SUCCESS(f"Queued job {job.id}."))
+            return
+        totals = rebuild_stats()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt stats for {totals['surveys']} surveys, "
+            f"{totals['questions']} questions and {totals['choices']} choices."
+        ))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from my_app.models import Question
+from my_app.services import regrade_questions
+
+
+class Command(BaseCommand):
+    help = "Recompute stored correctness and scores after correct answers changed."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--question', type=int, action='append', default=[], help="Question id; repeatable.")
+        parser.add_argument('--survey', type=int, action='append', default=[], help="Regrade every question of this survey; repeatable.")
+
+    def handle(self, *args, **options):
+        question_ids = set(options['question'])
+        if options['survey']:
+            question_ids.update(
+                Question.objects.filter(survey_id__in=options['survey']).values_list('id', flat=True)
+            )
+        if not question_ids:
+            raise CommandError("Give at least one --question or --survey.")
+        totals = regrade_questions(sorted(question_ids))
+        self.stdout.write(self.style.SUCCESS(
+            f"Regraded {totals['responses']} responses; {totals['changed']} changed score."
+        ))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from my_app.jobs import run_worker
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs (response exports, survey deletes, stats rebuilds, regrades)."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--drain', action='store_true', help="Exit once the queue is empty instead of polling.")
+        parser.add_argument('--poll', type=float, default=1.0, help="Seconds to wait between polls of an empty queue.")
+        parser.add_argument('--max-jobs', type=int, help="Exit after running this many jobs.")
+
+    def handle(self, *args, **options):
+        ran = run_worker(
+            poll=options['poll'],
+            drain=options['drain'],
+            max_jobs=options['max_jobs'],
+            log=lambda job: self.stdout.write(f"Job {job.id} ({job.kind}): {job.status}"),
+        )
+        self.stdout.write(self.style.SUCCESS(f"Ran {ran} jobs."))
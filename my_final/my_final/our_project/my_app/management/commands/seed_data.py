@@ -0,0 +1,255 @@
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from my_app.caching import ALL_SECTIONS
+from my_app.models import (
+    Answer,
+    Choice,
+    HistoryEntry,
+    Profile,
+    Question,
+    Response,
+    Section,
+    Survey,
+    bump_created_surveys,
+    bump_roster_reports,
+    bump_survey_structures,
+    refresh_assigned_to_all,
+)
+from my_app.search import rebuild_search_index
+from my_app.services import rebuild_stats
+
+
+SEED_PASSWORD = 'seed-password'
+QUESTION_TYPES = ('mcq', 'likert', 'text')
+CHOICES_PER_QUESTION = 4
+BATCH_SIZE = 1000
+
+
+class Command(BaseCommand):
+    help = "Seed a synthetic dataset of sections, students, surveys and responses using bulk inserts."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sections', type=int, default=5)
+        parser.add_argument('--students', type=int, default=200)
+        parser.add_argument('--teachers', type=int, default=2)
+        parser.add_argument('--surveys', type=int, default=20)
+        parser.add_argument('--questions', type=int, default=10, help="Questions per survey.")
+        parser.add_argument('--responses', type=int, default=50, help="Responses per survey.")
+        parser.add_argument('--prefix', default='seed', help="Prefix for generated usernames and titles.")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed, for reproducible datasets.")
+
+    def handle(self, *args, **options):
+        prefix = options['prefix']
+        if User.objects.filter(username__startswith=f'{prefix}_').exists():
+            raise CommandError(f"Users with prefix '{prefix}_' already exist; pick another --prefix.")
+        rng = random.Random(options['seed'])
+
+        with transaction.atomic():
+            sections = self._seed_sections(prefix, options['sections'])
+            teachers = self._seed_users(prefix, 'teacher', options['teachers'], [None])
+            students = self._seed_users(prefix, 'student', options['students'], sections or [None])
+            surveys = self._seed_surveys(prefix, rng, teachers, sections, options['surveys'])
+            questions = self._seed_questions(rng, surveys, options['questions'])
+            responses, answers = self._seed_responses(
+                rng, surveys, sections, questions, students, options['responses']
+            )
+
+        # Derived tables are rebuilt once instead of maintained row by row
+        refresh_assigned_to_all([survey.id for survey in surveys])
+        audiences = {}
+        for survey in surveys:
+            audiences.setdefault(survey.created_by_id, set()).update(survey.seed_sections or [ALL_SECTIONS])
+        for teacher_id, audience in audiences.items():
+            bump_created_surveys(teacher_id, audience)
+        bump_survey_structures(*(survey.id for survey in surveys))
+        bump_roster_reports()
+        rebuild_stats()
+        rebuild_search_index()
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Seeded {len(sections)} sections, {len(teachers)} teachers, {len(students)} students, "
+            f"{len(surveys)} surveys, {len(questions)} questions, {responses} responses, {answers} answers. "
+            f"Password for every seeded user: {SEED_PASSWORD}"
+        ))
+
+    def _seed_sections(self, prefix, count):
+        return Section.objects.bulk_create(
+            Section(name=f'{prefix} section {i + 1}') for i in range(count)
+        )
+
+    def _seed_users(self, prefix, role, count, sections):
+        # Hash once: every seeded user shares the same password
+        password = make_password(SEED_PASSWORD)
+        users = User.objects.bulk_create(
+            (
+                User(
+                    username=f'{prefix}_{role}_{i + 1:05d}',
+                    email=f'{prefix}_{role}_{i + 1:05d}@example.com',
+                    first_name=role.title(),
+                    last_name=f'{i + 1:05d}',
+                    password=password,
+                )
+                for i in range(count)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        # bulk_create skips post_save, so profiles are created explicitly
+        Profile.objects.bulk_create(
+            (
+                Profile(user=user, role=role, section=sections[i % len(sections)])
+                for i, user in enumerate(users)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        for i, user in enumerate(users):
+            user.seed_section = sections[i % len(sections)]
+        return users
+
+    def _seed_surveys(self, prefix, rng, teachers, sections, count):
+        if not teachers:
+            raise CommandError("At least one teacher is required to own the surveys.")
+        surveys = Survey.objects.bulk_create(
+            Survey(
+                title=f'{prefix} survey {i + 1}',
+                description='Synthetic survey generated by seed_data.',
+                created_by=teachers[i % len(teachers)],
+                survey_type=rng.choice(Survey.SURVEY_TYPE_CHOICES)[0],
+                is_active=True,
+            )
+            for i in range(count)
+        )
+        through = Survey.assigned_sections.through
+        links = []
+        for survey in surveys:
+            # Roughly a third of the surveys are assigned to everyone
+            if sections and rng.random() > 0.33:
+                chosen = rng.sample(sections, rng.randint(1, len(sections)))
+                survey.seed_sections = {section.id for section in chosen}
+                links.extend(through(survey_id=survey.id, section_id=section.id) for section in chosen)
+            else:
+                survey.seed_sections = None
+        through.objects.bulk_create(links, batch_size=BATCH_SIZE)
+        return surveys
+
+    def _seed_questions(self, rng, surveys, per_survey):
+        questions = Question.objects.bulk_create(
+            (
+                Question(
+                    survey=survey,
+                    text=f'Question {i + 1} of {survey.title}',
+                    question_type=QUESTION_TYPES[i % len(QUESTION_TYPES)],
+                    required=True,
+                )
+                for survey in surveys
+                for i in range(per_survey)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+        choices = []
+        for question in questions:
+            if question.question_type == 'text':
+                continue
+            correct = rng.randrange(CHOICES_PER_QUESTION)
+            choices.extend(
+                Choice(question=question, text=f'Option {c + 1}', is_correct=(c == correct))
+                for c in range(CHOICES_PER_QUESTION)
+            )
+        choices = Choice.objects.bulk_create(choices, batch_size=BATCH_SIZE)
+        by_question = {}
+        for choice in choices:
+            by_question.setdefault(choice.question_id, []).append(choice)
+        for question in questions:
+            question.seed_choices = by_question.get(question.id, [])
+        return questions
+
+    def _seed_responses(self, rng, surveys, sections, questions, students, per_survey):
+        questions_by_survey = {}
+        for question in questions:
+            questions_by_survey.setdefault(question.survey_id, []).append(question)
+        section_names = {section.id: section.name for section in sections}
+
+        total_responses = total_answers = 0
+        for survey in surveys:
+            eligible = [
+                student for student in students
+                if survey.seed_sections is None
+                or (student.seed_section and student.seed_section.id in survey.seed_sections)
+            ]
+            responders = rng.sample(eligible, min(per_survey, len(eligible)))
+            survey_questions = questions_by_survey.get(survey.id, [])
+            max_score = sum(1 for question in survey_questions if question.question_type == 'mcq')
+
+            # Answers are graded and snapshotted the way submit_survey does it,
+            # so seeded responses carry scores and history like real ones
+            submissions = []
+            for student in responders:
+                answers, snapshot = [], []
+                for question in survey_questions:
+                    correct_answer = None
+                    if question.seed_choices:
+                        choice = rng.choice(question.seed_choices)
+                        is_correct = choice.is_correct if question.question_type == 'mcq' else None
+                        if question.question_type == 'mcq':
+                            correct_answer = next(c.text for c in question.seed_choices if c.is_correct)
+                        answer = Answer(question=question, selected_choice_id=choice.id, is_correct=is_correct)
+                        value = choice.text
+                    else:
+                        is_correct = None
+                        value = f'Synthetic answer {rng.randrange(10000)}'
+                        answer = Answer(question=question, text_answer=value)
+                    answers.append(answer)
+                    snapshot.append({
+                        'question_id': question.id,
+                        'question': question.text,
+                        'question_type': question.question_type,
+                        'answer': value,
+                        'is_correct': is_correct,
+                        'correct_answer': correct_answer,
+                    })
+                correct = sum(1 for answer in answers if answer.is_correct)
+                response = Response(
+                    survey=survey, student=student, correct_count=correct, score=correct, max_score=max_score
+                )
+                submissions.append((response, answers, snapshot))
+
+            responses = Response.objects.bulk_create(
+                (response for response, _answers, _snapshot in submissions), batch_size=BATCH_SIZE
+            )
+            answers = []
+            for response, response_answers, _snapshot in submissions:
+                for answer in response_answers:
+                    answer.response = response
+                answers.extend(response_answers)
+            Answer.objects.bulk_create(answers, batch_size=BATCH_SIZE)
+
+            if survey.seed_sections:
+                sections_label = ', '.join(section_names[section_id] for section_id in sorted(survey.seed_sections))
+            else:
+                sections_label = 'All sections'
+            HistoryEntry.objects.bulk_create(
+                (
+                    HistoryEntry(
+                        response=response,
+                        student_id=response.student_id,
+                        survey=survey,
+                        survey_title=survey.title,
+                        survey_description=survey.description,
+                        survey_type=survey.get_survey_type_display() if survey.survey_type else '',
+                        sections=sections_label,
+                        submitted_at=response.submitted_at,
+                        score=response.score,
+                        max_score=response.max_score,
+                        answers=snapshot,
+                    )
+                    for response, _answers, snapshot in submissions
+                ),
+                batch_size=BATCH_SIZE,
+            )
+            total_responses += len(responses)
+            total_answers += len(answers)
+        return total_responses, total_answers
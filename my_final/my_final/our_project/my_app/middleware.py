@@ -0,0 +1,109 @@
+import logging
+import re
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+
+
+logger = logging.getLogger('my_app.query_budget')
+
+_IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+_LITERAL = re.compile(r"'(?:[^']|'')*'|\b\d+\b")
+
+
+def fingerprint(sql):
+    """Normalize a query so the same shape with different parameters compares equal."""
+    sql = _IN_LIST.sub('IN (...)', sql)
+    return _LITERAL.sub('?', sql)
+
+
+class QueryRecorder:
+    """``connection.execute_wrapper`` hook that times every query of a request."""
+
+    def __init__(self):
+        self.fingerprints = Counter()
+        self.db_time = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.fingerprints[fingerprint(sql)] += 1
+
+    @property
+    def query_count(self):
+        return sum(self.fingerprints.values())
+
+    def duplicates(self):
+        """Query shapes executed more than once, most repeated first."""
+        return [(sql, count) for sql, count in self.fingerprints.most_common() if count > 1]
+
+
+class QueryBudgetMiddleware:
+    """Opt-in per-request query instrumentation and N+1 detector.
+
+    Records the query count, duplicated query shapes, database time and
+    total time of each request, logs a warning on ``my_app.query_budget``
+    when ``settings.QUERY_BUDGET`` is exceeded, and adds an
+    ``X-Query-Budget`` header to responses when ``DEBUG`` is on. Streamed
+    responses are reported once their body has been sent, without the
+    header.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        start = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        if response.streaming:
+            # A streamed body (the CSV export) runs its queries while the
+            # server sends it, after this method returned, so the report
+            # waits until the body is consumed
+            response.streaming_content = self._recorded(response.streaming_content, recorder, request, start)
+            return response
+        total_ms, db_ms, duplicates = self._report(recorder, request, start)
+        if settings.DEBUG:
+            response['X-Query-Budget'] = (
+                f'queries={recorder.query_count}; duplicates={len(duplicates)}; '
+                f'db_ms={db_ms:.1f}; total_ms={total_ms:.1f}'
+            )
+        return response
+
+    def _recorded(self, content, recorder, request, start):
+        with connection.execute_wrapper(recorder):
+            yield from content
+        self._report(recorder, request, start)
+
+    def _report(self, recorder, request, start):
+        """Log a warning if the recorded queries exceed ``settings.QUERY_BUDGET``."""
+        budget = getattr(settings, 'QUERY_BUDGET', {})
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = recorder.db_time * 1000
+
+        duplicates = recorder.duplicates()
+        worst_repeat = duplicates[0][1] if duplicates else 0
+        match = getattr(request, 'resolver_match', None)
+        view_name = (match.view_name if match else None) or request.path
+
+        # A limit left out of the setting is not enforced
+        over_budget = (
+            recorder.query_count > budget.get('MAX_QUERIES', float('inf'))
+            or worst_repeat > budget.get('MAX_DUPLICATES', float('inf'))
+            or db_ms > budget.get('MAX_DB_MS', float('inf'))
+        )
+        if over_budget:
+            logger.warning(
+                "Query budget exceeded for %s: %d queries, %d repeated shapes, %.1f ms db, %.1f ms total",
+                view_name, recorder.query_count, len(duplicates), db_ms, total_ms,
+                extra={'duplicates': duplicates[:5]},
+            )
+            for sql, count in duplicates[:5]:
+                logger.warning("  %dx %s", count, sql)
+        return total_ms, db_ms, duplicates
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:23
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Exists, OuterRef
+
+
+def backfill_assigned_to_all(apps, schema_editor):
+    Survey = apps.get_model('my_app', 'Survey')
+    through = Survey.assigned_sections.through
+    Survey.objects.update(
+        assigned_to_all=~Exists(through.objects.filter(survey_id=OuterRef('pk')))
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0007_remove_survey_assigned_section_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='survey',
+            name='assigned_to_all',
+            field=models.BooleanField(default=True, editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['assigned_to_all', 'is_active'], name='survey_assigned_all_idx'),
+        ),
+        migrations.RunPython(backfill_assigned_to_all, migrations.RunPython.noop),
+    ]
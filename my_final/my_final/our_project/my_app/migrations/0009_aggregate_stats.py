@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:24
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_stats(apps, schema_editor):
+    Response = apps.get_model('my_app', 'Response')
+    Answer = apps.get_model('my_app', 'Answer')
+    SurveyStats = apps.get_model('my_app', 'SurveyStats')
+    QuestionStats = apps.get_model('my_app', 'QuestionStats')
+    ChoiceStats = apps.get_model('my_app', 'ChoiceStats')
+
+    SurveyStats.objects.bulk_create(
+        SurveyStats(survey_id=row['survey'], response_count=row['total'])
+        for row in Response.objects.values('survey').annotate(total=Count('id')).order_by()
+    )
+    ChoiceStats.objects.bulk_create(
+        ChoiceStats(choice_id=row['selected_choice'], selection_count=row['total'])
+        for row in Answer.objects.filter(selected_choice__isnull=False)
+        .values('selected_choice').annotate(total=Count('id')).order_by()
+    )
+    QuestionStats.objects.bulk_create(
+        QuestionStats(question_id=row['question'], correct_count=row['total'])
+        for row in Answer.objects.filter(question__question_type='mcq', selected_choice__is_correct=True)
+        .values('question').annotate(total=Count('id')).order_by()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0008_survey_assigned_to_all'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ChoiceStats',
+            fields=[
+                ('choice', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='my_app.choice')),
+                ('selection_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionStats',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='my_app.question')),
+                ('correct_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='SurveyStats',
+            fields=[
+                ('survey', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='my_app.survey')),
+                ('response_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(populate_stats, migrations.RunPython.noop),
+    ]
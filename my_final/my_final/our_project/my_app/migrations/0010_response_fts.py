@@ -0,0 +1,47 @@
+from django.db import migrations
+
+
+FTS_TABLE = 'my_app_response_fts'
+
+
+def create_response_fts(apps, schema_editor):
+    connection = schema_editor.connection
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT sqlite_compileoption_used('ENABLE_FTS5')")
+        if not cursor.fetchone()[0]:
+            return
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+            "USING fts5(username, first_name, last_name, email, answers)"
+        )
+        cursor.execute(
+            f"""
+            INSERT INTO {FTS_TABLE} (rowid, username, first_name, last_name, email, answers)
+            SELECT r.id, u.username, u.first_name, u.last_name, u.email,
+                   COALESCE((SELECT group_concat(a.text_answer, ' ')
+                             FROM my_app_answer a
+                             WHERE a.response_id = r.id AND a.text_answer IS NOT NULL), '')
+            FROM my_app_response r
+            JOIN auth_user u ON u.id = r.student_id
+            """
+        )
+
+
+def drop_response_fts(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(f"DROP TABLE IF EXISTS {FTS_TABLE}")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0009_aggregate_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_response_fts, drop_response_fts),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:39
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def grade_existing_responses(apps, schema_editor):
+    Answer = apps.get_model('my_app', 'Answer')
+    Choice = apps.get_model('my_app', 'Choice')
+    Question = apps.get_model('my_app', 'Question')
+    Response = apps.get_model('my_app', 'Response')
+
+    Answer.objects.filter(question__question_type='mcq', selected_choice__isnull=False).update(
+        is_correct=Subquery(Choice.objects.filter(pk=OuterRef('selected_choice_id')).values('is_correct')[:1])
+    )
+    correct = (
+        Answer.objects.filter(response=OuterRef('pk'), is_correct=True)
+        .values('response').annotate(total=Count('id')).values('total')
+    )
+    gradable = (
+        Question.objects.filter(survey=OuterRef('survey_id'), question_type='mcq')
+        .values('survey').annotate(total=Count('id')).values('total')
+    )
+    Response.objects.update(
+        correct_count=Coalesce(Subquery(correct), 0),
+        score=Coalesce(Subquery(correct), 0),
+        max_score=Coalesce(Subquery(gradable), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0010_response_fts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='answer',
+            name='is_correct',
+            field=models.BooleanField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='correct_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='max_score',
+            field=models.PositiveIntegerField(default=0, help_text='Number of multiple choice questions in the survey.'),
+        ),
+        migrations.AddField(
+            model_name='response',
+            name='score',
+            field=models.PositiveIntegerField(default=0, help_text='One point per correct multiple choice answer.'),
+        ),
+        migrations.RunPython(grade_existing_responses, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,83 @@
+# Generated by Django 5.2.18 on 2026-10-16 22:41
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def snapshot_existing_responses(apps, schema_editor):
+    Response = apps.get_model('my_app', 'Response')
+    Choice = apps.get_model('my_app', 'Choice')
+    HistoryEntry = apps.get_model('my_app', 'HistoryEntry')
+
+    correct_texts = {}
+    for question_id, text in (
+        Choice.objects.filter(is_correct=True, question__question_type='mcq')
+        .order_by('-id').values_list('question_id', 'text')
+    ):
+        correct_texts[question_id] = text
+
+    responses = (
+        Response.objects.select_related('survey')
+        .prefetch_related('answers__question', 'answers__selected_choice', 'survey__assigned_sections')
+        .order_by('id')
+    )
+    entries = []
+    for response in responses.iterator(chunk_size=500):
+        survey = response.survey
+        section_names = [section.name for section in survey.assigned_sections.all()]
+        answers = []
+        for answer in response.answers.all():
+            question = answer.question
+            answers.append({
+                'question': question.text,
+                'question_type': question.question_type,
+                'answer': answer.selected_choice.text if answer.selected_choice else (answer.text_answer or ''),
+                'is_correct': answer.is_correct,
+                'correct_answer': correct_texts.get(question.id) if question.question_type == 'mcq' else None,
+            })
+        entries.append(HistoryEntry(
+            response=response,
+            student_id=response.student_id,
+            survey=survey,
+            survey_title=survey.title,
+            survey_description=survey.description or '',
+            survey_type=survey.get_survey_type_display() if survey.survey_type else '',
+            sections=', '.join(section_names) if section_names else 'All sections',
+            submitted_at=response.submitted_at,
+            score=response.score,
+            max_score=response.max_score,
+            answers=answers,
+        ))
+    HistoryEntry.objects.bulk_create(entries, batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0011_response_score'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistoryEntry',
+            fields=[
+                ('response', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='history_entry', serialize=False, to='my_app.response')),
+                ('survey_title', models.CharField(max_length=255)),
+                ('survey_description', models.TextField(blank=True)),
+                ('survey_type', models.CharField(blank=True, max_length=50)),
+                ('sections', models.CharField(blank=True, max_length=500)),
+                ('submitted_at', models.DateTimeField()),
+                ('score', models.PositiveIntegerField(default=0)),
+                ('max_score', models.PositiveIntegerField(default=0)),
+                ('answers', models.JSONField(default=list)),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='history_entries', to=settings.AUTH_USER_MODEL)),
+                ('survey', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='my_app.survey')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['student', '-submitted_at'], name='history_student_recent_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_existing_responses, migrations.RunPython.noop),
+    ]
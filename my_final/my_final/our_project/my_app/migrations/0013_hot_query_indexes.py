@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:04
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0012_history_entry'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='choice',
+            index=models.Index(fields=['question', 'is_correct'], name='choice_question_correct_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['survey', '-submitted_at', '-id'], name='response_survey_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='response',
+            index=models.Index(fields=['student', '-submitted_at'], name='response_student_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['is_active', 'due_date'], name='survey_active_due_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='survey',
+            index=models.Index(fields=['created_by', '-created_at'], name='survey_owner_recent_idx'),
+        ),
+        # auth.User is not ours to add Meta indexes to; RegisterView looks users up by email
+        migrations.RunSQL(
+            'CREATE INDEX my_app_user_email_idx ON auth_user (email)',
+            'DROP INDEX my_app_user_email_idx',
+        ),
+    ]
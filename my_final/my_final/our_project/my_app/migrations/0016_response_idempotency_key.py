@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-16 23:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('my_app', '0015_job'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='response',
+            name='idempotency_key',
+            field=models.CharField(blank=True, editable=False, max_length=64, null=True),
+        ),
+    ]
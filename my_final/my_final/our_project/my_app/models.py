@@ -1,8 +1,20 @@
 from django.db import models
 from django.contrib.auth.models import User
-from django.db.models.signals import post_save
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q, Value
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
 from django.dispatch import receiver
 
+from .caching import (
+    ALL_SECTIONS,
+    bump_answers,
+    bump_roster,
+    bump_sections,
+    bump_student,
+    bump_surveys,
+    bump_teacher,
+)
+
 
 class Section(models.Model):
     name = models.CharField(max_length=100, unique=True)
@@ -25,12 +37,44 @@ class Profile(models.Model):
     role = models.CharField(max_length=10, choices=ROLE_CHOICES, default='student')
     section = models.ForeignKey(Section, on_delete=models.SET_NULL, null=True, blank=True, related_name='members')
 
+    class Meta:
+        indexes = [
+            # Students per section, for the completion matrix
+            models.Index(fields=['role', 'section'], name='profile_role_section_idx'),
+        ]
+
     def __str__(self):
         section_name = self.section.name if self.section else 'No Section'
         return f"{self.user.username} ({self.role} · {section_name})"
 
 
 # === SURVEY ===
+# Django writes ``flag=True`` as the bare column (``WHERE "is_active"``),
+# which SQLite cannot match against an index. Comparing with a Value keeps
+# the ``= 1`` form, so the boolean-led indexes below are searchable.
+INDEXABLE_TRUE = Value(True)
+
+
+class SurveyQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(is_active=INDEXABLE_TRUE)
+
+    def open_on(self, day):
+        """Active surveys without a due date or due on/after ``day``."""
+        return self.active().filter(Q(due_date__isnull=True) | Q(due_date__gte=day))
+
+    def visible_to_section(self, section):
+        """Surveys assigned to ``section`` or to all sections, in one query."""
+        visible = Q(assigned_to_all=INDEXABLE_TRUE)
+        if section is not None:
+            visible |= Q(
+                id__in=Survey.assigned_sections.through.objects.filter(
+                    section_id=getattr(section, 'pk', section)
+                ).values('survey_id')
+            )
+        return self.filter(visible)
+
+
 class Survey(models.Model):
     SURVEY_TYPE_CHOICES = [
         ('multiple_choice', 'Multiple Choice'),
@@ -44,8 +88,19 @@ class Survey(models.Model):
     survey_type = models.CharField(max_length=20, choices=SURVEY_TYPE_CHOICES, null=True, blank=True)
     due_date = models.DateField(null=True, blank=True)
     is_active = models.BooleanField(default=True)
+    # Denormalized "no assigned_sections" flag, kept in sync by signals below
+    assigned_to_all = models.BooleanField(default=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    objects = SurveyQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['assigned_to_all', 'is_active'], name='survey_assigned_all_idx'),
+            models.Index(fields=['is_active', 'due_date'], name='survey_active_due_idx'),
+            models.Index(fields=['created_by', '-created_at'], name='survey_owner_recent_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -72,6 +127,11 @@ class Choice(models.Model):
     text = models.CharField(max_length=200)
     is_correct = models.BooleanField(default=False, help_text="Mark this choice as the correct answer")
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['question', 'is_correct'], name='choice_question_correct_idx'),
+        ]
+
     def __str__(self):
         return self.text
 
@@ -81,9 +141,20 @@ class Response(models.Model):
     survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='responses')
     student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='responses')
     submitted_at = models.DateTimeField(auto_now_add=True)
+    # Grading, computed once when the submission is written (see services.py)
+    correct_count = models.PositiveIntegerField(default=0)
+    score = models.PositiveIntegerField(default=0, help_text="One point per correct multiple choice answer.")
+    max_score = models.PositiveIntegerField(default=0, help_text="Number of multiple choice questions in the survey.")
+    # Sent by the client with the submission; a retry with the same key gets this response back
+    idempotency_key = models.CharField(max_length=64, null=True, blank=True, editable=False)
 
     class Meta:
         unique_together = ('survey', 'student')  # one response per survey per student
+        indexes = [
+            # The responses page pages through (-submitted_at, -id) per survey
+            models.Index(fields=['survey', '-submitted_at', '-id'], name='response_survey_recent_idx'),
+            models.Index(fields=['student', '-submitted_at'], name='response_student_recent_idx'),
+        ]
 
     def __str__(self):
         return f"{self.student.username} - {self.survey.title}"
@@ -95,37 +166,121 @@ class Answer(models.Model):
     question = models.ForeignKey(Question, on_delete=models.CASCADE)
     selected_choice = models.ForeignKey(Choice, on_delete=models.SET_NULL, null=True, blank=True)
     text_answer = models.TextField(blank=True, null=True)
+    # True/False for multiple choice answers, None for text/likert; set at submit time
+    is_correct = models.BooleanField(null=True, blank=True)
 
     def __str__(self):
         return f"Answer for {self.question.text[:30]}"
-    
-    @property
-    def is_correct(self):
-        """Check if the answer is correct (only for multiple choice questions)."""
-        if self.question.question_type == 'mcq' and self.selected_choice:
-            return self.selected_choice.is_correct
-        # For text/likert questions, we don't mark as correct/incorrect
-        return None
-    
-    @property
-    def correct_answer(self):
-        """Get the correct answer for this question (only for multiple choice)."""
-        if self.question.question_type == 'mcq':
-            correct_choice = self.question.choices.filter(is_correct=True).first()
-            return correct_choice.text if correct_choice else None
-        return None
+
+
+# === STUDENT HISTORY READ MODEL ===
+class HistoryEntry(models.Model):
+    """Snapshot of a submission as the student saw it, written once at submit time.
+
+    Holds everything the history page and its JSON feed render, so a
+    student's history is served by one indexed read with no joins.
+    """
+    response = models.OneToOneField(Response, on_delete=models.CASCADE, primary_key=True, related_name='history_entry')
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='history_entries')
+    survey = models.ForeignKey(Survey, on_delete=models.CASCADE, related_name='+')
+    survey_title = models.CharField(max_length=255)
+    survey_description = models.TextField(blank=True)
+    survey_type = models.CharField(max_length=50, blank=True)
+    sections = models.CharField(max_length=500, blank=True)
+    submitted_at = models.DateTimeField()
+    score = models.PositiveIntegerField(default=0)
+    max_score = models.PositiveIntegerField(default=0)
+    # [{question, question_type, answer, is_correct, correct_answer}, ...]
+    answers = models.JSONField(default=list)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['student', '-submitted_at'], name='history_student_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.student_id} - {self.survey_title}"
+
+
+# === AGGREGATE COUNTERS (maintained on submission, see services.py) ===
+class SurveyStats(models.Model):
+    survey = models.OneToOneField(Survey, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    response_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.survey_id}: {self.response_count} responses"
+
+
+class QuestionStats(models.Model):
+    question = models.OneToOneField(Question, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    correct_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.question_id}: {self.correct_count} correct"
+
+
+class ChoiceStats(models.Model):
+    choice = models.OneToOneField(Choice, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    selection_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.choice_id}: {self.selection_count} selections"
+
+
+# === BACKGROUND JOBS (see jobs.py) ===
+class Job(models.Model):
+    """A unit of long-running work handed from a view to a ``run_jobs`` worker."""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='queued')
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, null=True, blank=True, related_name='jobs')
+    progress = models.PositiveIntegerField(default=0)
+    total = models.PositiveIntegerField(default=0)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Doubles as the worker heartbeat: every progress report moves it forward
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'id'], name='job_status_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
 
 
 # Ensure a Profile exists for each User. This prevents AttributeError in admin/views
 @receiver(post_save, sender=User)
-def create_or_update_user_profile(sender, instance, created, **kwargs):
+def create_or_update_user_profile(sender, instance, created, update_fields=None, **kwargs):
     """Create a Profile automatically when a User is created.
 
-    If the Profile is missing for existing users, create it. This keeps
-    `request.user.profile` safe to access in views and admin.
+    Callers that already know the role and section can attach an unsaved
+    Profile as ``user.pending_profile`` before the first save, so the
+    profile is inserted once with the right values instead of being
+    created and then updated. If the Profile is missing for existing
+    users, create it. This keeps `request.user.profile` safe to access in
+    views and admin.
     """
     if created:
-        Profile.objects.create(user=instance)
+        profile = getattr(instance, 'pending_profile', None) or Profile()
+        profile.user = instance
+        profile.save()
+        return
+
+    # Partial saves (such as the last_login update on every login) never
+    # change anything the profile depends on. Reading the relation would
+    # cost a query, so a missing profile is left to LoginView.
+    if update_fields is not None:
         return
 
     # For existing users, try to save the profile if it exists; otherwise create it.
@@ -133,3 +288,187 @@ def create_or_update_user_profile(sender, instance, created, **kwargs):
         instance.profile.save()
     except Profile.DoesNotExist:
         Profile.objects.create(user=instance)
+
+
+# Keep Survey.assigned_to_all in sync with the assigned_sections relation.
+def refresh_assigned_to_all(survey_ids):
+    """Recompute ``assigned_to_all`` for the given surveys with one UPDATE."""
+    through = Survey.assigned_sections.through
+    Survey.objects.filter(id__in=survey_ids).update(
+        assigned_to_all=~Exists(through.objects.filter(survey_id=OuterRef('pk')))
+    )
+
+
+@receiver(m2m_changed, sender=Survey.assigned_sections.through)
+def sync_survey_assignment(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == 'pre_clear' and reverse:
+        # Remember which surveys lose this section before the rows disappear
+        instance._cleared_survey_ids = list(
+            sender.objects.filter(section_id=instance.pk).values_list('survey_id', flat=True)
+        )
+        return
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+
+    if not reverse:
+        survey_ids = [instance.pk]
+    elif action == 'post_clear':
+        survey_ids = getattr(instance, '_cleared_survey_ids', [])
+    else:
+        survey_ids = list(pk_set or [])
+    if survey_ids:
+        refresh_assigned_to_all(survey_ids)
+
+
+@receiver(pre_delete, sender=Section)
+def remember_section_surveys(sender, instance, **kwargs):
+    instance._cleared_survey_ids = list(instance.surveys.values_list('id', flat=True))
+
+
+@receiver(post_delete, sender=Section)
+def sync_surveys_after_section_delete(sender, instance, **kwargs):
+    survey_ids = getattr(instance, '_cleared_survey_ids', [])
+    if survey_ids:
+        refresh_assigned_to_all(survey_ids)
+
+
+# Keep the response full-text index in step with student identity changes.
+@receiver(post_save, sender=User)
+def reindex_student_responses(sender, instance, created, update_fields=None, **kwargs):
+    if created:
+        return
+    if update_fields is not None and not {'username', 'first_name', 'last_name', 'email'} & set(update_fields):
+        return
+    from .search import reindex_student
+    reindex_student(instance.pk)
+
+
+# === DASHBOARD CACHE INVALIDATION (see caching.py) ===
+def _bump_now_and_on_commit(func, *args):
+    # Bump immediately so this request sees its own change, and again after
+    # commit so a concurrent reader cannot re-cache pre-commit data.
+    func(*args)
+    transaction.on_commit(lambda: func(*args))
+
+
+def survey_audience(survey_id):
+    """Section ids whose students can see the survey, or ``[ALL_SECTIONS]``."""
+    section_ids = list(
+        Survey.assigned_sections.through.objects.filter(survey_id=survey_id).values_list('section_id', flat=True)
+    )
+    return section_ids or [ALL_SECTIONS]
+
+
+@receiver(post_save, sender=Survey)
+@receiver(pre_delete, sender=Survey)
+def invalidate_survey_dashboards(sender, instance, **kwargs):
+    _bump_now_and_on_commit(bump_teacher, instance.created_by_id)
+    _bump_now_and_on_commit(bump_sections, *survey_audience(instance.pk))
+
+
+@receiver(m2m_changed, sender=Survey.assigned_sections.through)
+def invalidate_assignment_dashboards(sender, instance, action, reverse, **kwargs):
+    if reverse:
+        # section.surveys changes are rare; refresh that section and the shared scope
+        if action.startswith('post_'):
+            _bump_now_and_on_commit(bump_sections, instance.pk, ALL_SECTIONS)
+        return
+    if action.startswith('pre_'):
+        instance._old_audience = survey_audience(instance.pk)
+        return
+    audience = set(getattr(instance, '_old_audience', [ALL_SECTIONS])) | set(survey_audience(instance.pk))
+    _bump_now_and_on_commit(bump_sections, *audience)
+    _bump_now_and_on_commit(bump_teacher, instance.created_by_id)
+
+
+def _deleted_with_survey(origin):
+    # Cascades from a Survey delete are covered by invalidate_survey_dashboards
+    model = getattr(origin, 'model', type(origin))
+    return model is Survey
+
+
+def bump_survey_sections(survey_id):
+    """Invalidate the student dashboards of every section that can see the survey."""
+    _bump_now_and_on_commit(bump_sections, *survey_audience(survey_id))
+
+
+def bump_created_surveys(teacher_id, audience):
+    """Invalidate dashboards after surveys were bulk created, which skips the signals.
+
+    ``audience`` holds the section ids (or ``ALL_SECTIONS``) that can see the new surveys.
+    """
+    _bump_now_and_on_commit(bump_teacher, teacher_id)
+    if audience:
+        _bump_now_and_on_commit(bump_sections, *audience)
+
+
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_question_dashboards(sender, instance, origin=None, **kwargs):
+    if _deleted_with_survey(origin):
+        return
+    bump_survey_sections(instance.survey_id)
+
+
+def bump_teacher_dashboards(teacher_ids):
+    """Invalidate the given teachers' dashboards after bulk counter writes."""
+    for teacher_id in set(teacher_ids):
+        _bump_now_and_on_commit(bump_teacher, teacher_id)
+
+
+# Counters are folded in at submit time (services.record_submission_stats),
+# so a deleted response has to be taken back out. A survey delete removes
+# its counters with it.
+@receiver(pre_delete, sender=Response)
+def uncount_deleted_response(sender, instance, origin=None, **kwargs):
+    if _deleted_with_survey(origin):
+        return
+    from .services import forget_submission_stats  # services imports this module
+    forget_submission_stats(instance)
+
+
+@receiver(post_save, sender=Response)
+@receiver(post_delete, sender=Response)
+def invalidate_response_dashboards(sender, instance, origin=None, **kwargs):
+    _bump_now_and_on_commit(bump_student, instance.student_id)
+    if not _deleted_with_survey(origin):
+        _bump_now_and_on_commit(bump_teacher, instance.survey.created_by_id)
+
+
+# === SURVEY STRUCTURE CACHE (see structure.py) ===
+def bump_survey_structures(*survey_ids):
+    """Invalidate the cached question structure of the given surveys."""
+    _bump_now_and_on_commit(bump_surveys, *survey_ids)
+
+
+# Choices are always written together with their question (the builder
+# views save the question in the same transaction, so the on-commit bump
+# lands after the choices) or by bulk paths that call
+# bump_survey_structures themselves.
+@receiver(post_save, sender=Survey)
+@receiver(post_save, sender=Question)
+@receiver(post_delete, sender=Question)
+def invalidate_survey_structure(sender, instance, **kwargs):
+    bump_survey_structures(instance.pk if sender is Survey else instance.survey_id)
+
+
+# === TEXT SUMMARY CACHE (see text_analytics.py) ===
+# Summaries only ever fold in new answers, so removing answers has to drop them
+@receiver(post_delete, sender=Response)
+def invalidate_text_summaries(sender, instance, origin=None, **kwargs):
+    if not _deleted_with_survey(origin):
+        _bump_now_and_on_commit(bump_answers, instance.survey_id)
+
+
+# === ROSTER CACHE (see analytics.completion_matrix) ===
+def bump_roster_reports():
+    """Invalidate reports that count students per section, after bulk roster writes."""
+    _bump_now_and_on_commit(bump_roster)
+
+
+@receiver(post_save, sender=Profile)
+@receiver(post_delete, sender=Profile)
+@receiver(post_save, sender=Section)
+@receiver(post_delete, sender=Section)
+def invalidate_roster_reports(sender, instance, **kwargs):
+    bump_roster_reports()
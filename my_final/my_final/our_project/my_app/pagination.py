@@ -0,0 +1,84 @@
+import base64
+from datetime import datetime
+
+from django.db.models import Q
+
+
+class KeysetPage:
+    """One page of a keyset-paginated queryset, newest first.
+
+    Pages are addressed by an opaque cursor built from the
+    ``(submitted_at, id)`` of a boundary row, so fetching page 1000 costs the
+    same as page 1 and pages do not shift when new rows are inserted.
+    """
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next = has_next
+        self.has_previous = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_other_pages(self):
+        return self.has_next or self.has_previous
+
+    @property
+    def next_cursor(self):
+        return encode_cursor(self.object_list[-1]) if self.has_next and self.object_list else ''
+
+    @property
+    def previous_cursor(self):
+        return encode_cursor(self.object_list[0]) if self.has_previous and self.object_list else ''
+
+
+def encode_cursor(obj):
+    raw = f'{obj.submitted_at.isoformat()}|{obj.pk}'
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return ``(submitted_at, id)`` for a cursor, or ``None`` if it is malformed."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        timestamp, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (ValueError, UnicodeDecodeError):
+        return None
+
+
+def keyset_paginate(queryset, cursor='', direction='next', per_page=10):
+    """Return the page after (``next``) or before (``prev``) ``cursor``.
+
+    ``queryset`` must expose ``submitted_at``; rows are ordered by
+    ``(-submitted_at, -id)``. An empty or malformed cursor yields the newest page.
+    """
+    position = decode_cursor(cursor) if cursor else None
+    if position is None:
+        return _first_page(queryset, per_page)
+
+    submitted_at, pk = position
+    if direction == 'prev':
+        newer = Q(submitted_at__gt=submitted_at) | Q(submitted_at=submitted_at, id__gt=pk)
+        rows = list(queryset.filter(newer).order_by('submitted_at', 'id')[:per_page + 1])
+        if not rows:
+            return _first_page(queryset, per_page)
+        has_previous = len(rows) > per_page
+        rows = rows[:per_page]
+        rows.reverse()
+        return KeysetPage(rows, has_next=True, has_previous=has_previous)
+
+    older = Q(submitted_at__lt=submitted_at) | Q(submitted_at=submitted_at, id__lt=pk)
+    rows = list(queryset.filter(older).order_by('-submitted_at', '-id')[:per_page + 1])
+    return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=True)
+
+
+def _first_page(queryset, per_page):
+    rows = list(queryset.order_by('-submitted_at', '-id')[:per_page + 1])
+    return KeysetPage(rows[:per_page], has_next=len(rows) > per_page, has_previous=False)
@@ -0,0 +1,99 @@
+"""EXPLAIN QUERY PLAN audit of the queries every route runs.
+
+Each route in ``benchmark.ROUTE_PLANS`` is requested once (writes rolled
+back) while its queries are captured. Every captured SELECT is then run
+through SQLite's ``EXPLAIN QUERY PLAN``, and any step that scans a whole
+table instead of searching an index is reported. Used by the test suite
+to catch a missing or unusable index before it reaches production.
+"""
+import re
+
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+
+from .benchmark import ROUTE_PLANS, BenchmarkContext, _Rollback, scratch_job_output
+from .urls import urlpatterns
+
+
+# "SCAN my_app_survey" or "SCAN my_app_survey USING INDEX ..." (a full index walk)
+_FULL_SCAN = re.compile(r'^SCAN (?!CONSTANT ROW|SUBQUERY)(\S+)')
+
+# Tables that are meant to be read whole (tiny lookup tables listed in forms)
+FULL_SCAN_ALLOWED = {
+    'my_app_section',
+}
+
+
+def explain(sql, params=()):
+    """Return the ``detail`` column of SQLite's query plan for ``sql``."""
+    with connection.cursor() as cursor:
+        cursor.execute(f'EXPLAIN QUERY PLAN {sql}', params)
+        return [row[-1] for row in cursor.fetchall()]
+
+
+def full_scans(sql, params=()):
+    """Tables (not in ``FULL_SCAN_ALLOWED``) that ``sql`` reads with a full scan."""
+    scans = []
+    for detail in explain(sql, params):
+        match = _FULL_SCAN.match(detail)
+        if match and match.group(1) not in FULL_SCAN_ALLOWED:
+            scans.append(detail)
+    return scans
+
+
+def queryset_full_scans(queryset):
+    sql, params = queryset.query.sql_with_params()
+    return full_scans(sql, params)
+
+
+@scratch_job_output()
+def audit_routes(routes=None):
+    """Request every planned route once; returns ``{route: [(sql, scans), ...]}`` for offenders."""
+    if connection.vendor != 'sqlite':
+        raise ValueError("The query plan audit needs SQLite's EXPLAIN QUERY PLAN.")
+    context = BenchmarkContext()
+    clients = {None: Client(HTTP_HOST='localhost')}
+    for role, user in (
+        ('teacher', context.teacher),
+        ('student', context.student),
+        ('new_student', context.new_student),
+    ):
+        clients[role] = Client(HTTP_HOST='localhost')
+        clients[role].force_login(user)
+
+    offenders = {}
+    for name in [pattern.name for pattern in urlpatterns if pattern.name]:
+        if name not in ROUTE_PLANS or (routes and name not in routes):
+            continue
+        method, role, needs = ROUTE_PLANS[name]
+        data = context.post_data(name)
+        client = Client(HTTP_HOST='localhost') if name in ('login', 'register', 'logout') else clients[role]
+        if name == 'logout':
+            client.force_login(context.student)
+        try:
+            with transaction.atomic():
+                url = context.url_for(name, needs)
+                with CaptureQueriesContext(connection) as queries:
+                    if method == 'POST' and isinstance(data, str):
+                        client.post(url, data, content_type='application/json')
+                    elif method == 'POST':
+                        client.post(url, data)
+                    else:
+                        response = client.get(url)
+                        if response.streaming:
+                            for _chunk in response.streaming_content:
+                                pass
+                problems = []
+                for query in queries.captured_queries:
+                    sql = query['sql']
+                    if sql.lstrip().upper().startswith('SELECT'):
+                        scans = full_scans(sql)
+                        if scans:
+                            problems.append((sql, scans))
+                raise _Rollback()
+        except _Rollback:
+            pass
+        if problems:
+            offenders[name] = problems
+    return offenders
@@ -0,0 +1,99 @@
+import re
+
+from django.db import connection
+from django.db.models import Exists, OuterRef, Q
+from django.db.models.expressions import RawSQL
+
+from .models import Answer
+
+
+# SQLite FTS5 table holding one row per Response (rowid = response id),
+# created by migration 0010. Other databases fall back to icontains lookups.
+FTS_TABLE = 'my_app_response_fts'
+
+STUDENT_FIELDS = ('username', 'first_name', 'last_name', 'email')
+
+_INDEX_SQL = f"""
+    INSERT INTO {FTS_TABLE} (rowid, username, first_name, last_name, email, answers)
+    SELECT r.id, u.username, u.first_name, u.last_name, u.email,
+           COALESCE((SELECT group_concat(a.text_answer, ' ')
+                     FROM my_app_answer a
+                     WHERE a.response_id = r.id AND a.text_answer IS NOT NULL), '')
+    FROM my_app_response r
+    JOIN auth_user u ON u.id = r.student_id
+"""
+
+_fts_available = {}
+
+
+def fts_available():
+    """Whether the current database has the response full-text index."""
+    key = (connection.alias, str(connection.settings_dict['NAME']))
+    if key not in _fts_available:
+        _fts_available[key] = (
+            connection.vendor == 'sqlite'
+            and FTS_TABLE in connection.introspection.table_names()
+        )
+    return _fts_available[key]
+
+
+def build_match_query(search_query):
+    """Turn free text into an FTS5 query where every word is a quoted prefix."""
+    terms = re.findall(r'\w+', search_query)
+    return ' '.join(f'"{term}"*' for term in terms)
+
+
+def index_new_response(response_id):
+    """Add a freshly submitted response to the index with a single INSERT."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'{_INDEX_SQL} WHERE r.id = %s', [response_id])
+
+
+def reindex_student(user_id):
+    """Refresh the index rows of every response submitted by ``user_id``."""
+    if not fts_available():
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+            f'(SELECT id FROM my_app_response WHERE student_id = %s)',
+            [user_id],
+        )
+        cursor.execute(f'{_INDEX_SQL} WHERE r.student_id = %s', [user_id])
+
+
+def rebuild_search_index():
+    """Drop and repopulate the whole index; returns the number of indexed responses."""
+    if not fts_available():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+        cursor.execute(_INDEX_SQL)
+        cursor.execute(f'SELECT count(*) FROM {FTS_TABLE}')
+        return cursor.fetchone()[0]
+
+
+def search_responses(responses, search_query):
+    """Restrict a Response queryset to rows matching ``search_query``.
+
+    On SQLite the match runs against the FTS5 index, so it never scans the
+    user or answer tables. Elsewhere the student fields and short-answer
+    text are matched with ``icontains``.
+    """
+    if fts_available():
+        match = build_match_query(search_query)
+        if not match:
+            return responses.none()
+        return responses.filter(
+            id__in=RawSQL(f'SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s', [match])
+        )
+
+    matches_student = Q()
+    for field in STUDENT_FIELDS:
+        matches_student |= Q(**{f'student__{field}__icontains': search_query})
+    matches_answer = Exists(
+        Answer.objects.filter(response=OuterRef('pk'), text_answer__icontains=search_query)
+    )
+    return responses.filter(matches_student | matches_answer)
@@ -0,0 +1,788 @@
+import random
+import time
+from datetime import datetime
+
+from django.db import IntegrityError, OperationalError, connection, transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .caching import ALL_SECTIONS
+from .models import (
+    INDEXABLE_TRUE,
+    Answer,
+    Choice,
+    ChoiceStats,
+    HistoryEntry,
+    Question,
+    QuestionStats,
+    Response,
+    Section,
+    Survey,
+    SurveyStats,
+    bump_created_surveys,
+    bump_survey_sections,
+    bump_survey_structures,
+    bump_teacher_dashboards,
+    refresh_assigned_to_all,
+)
+from .search import index_new_response, search_responses
+from .structure import get_survey_structure
+
+
+CHOICE_QUESTION_TYPES = ('mcq', 'likert')
+
+# Bounded retries for transactions that lose a SQLite write-lock race
+LOCK_RETRY_ATTEMPTS = 5
+LOCK_RETRY_DELAY = 0.05  # seconds, doubled (with jitter) on every attempt
+
+# Responses regraded per transaction
+REGRADE_BATCH_SIZE = 500
+
+
+class AlreadySubmitted(Exception):
+    """Raised when a student submits a survey they already answered.
+
+    ``response`` is the stored submission.
+    """
+
+    def __init__(self, response=None):
+        super().__init__()
+        self.response = response
+
+
+# === LOCK RETRIES ===
+
+def _is_lock_error(error):
+    message = str(error).lower()
+    return 'database is locked' in message or 'database table is locked' in message
+
+
+def retry_when_locked(func, attempts=LOCK_RETRY_ATTEMPTS, delay=LOCK_RETRY_DELAY):
+    """Call ``func`` (which opens its own transaction), retrying while SQLite is locked.
+
+    The busy timeout already makes writers wait for each other; this
+    covers the cases it cannot, such as a timeout under a long storm.
+    Retries back off exponentially with jitter so colliding writers
+    spread out. Nothing is retried inside an outer transaction, whose
+    earlier work the failed attempt would have rolled back too.
+    """
+    for attempt in range(attempts):
+        try:
+            return func()
+        except OperationalError as e:
+            if not _is_lock_error(e) or connection.in_atomic_block or attempt == attempts - 1:
+                raise
+        time.sleep(delay * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+# === SURVEY SUBMISSION ===
+
+def _parse_id(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def submit_survey(survey, student, data, idempotency_key=None):
+    """Store a student's answers to ``survey`` in a single transaction.
+
+    ``data`` is a mapping such as ``request.POST`` holding one
+    ``question_<id>`` entry per answered question. Submitted choices are
+    validated against the survey's cached structure (see structure.py) and
+    every ``Answer`` is written with one bulk insert, so the number of
+    queries does not depend on the number of questions. Unknown choices and blank text
+    answers are skipped. Each answer's correctness and the response's
+    score are computed here and stored, so readers never regrade.
+
+    There is no "already submitted?" pre-check: the Response is inserted
+    first and the unique (survey, student) constraint rejects a duplicate
+    before any answer is written. A repeat carrying the same
+    ``idempotency_key`` as the stored submission (a double click or a
+    client retry) returns that submission with ``replayed = True``; any
+    other repeat raises ``AlreadySubmitted``.
+    """
+
+    # Questions, choices and correct answers come from the cached structure
+    questions = get_survey_structure(survey.id)['questions']
+
+    answers = []
+    snapshot = []
+    selected_choice_ids = []
+    correct_question_ids = []
+    max_score = 0
+    for question in questions:
+        question_type = question['question_type']
+        if question_type == 'mcq':
+            max_score += 1
+        raw_value = data.get(f"question_{question['id']}")
+        if question_type in CHOICE_QUESTION_TYPES:
+            choice_id = _parse_id(raw_value)
+            choice = next((c for c in question['choices'] if c['id'] == choice_id), None)
+            if choice is None:
+                continue
+            is_correct = None
+            if question_type == 'mcq':
+                is_correct = choice['is_correct']
+                if is_correct:
+                    correct_question_ids.append(question['id'])
+            answers.append(
+                Answer(question_id=question['id'], selected_choice_id=choice_id, is_correct=is_correct)
+            )
+            selected_choice_ids.append(choice_id)
+            value = choice['text']
+        else:
+            value = (raw_value or '').strip()
+            if not value:
+                continue
+            is_correct = None
+            answers.append(Answer(question_id=question['id'], text_answer=value))
+        snapshot.append({
+            'question_id': question['id'],
+            'question': question['text'],
+            'question_type': question_type,
+            'answer': value,
+            'is_correct': is_correct,
+            'correct_answer': question['correct_text'] if question_type == 'mcq' else None,
+        })
+
+    def store():
+        with transaction.atomic():
+            response = Response.objects.create(
+                survey=survey,
+                student=student,
+                correct_count=len(correct_question_ids),
+                score=len(correct_question_ids),
+                max_score=max_score,
+                idempotency_key=idempotency_key,
+            )
+            for answer in answers:
+                # A retried attempt must not reuse ids from the rolled back one
+                answer.pk = None
+                answer.response = response
+            Answer.objects.bulk_create(answers)
+            record_submission_stats(survey.id, selected_choice_ids, correct_question_ids)
+            index_new_response(response.id)
+            write_history_entry(response, survey, snapshot)
+        return response
+
+    # Everything above only reads, so just the write transaction is retried
+    try:
+        response = retry_when_locked(store)
+    except IntegrityError:
+        existing = Response.objects.filter(survey=survey, student=student).first()
+        if existing is None:
+            raise
+        if idempotency_key is None or existing.idempotency_key != idempotency_key:
+            raise AlreadySubmitted(existing)
+        existing.replayed = True
+        return existing
+    response.replayed = False
+    return response
+
+
+def write_history_entry(response, survey, answers):
+    """Write the immutable history snapshot of a just-created response."""
+    section_names = list(survey.assigned_sections.values_list('name', flat=True))
+    return HistoryEntry.objects.create(
+        response=response,
+        student_id=response.student_id,
+        survey=survey,
+        survey_title=survey.title,
+        survey_description=survey.description or '',
+        survey_type=survey.get_survey_type_display() if survey.survey_type else '',
+        sections=', '.join(section_names) if section_names else 'All sections',
+        submitted_at=response.submitted_at,
+        score=response.score,
+        max_score=response.max_score,
+        answers=answers,
+    )
+
+
+# === SURVEY BUILDER ===
+
+class InvalidQuestionSet(Exception):
+    """Raised when a submitted question set cannot be applied to a survey."""
+
+
+def _clean_question_set(payload):
+    """Validate the builder payload and return it as a list of normalized dicts."""
+    if not isinstance(payload, list):
+        raise InvalidQuestionSet("Expected a list of questions.")
+    valid_types = {value for value, _label in Question.QUESTION_TYPES}
+    cleaned = []
+    for position, item in enumerate(payload, start=1):
+        if not isinstance(item, dict):
+            raise InvalidQuestionSet(f"Question {position} must be an object.")
+        text = str(item.get('text') or '').strip()
+        question_type = item.get('question_type') or 'text'
+        if not text:
+            raise InvalidQuestionSet(f"Question {position} has no text.")
+        if question_type not in valid_types:
+            raise InvalidQuestionSet(f"Question {position} has an unknown type '{question_type}'.")
+        choices = []
+        if question_type in CHOICE_QUESTION_TYPES:
+            for choice in item.get('choices') or []:
+                if not isinstance(choice, dict):
+                    raise InvalidQuestionSet(f"Choices of question {position} must be objects.")
+                choice_text = str(choice.get('text') or '').strip()
+                if choice_text:
+                    choices.append({
+                        'id': choice.get('id'),
+                        'text': choice_text,
+                        'is_correct': bool(choice.get('is_correct')),
+                    })
+        cleaned.append({
+            'id': item.get('id'),
+            'text': text,
+            'question_type': question_type,
+            'required': bool(item.get('required', True)),
+            'choices': choices,
+        })
+    return cleaned
+
+
+def _changed(instance, values):
+    """Copy ``values`` onto ``instance``; return whether any field differed."""
+    changed = False
+    for field, value in values.items():
+        if getattr(instance, field) != value:
+            setattr(instance, field, value)
+            changed = True
+    return changed
+
+
+def save_survey_questions(survey, payload):
+    """Make ``survey``'s questions and choices match ``payload`` in one transaction.
+
+    ``payload`` is the builder's full question set: a list of
+    ``{id?, text, question_type, required, choices: [{id?, text, is_correct}]}``.
+    Items with an ``id`` update the stored row, items without one are
+    inserted, and stored rows missing from the payload are deleted. Rows
+    that did not change are not written, so unchanged choices keep their
+    ids and the answers pointing at them. Each kind of write is a single
+    bulk statement. Returns the saved questions in payload order.
+    """
+    items = _clean_question_set(payload)
+
+    with transaction.atomic():
+        stored_questions = {
+            question.id: question
+            for question in Question.objects.filter(survey=survey)
+        }
+        stored_choices = {
+            choice.id: choice
+            for choice in Choice.objects.filter(question__survey=survey)
+        }
+
+        questions, new_questions, changed_questions = [], [], []
+        # Stored questions whose answers may now be graded differently
+        regrade_ids = set()
+        for item in items:
+            values = {key: item[key] for key in ('text', 'question_type', 'required')}
+            if item['id'] is None:
+                question = Question(survey=survey, **values)
+                new_questions.append(question)
+            else:
+                question = stored_questions.pop(_parse_id(item['id']), None)
+                if question is None:
+                    raise InvalidQuestionSet(f"Question {item['id']} does not belong to this survey.")
+                if question.question_type != values['question_type']:
+                    regrade_ids.add(question.id)
+                if _changed(question, values):
+                    changed_questions.append(question)
+            questions.append(question)
+
+        # Whatever is left over was removed in the builder; the delete
+        # cascades to its choices, answers and counters
+        if stored_questions:
+            Question.objects.filter(id__in=stored_questions).delete()
+            # Answers to a deleted mcq question no longer count towards scores
+            regrade_ids.update(
+                question.id for question in stored_questions.values() if question.question_type == 'mcq'
+            )
+        Question.objects.bulk_create(new_questions)
+        Question.objects.bulk_update(changed_questions, ['text', 'question_type', 'required'])
+
+        kept_choice_ids = set()
+        new_choices, changed_choices = [], []
+        for question, item in zip(questions, items):
+            question.saved_choices = []
+            for choice_item in item['choices']:
+                values = {'text': choice_item['text'], 'is_correct': choice_item['is_correct']}
+                if choice_item['id'] is None:
+                    choice = Choice(question=question, **values)
+                    new_choices.append(choice)
+                else:
+                    choice_id = _parse_id(choice_item['id'])
+                    choice = stored_choices.get(choice_id)
+                    if choice is None or choice.question_id != question.id or choice_id in kept_choice_ids:
+                        raise InvalidQuestionSet(
+                            f"Choice {choice_item['id']} does not belong to question {question.id}."
+                        )
+                    kept_choice_ids.add(choice_id)
+                    if choice.is_correct != values['is_correct']:
+                        regrade_ids.add(question.id)
+                    if _changed(choice, values):
+                        changed_choices.append(choice)
+                question.saved_choices.append(choice)
+
+        removed_choice_ids = [
+            choice.id for choice in stored_choices.values()
+            if choice.id not in kept_choice_ids and choice.question_id not in stored_questions
+        ]
+        # Answers keep is_correct when their choice is deleted from under them
+        regrade_ids.update(
+            stored_choices[choice_id].question_id for choice_id in removed_choice_ids
+            if stored_choices[choice_id].is_correct
+        )
+        if removed_choice_ids:
+            Choice.objects.filter(id__in=removed_choice_ids).delete()
+        Choice.objects.bulk_create(new_choices)
+        Choice.objects.bulk_update(changed_choices, ['text', 'is_correct'])
+
+        if new_questions or changed_questions:
+            # Bulk writes skip the post_save receivers, so refresh the
+            # dashboards the way invalidate_question_dashboards would
+            bump_survey_sections(survey.id)
+        if new_questions or changed_questions or new_choices or changed_choices or removed_choice_ids:
+            bump_survey_structures(survey.id)
+        queue_regrade(regrade_ids, survey_ids=[survey.id] if stored_questions else ())
+
+    return questions
+
+
+def sync_question_choices(question, texts):
+    """Replace ``question``'s choices with ``texts``, keeping rows whose text is unchanged.
+
+    Used by the single-question edit form, which only posts choice texts.
+    Existing choices matching a submitted text keep their id (and their
+    correct flag); the rest are deleted and the new texts bulk inserted.
+    """
+    texts = [text.strip() for text in texts if text.strip()]
+    existing = {}
+    for choice in question.choices.order_by('id'):
+        existing.setdefault(choice.text, []).append(choice)
+    new_choices = []
+    for text in texts:
+        if existing.get(text):
+            existing[text].pop(0)
+        else:
+            new_choices.append(Choice(question=question, text=text))
+    removed = [choice for matches in existing.values() for choice in matches]
+    if removed:
+        Choice.objects.filter(id__in=[choice.id for choice in removed]).delete()
+        if any(choice.is_correct for choice in removed):
+            queue_regrade([question.id])
+    Choice.objects.bulk_create(new_choices)
+
+
+# === SURVEY IMPORT AND CLONING ===
+
+def _clean_survey(item, position):
+    if not isinstance(item, dict):
+        raise InvalidQuestionSet(f"Survey {position} must be an object.")
+    title = str(item.get('title') or '').strip()
+    if not title:
+        raise InvalidQuestionSet(f"Survey {position} has no title.")
+    survey_type = item.get('survey_type') or None
+    if survey_type is not None and survey_type not in dict(Survey.SURVEY_TYPE_CHOICES):
+        raise InvalidQuestionSet(f"Survey {position} has an unknown type '{survey_type}'.")
+    due_date = item.get('due_date') or None
+    if due_date is not None and _parse_day(str(due_date)) is None:
+        raise InvalidQuestionSet(f"Survey {position} has a malformed due_date (use YYYY-MM-DD).")
+    try:
+        questions = _clean_question_set(item.get('questions') or [])
+    except InvalidQuestionSet as e:
+        raise InvalidQuestionSet(f"Survey {position}: {e}") from e
+    return {
+        'title': title,
+        'description': item.get('description') or '',
+        'survey_type': survey_type,
+        'due_date': _parse_day(str(due_date)) if due_date else None,
+        'is_active': bool(item.get('is_active', True)),
+        'sections': [str(name) for name in item.get('sections') or []],
+        'questions': questions,
+    }
+
+
+def create_surveys(specs, created_by):
+    """Insert fully specified surveys with one bulk insert per table.
+
+    ``specs`` are cleaned survey dicts whose ``section_ids`` list the
+    assigned sections (empty means all sections). Bulk inserts skip the
+    model signals, so the ``assigned_to_all`` flag and the dashboards are
+    refreshed explicitly afterwards.
+    """
+    with transaction.atomic():
+        surveys = Survey.objects.bulk_create(
+            Survey(
+                title=spec['title'],
+                description=spec['description'],
+                survey_type=spec['survey_type'],
+                due_date=spec['due_date'],
+                is_active=spec['is_active'],
+                created_by=created_by,
+            )
+            for spec in specs
+        )
+        through = Survey.assigned_sections.through
+        through.objects.bulk_create(
+            through(survey_id=survey.id, section_id=section_id)
+            for survey, spec in zip(surveys, specs)
+            for section_id in spec['section_ids']
+        )
+        questions = Question.objects.bulk_create(
+            Question(
+                survey=survey,
+                text=item['text'],
+                question_type=item['question_type'],
+                required=item['required'],
+            )
+            for survey, spec in zip(surveys, specs)
+            for item in spec['questions']
+        )
+        items = [item for spec in specs for item in spec['questions']]
+        Choice.objects.bulk_create(
+            Choice(question=question, text=choice['text'], is_correct=choice['is_correct'])
+            for question, item in zip(questions, items)
+            for choice in item['choices']
+        )
+        survey_ids = [survey.id for survey in surveys]
+        refresh_assigned_to_all(survey_ids)
+        bump_survey_structures(*survey_ids)
+        audience = {
+            section_id
+            for spec in specs
+            for section_id in (spec['section_ids'] or [ALL_SECTIONS])
+        }
+        bump_created_surveys(created_by.id, audience)
+    return surveys
+
+
+def import_surveys(payload, created_by):
+    """Create the surveys described by an import document.
+
+    ``payload`` is one survey object or a list of them, each shaped like
+    ``{title, description?, survey_type?, due_date?, is_active?, sections?,
+    questions}`` where ``sections`` are section names and ``questions``
+    uses the builder format (ids are ignored). Raises
+    ``InvalidQuestionSet`` without writing anything if any survey is
+    malformed or names an unknown section.
+    """
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise InvalidQuestionSet("Expected a survey object or a list of surveys.")
+    specs = [_clean_survey(item, position) for position, item in enumerate(payload, start=1)]
+
+    names = {name for spec in specs for name in spec['sections']}
+    section_ids = dict(Section.objects.filter(name__in=names).values_list('name', 'id'))
+    unknown = sorted(names - section_ids.keys())
+    if unknown:
+        raise InvalidQuestionSet(f"Unknown sections: {', '.join(unknown)}.")
+    for spec in specs:
+        spec['section_ids'] = [section_ids[name] for name in dict.fromkeys(spec['sections'])]
+    return create_surveys(specs, created_by)
+
+
+def clone_survey(survey, created_by, section_ids=None, title=None):
+    """Copy ``survey`` with its questions and choices in a constant number of queries.
+
+    ``section_ids`` re-targets the copy (an empty list assigns it to all
+    sections); by default it keeps the original's sections. Responses are
+    not copied.
+    """
+    questions = list(survey.questions.order_by('id'))
+    choices_by_question = {}
+    for choice in Choice.objects.filter(question__survey=survey).order_by('id'):
+        choices_by_question.setdefault(choice.question_id, []).append(
+            {'text': choice.text, 'is_correct': choice.is_correct}
+        )
+    if section_ids is None:
+        section_ids = list(
+            Survey.assigned_sections.through.objects.filter(survey_id=survey.id)
+            .values_list('section_id', flat=True)
+        )
+    spec = {
+        'title': title or survey.title,
+        'description': survey.description,
+        'survey_type': survey.survey_type,
+        'due_date': survey.due_date,
+        'is_active': survey.is_active,
+        'section_ids': list(section_ids),
+        'questions': [
+            {
+                'text': question.text,
+                'question_type': question.question_type,
+                'required': question.required,
+                'choices': choices_by_question.get(question.id, []),
+            }
+            for question in questions
+        ],
+    }
+    return create_surveys([spec], created_by)[0]
+
+
+# === AGGREGATE COUNTERS ===
+
+def _increment(model, key_field, keys, counter):
+    """Add one to ``counter`` for every row keyed by ``keys``, creating rows as needed."""
+    if not keys:
+        return
+    model.objects.bulk_create(
+        [model(**{key_field: key}) for key in keys], ignore_conflicts=True
+    )
+    model.objects.filter(**{f'{key_field}__in': keys}).update(**{counter: F(counter) + 1})
+
+
+def record_submission_stats(survey_id, selected_choice_ids, correct_question_ids):
+    """Fold one submission into the survey, choice and question counters.
+
+    Uses at most two queries per counter table, so the cost does not grow
+    with the number of answers.
+    """
+    _increment(SurveyStats, 'survey_id', [survey_id], 'response_count')
+    _increment(ChoiceStats, 'choice_id', selected_choice_ids, 'selection_count')
+    _increment(QuestionStats, 'question_id', correct_question_ids, 'correct_count')
+
+
+def _decrement(model, key_field, keys, counter):
+    if keys:
+        model.objects.filter(**{f'{key_field}__in': keys, f'{counter}__gt': 0}).update(
+            **{counter: F(counter) - 1}
+        )
+
+
+def forget_submission_stats(response):
+    """Take a response that is about to be deleted back out of the counters."""
+    answers = list(
+        Answer.objects.filter(response=response).values_list('selected_choice_id', 'question_id', 'is_correct')
+    )
+    _decrement(SurveyStats, 'survey_id', [response.survey_id], 'response_count')
+    _decrement(ChoiceStats, 'choice_id', [choice_id for choice_id, _q, _c in answers if choice_id], 'selection_count')
+    _decrement(QuestionStats, 'question_id', [question_id for _c, question_id, correct in answers if correct], 'correct_count')
+
+
+def rebuild_stats(progress=None):
+    """Recompute every aggregate counter from the raw Response and Answer tables.
+
+    Each counter table is rebuilt in its own transaction, and ``progress``
+    (if given) is called after each one, so a background job keeps
+    reporting while a long rebuild runs.
+    """
+    tables = [
+        (SurveyStats, lambda: (
+            SurveyStats(survey_id=row['survey'], response_count=row['total'])
+            for row in Response.objects.values('survey').annotate(total=Count('id')).order_by()
+        )),
+        (ChoiceStats, lambda: (
+            ChoiceStats(choice_id=row['selected_choice'], selection_count=row['total'])
+            for row in Answer.objects.filter(selected_choice__isnull=False)
+            .values('selected_choice').annotate(total=Count('id')).order_by()
+        )),
+        (QuestionStats, lambda: (
+            QuestionStats(question_id=row['question'], correct_count=row['total'])
+            for row in Answer.objects.filter(is_correct=True)
+            .values('question').annotate(total=Count('id')).order_by()
+        )),
+    ]
+    for done, (model, rows) in enumerate(tables, start=1):
+        with transaction.atomic():
+            model.objects.all().delete()
+            model.objects.bulk_create(rows())
+        if progress:
+            progress(done, len(tables))
+    # The teacher dashboards show these counters
+    bump_teacher_dashboards(Survey.objects.values_list('created_by_id', flat=True).distinct())
+    return {
+        'surveys': SurveyStats.objects.count(),
+        'questions': QuestionStats.objects.count(),
+        'choices': ChoiceStats.objects.count(),
+    }
+
+
+# === REGRADING ===
+
+def queue_regrade(question_ids, survey_ids=()):
+    """Regrade ``question_ids`` in a background job once the current transaction commits.
+
+    Deleted questions are passed with the ``survey_ids`` they belonged to,
+    since the job can no longer look those up.
+    """
+    question_ids = sorted(set(question_ids))
+    if not question_ids:
+        return
+    survey_ids = sorted(set(survey_ids))
+    from .jobs import enqueue  # jobs.py imports this module
+    transaction.on_commit(lambda: enqueue('regrade', question_ids=question_ids, survey_ids=survey_ids))
+
+
+def _regrade_history(response_ids, questions, removed_ids):
+    """Bring the history snapshots of ``response_ids`` in line with their regraded answers and scores.
+
+    Answers to the deleted ``removed_ids`` questions stay in the snapshot,
+    unmarked, since they no longer count towards the score.
+    """
+    graded = {
+        (response_id, question_id): is_correct
+        for response_id, question_id, is_correct in Answer.objects.filter(
+            response_id__in=response_ids, question_id__in=questions
+        ).values_list('response_id', 'question_id', 'is_correct')
+    }
+    scores = {
+        response_id: (score, max_score)
+        for response_id, score, max_score in Response.objects.filter(id__in=response_ids).values_list(
+            'id', 'score', 'max_score'
+        )
+    }
+    by_text = {question['text']: question_id for question_id, question in questions.items()}
+    changed = []
+    entries = HistoryEntry.objects.filter(response_id__in=response_ids).only(
+        'response_id', 'score', 'max_score', 'answers'
+    )
+    for entry in entries:
+        dirty = (entry.score, entry.max_score) != scores[entry.response_id]
+        entry.score, entry.max_score = scores[entry.response_id]
+        for item in entry.answers:
+            # Snapshots written before they held question ids are matched on text
+            question_id = item.get('question_id', by_text.get(item['question']))
+            if question_id in removed_ids:
+                values = {'is_correct': None, 'correct_answer': None}
+            elif question_id in questions:
+                question = questions[question_id]
+                values = {
+                    'question_type': question['question_type'],
+                    'is_correct': graded.get((entry.response_id, question_id)),
+                    'correct_answer': question['correct_text'] if question['question_type'] == 'mcq' else None,
+                }
+            else:
+                continue
+            if any(item.get(field) != value for field, value in values.items()):
+                item.update(values)
+                dirty = True
+        if dirty:
+            changed.append(entry)
+    HistoryEntry.objects.bulk_update(changed, ['score', 'max_score', 'answers'])
+
+
+def _regrade_batch(response_ids, questions, removed_ids):
+    """Regrade one batch of responses in a single short transaction; returns how many changed."""
+    answer_key = Coalesce(
+        Subquery(Choice.objects.filter(id=OuterRef('selected_choice_id')).values('is_correct')[:1]),
+        Value(False),
+    )
+    correct_count = Coalesce(
+        Subquery(
+            Answer.objects.filter(response_id=OuterRef('pk'), is_correct=True)
+            .order_by().values('response_id').annotate(total=Count('id')).values('total')
+        ),
+        Value(0),
+    )
+    # Counted as at submit time: every mcq question the survey has now
+    max_score = Coalesce(
+        Subquery(
+            Question.objects.filter(survey_id=OuterRef('survey_id'), question_type='mcq')
+            .order_by().values('survey_id').annotate(total=Count('id')).values('total')
+        ),
+        Value(0),
+    )
+    mcq_ids = [question_id for question_id, question in questions.items() if question['question_type'] == 'mcq']
+    with transaction.atomic():
+        answers = Answer.objects.filter(response_id__in=response_ids)
+        answers.filter(question_id__in=mcq_ids).update(is_correct=answer_key)
+        answers.filter(question_id__in=questions).exclude(question_id__in=mcq_ids).update(is_correct=None)
+        changed = (
+            Response.objects.filter(id__in=response_ids)
+            .exclude(correct_count=correct_count, max_score=max_score)
+            .update(correct_count=correct_count, score=correct_count, max_score=max_score)
+        )
+        _regrade_history(response_ids, questions, removed_ids)
+    return changed
+
+
+def regrade_questions(question_ids, batch_size=REGRADE_BATCH_SIZE, progress=None, survey_ids=()):
+    """Recompute stored correctness and scores after the answer key of ``question_ids`` changed.
+
+    ``question_ids`` may include deleted questions, whose surveys are then
+    given in ``survey_ids``. Works with set-based UPDATEs over batches of
+    response ids, one short transaction per batch, so submissions keep
+    flowing while it runs. The batches walk response ids upwards until none
+    are left, which includes responses committed while the regrade was
+    running. ``score`` and ``max_score`` are recounted from the stored
+    answers and the survey's current mcq questions, and the history
+    snapshots follow.
+    Returns ``{'responses': scanned, 'changed': responses whose score changed}``.
+    """
+    questions = {
+        question_id: {'id': question_id, 'text': text, 'question_type': question_type, 'correct_text': None}
+        for question_id, text, question_type in Question.objects.filter(id__in=question_ids).values_list(
+            'id', 'text', 'question_type'
+        )
+    }
+    # Walked newest first, so the oldest correct choice wins, as in structure.py
+    for question_id, text in (
+        Choice.objects.filter(question_id__in=questions, is_correct=INDEXABLE_TRUE)
+        .order_by('-id').values_list('question_id', 'text')
+    ):
+        questions[question_id]['correct_text'] = text
+    removed_ids = set(question_ids) - set(questions)
+    mcq_ids = [question_id for question_id, question in questions.items() if question['question_type'] == 'mcq']
+    responses = Response.objects.filter(
+        Q(survey_id__in=Question.objects.filter(id__in=list(questions)).values('survey_id'))
+        | Q(survey_id__in=list(survey_ids))
+    )
+    total = responses.count()
+
+    scanned = changed = last_id = 0
+    while True:
+        batch = list(responses.filter(id__gt=last_id).order_by('id').values_list('id', flat=True)[:batch_size])
+        if not batch:
+            break
+        last_id = batch[-1]
+        changed += retry_when_locked(lambda: _regrade_batch(batch, questions, removed_ids))
+        scanned += len(batch)
+        if progress:
+            progress(scanned, max(total, scanned))
+
+    # One statement per table, so concurrent F() increments are not lost
+    with transaction.atomic():
+        QuestionStats.objects.bulk_create(
+            [QuestionStats(question_id=question_id) for question_id in mcq_ids], ignore_conflicts=True
+        )
+        QuestionStats.objects.filter(question_id__in=list(questions)).update(
+            correct_count=Coalesce(
+                Subquery(
+                    Answer.objects.filter(question_id=OuterRef('question_id'), is_correct=True)
+                    .order_by().values('question_id').annotate(total=Count('id')).values('total')
+                ),
+                Value(0),
+            )
+        )
+    return {'responses': scanned, 'changed': changed}
+
+
+# === RESPONSE FILTERS ===
+
+def _parse_day(value):
+    try:
+        return datetime.strptime(value, '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+
+def filter_responses(responses, search_query='', date_from='', date_to=''):
+    """Apply the responses page search and date filters to a Response queryset.
+
+    Search goes through the full-text index (see search.py). Malformed
+    dates are ignored, matching the behaviour of the filter form.
+    """
+    if search_query:
+        responses = search_responses(responses, search_query)
+    date_from_obj = _parse_day(date_from) if date_from else None
+    if date_from_obj:
+        responses = responses.filter(submitted_at__date__gte=date_from_obj)
+    date_to_obj = _parse_day(date_to) if date_to else None
+    if date_to_obj:
+        responses = responses.filter(submitted_at__date__lte=date_to_obj)
+    return responses
@@ -0,0 +1,67 @@
+"""Cached, compact structure of a survey's questions and choices.
+
+A survey's questions change rarely while it is answered hundreds of times,
+so the detail page and ``submit_survey`` read them from here instead of
+querying both tables on every request. The structure is cached under the
+survey's version (see caching.py); the receivers in models.py and the bulk
+builder paths in services.py bump it whenever a survey, question or choice
+is written.
+"""
+from .caching import cached_fragment
+from .models import Choice, Question
+
+
+QUESTION_TYPE_LABELS = dict(Question.QUESTION_TYPES)
+
+
+def build_survey_structure(survey_id):
+    """Read the structure of ``survey_id`` with two queries.
+
+    Returns ``{'questions': [...]}`` in display order, each question being
+    ``{id, text, question_type, type_display, required, choices,
+    correct_choice_id, correct_text}`` with ``choices`` as
+    ``[{id, text, is_correct}, ...]``.
+    """
+    questions = []
+    by_id = {}
+    rows = (
+        Question.objects.filter(survey_id=survey_id)
+        .order_by('id')
+        .values_list('id', 'text', 'question_type', 'required')
+    )
+    for question_id, text, question_type, required in rows:
+        question = {
+            'id': question_id,
+            'text': text,
+            'question_type': question_type,
+            'type_display': QUESTION_TYPE_LABELS.get(question_type, question_type),
+            'required': required,
+            'choices': [],
+            'correct_choice_id': None,
+            'correct_text': None,
+        }
+        questions.append(question)
+        by_id[question_id] = question
+
+    if questions:
+        choices = (
+            Choice.objects.filter(question_id__in=by_id)
+            .order_by('id')
+            .values_list('question_id', 'id', 'text', 'is_correct')
+        )
+        for question_id, choice_id, text, is_correct in choices:
+            question = by_id[question_id]
+            question['choices'].append({'id': choice_id, 'text': text, 'is_correct': is_correct})
+            if is_correct and question['correct_choice_id'] is None:
+                question['correct_choice_id'] = choice_id
+                question['correct_text'] = text
+    return {'questions': questions}
+
+
+def get_survey_structure(survey_id):
+    """The cached structure of ``survey_id``, built on a miss."""
+    return cached_fragment(
+        f'survey-structure:{survey_id}',
+        [('survey', survey_id)],
+        lambda: build_survey_structure(survey_id),
+    )
@@ -1,7 +1,59 @@
-from django.test import TestCase
+import os
+import json
+import sqlite3
+import tempfile
+import threading
+import unittest
+from contextlib import closing
+from datetime import timedelta
+from unittest import mock
+from io import StringIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
-from django.core.management import call_command
-from my_app.models import Profile
+from django.core.management import CommandError, call_command
+from django.db import DEFAULT_DB_ALIAS, connection, connections, models
+from django.urls import reverse
+from django.utils import timezone
+from my_app.models import (
+	Answer,
+	Choice,
+	ChoiceStats,
+	HistoryEntry,
+	Job,
+	Profile,
+	Question,
+	QuestionStats,
+	Response,
+	Section,
+	Survey,
+	SurveyStats,
+)
+from my_app.analytics import completion_matrix
+from my_app.benchmark import run_benchmark
+from my_app.caching import get_versions
+from my_app.jobs import claim_next, enqueue, requeue_stale, run_worker
+from my_app.middleware import fingerprint
+from my_app.query_plans import audit_routes, queryset_full_scans
+from my_app.search import fts_available
+from my_app.services import AlreadySubmitted, rebuild_stats, regrade_questions, save_survey_questions, submit_survey
+from my_app.structure import get_survey_structure
+from my_app.text_analytics import text_summary
+
+
+def setUpModule():
+	# Keep the run's cache entries out of the shared cache directory, where
+	# versions left by an earlier run could match this run's reused ids
+	directory = tempfile.TemporaryDirectory()
+	override = override_settings(CACHES={
+		'default': {**settings.CACHES['default'], 'LOCATION': directory.name},
+	})
+	override.enable()
+	unittest.addModuleCleanup(directory.cleanup)
+	unittest.addModuleCleanup(override.disable)
 
 
 class ProfileSignalAndCommandTests(TestCase):
@@ -24,4 +76,1273 @@ class ProfileSignalAndCommandTests(TestCase):
 		call_command('create_missing_profiles')
 		self.assertTrue(Profile.objects.filter(user=user).exists())
 
-# Create your tests here.
+	def test_login_recreates_missing_profile(self):
+		user = get_user_model().objects.create_user(username='legacy', password='pass')
+		user.profile.delete()
+		result = self.client.post(reverse('login'), {'username': 'legacy', 'password': 'pass'})
+		self.assertRedirects(result, reverse('student_dashboard'), fetch_redirect_response=False)
+		self.assertTrue(Profile.objects.filter(user=user).exists())
+
+
+class SubmissionServiceTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		fts_available()  # warm the per-database feature check outside the query counts
+
+	def _make_questions(self, count):
+		for i in range(count):
+			question = Question.objects.create(survey=self.survey, text=f'Q{i}', question_type='mcq')
+			Choice.objects.create(question=question, text='right', is_correct=True)
+			Choice.objects.create(question=question, text='wrong')
+
+	def _answers_for_all(self):
+		data = {}
+		for question in self.survey.questions.prefetch_related('choices'):
+			data[f'question_{question.id}'] = str(question.choices.all()[0].id)
+		return data
+
+	def test_query_count_does_not_grow_with_questions(self):
+		self._make_questions(3)
+		other = get_user_model().objects.create_user(username='other', password='pass')
+		data = self._answers_for_all()
+		with self.assertNumQueries(15):
+			submit_survey(self.survey, other, data)
+
+		self._make_questions(20)
+		data = self._answers_for_all()
+		with self.assertNumQueries(15):
+			submit_survey(self.survey, self.student, data)
+		self.assertEqual(Answer.objects.filter(response__student=self.student).count(), 23)
+
+	def test_choice_from_another_question_is_ignored(self):
+		self._make_questions(2)
+		first, second = self.survey.questions.order_by('id')
+		data = {
+			f'question_{first.id}': str(second.choices.first().id),
+			f'question_{second.id}': 'not-a-number',
+		}
+		response = submit_survey(self.survey, self.student, data)
+		self.assertFalse(response.answers.exists())
+
+	def test_second_submission_is_rejected(self):
+		submit_survey(self.survey, self.student, {})
+		with self.assertRaises(AlreadySubmitted):
+			submit_survey(self.survey, self.student, {})
+		self.assertEqual(Response.objects.filter(survey=self.survey).count(), 1)
+
+	def test_submit_view_stores_text_answers(self):
+		question = Question.objects.create(survey=self.survey, text='Why?', question_type='text')
+		self.client.force_login(self.student)
+		url = reverse('submit_survey', args=[self.survey.id])
+		result = self.client.post(url, {f'question_{question.id}': '  because  '})
+		self.assertEqual(result.status_code, 201)
+		self.assertEqual(Answer.objects.get().text_answer, 'because')
+		self.assertEqual(self.client.post(url, {}).status_code, 400)
+
+
+class SurveyAssignmentIndexTests(TestCase):
+	def setUp(self):
+		self.teacher = get_user_model().objects.create_user(username='teacher', password='pass')
+		self.section_a = Section.objects.create(name='A')
+		self.section_b = Section.objects.create(name='B')
+		self.everyone = Survey.objects.create(title='Everyone', created_by=self.teacher)
+		self.only_a = Survey.objects.create(title='Only A', created_by=self.teacher)
+		self.only_a.assigned_sections.set([self.section_a])
+
+	def _visible_titles(self, section):
+		return set(Survey.objects.visible_to_section(section).values_list('title', flat=True))
+
+	def test_visible_surveys_resolved_in_one_query(self):
+		with self.assertNumQueries(1):
+			self.assertEqual(self._visible_titles(self.section_a), {'Everyone', 'Only A'})
+		self.assertEqual(self._visible_titles(self.section_b), {'Everyone'})
+		self.assertEqual(self._visible_titles(None), {'Everyone'})
+
+	def test_flag_follows_assigned_sections_changes(self):
+		self.only_a.assigned_sections.clear()
+		self.assertEqual(self._visible_titles(self.section_b), {'Everyone', 'Only A'})
+
+		self.section_b.surveys.add(self.everyone)
+		self.assertEqual(self._visible_titles(self.section_a), {'Only A'})
+
+		self.section_b.surveys.clear()
+		self.assertEqual(self._visible_titles(self.section_a), {'Everyone', 'Only A'})
+
+	def test_deleting_last_section_reassigns_to_all(self):
+		self.section_a.delete()
+		self.only_a.refresh_from_db()
+		self.assertTrue(self.only_a.assigned_to_all)
+
+
+class AggregateStatsTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.question = Question.objects.create(survey=self.survey, text='2+2?', question_type='mcq')
+		self.right = Choice.objects.create(question=self.question, text='4', is_correct=True)
+		self.wrong = Choice.objects.create(question=self.question, text='5')
+		for name, choice in (('s1', self.right), ('s2', self.right), ('s3', self.wrong)):
+			student = User.objects.create_user(username=name, password='pass')
+			submit_survey(self.survey, student, {f'question_{self.question.id}': str(choice.id)})
+
+	def _snapshot(self):
+		return (
+			SurveyStats.objects.get(survey=self.survey).response_count,
+			ChoiceStats.objects.get(choice=self.right).selection_count,
+			ChoiceStats.objects.get(choice=self.wrong).selection_count,
+			QuestionStats.objects.get(question=self.question).correct_count,
+		)
+
+	def test_counters_updated_on_submission(self):
+		self.assertEqual(self._snapshot(), (3, 2, 1, 2))
+
+	def test_rebuild_command_matches_incremental_counters(self):
+		expected = self._snapshot()
+		SurveyStats.objects.update(response_count=0)
+		ChoiceStats.objects.all().delete()
+		call_command('rebuild_stats', stdout=StringIO())
+		self.assertEqual(self._snapshot(), expected)
+
+	def test_deleting_a_response_takes_it_out_of_the_counters(self):
+		Response.objects.get(student__username='s1').delete()
+		self.assertEqual(self._snapshot(), (2, 1, 1, 1))
+
+	def test_rebuild_invalidates_teacher_dashboards(self):
+		before = get_versions(('teacher', self.teacher.id))
+		rebuild_stats()
+		self.assertNotEqual(get_versions(('teacher', self.teacher.id)), before)
+
+	def test_teacher_dashboard_reads_counters(self):
+		cache.clear()
+		self.teacher.profile.role = 'teacher'
+		self.teacher.profile.save()
+		self.client.force_login(self.teacher)
+		result = self.client.get(reverse('teacher_dashboard'))
+		self.assertEqual(result.context['total_responses'], 3)
+		self.assertContains(result, 'Responses: 3')
+
+
+class ResponseExportTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Why?', question_type='text')
+		for name in ('alice', 'bob'):
+			student = User.objects.create_user(username=name, password='pass')
+			submit_survey(self.survey, student, {f'question_{self.question.id}': f'{name} says hi'})
+
+	def test_csv_export_streams_filtered_rows(self):
+		self.client.force_login(self.teacher)
+		url = reverse('export_survey_responses', args=[self.survey.id])
+		result = self.client.get(url, {'search': 'ali'})
+		self.assertTrue(result.streaming)
+		lines = b''.join(result.streaming_content).decode().splitlines()
+		self.assertEqual(len(lines), 2)
+		self.assertIn('alice says hi', lines[1])
+
+	def test_export_rejects_other_teachers_and_formats(self):
+		other = get_user_model().objects.create_user(username='other', password='pass')
+		self.client.force_login(other)
+		url = reverse('export_survey_responses', args=[self.survey.id])
+		self.assertEqual(self.client.get(url).status_code, 404)
+		self.client.force_login(self.teacher)
+		self.assertEqual(self.client.get(url, {'format': 'xml'}).status_code, 400)
+
+	def test_ndjson_command(self):
+		out = StringIO()
+		call_command('export_responses', self.survey.id, '--format', 'ndjson', stdout=out)
+		rows = [json.loads(line) for line in out.getvalue().splitlines()]
+		self.assertEqual(sorted(row['username'] for row in rows), ['alice', 'bob'])
+		self.assertEqual(rows[0]['question'], 'Why?')
+
+
+class KeysetPaginationTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		for i in range(25):
+			student = User.objects.create_user(username=f'student{i:02d}', password='pass')
+			submit_survey(self.survey, student, {})
+		self.client.force_login(self.teacher)
+		self.url = reverse('survey_responses', args=[self.survey.id])
+
+	def _usernames(self, result):
+		return [response.student.username for response in result.context['page_obj']]
+
+	def test_pages_walk_newest_first_and_back(self):
+		first = self.client.get(self.url)
+		self.assertEqual(self._usernames(first)[0], 'student24')
+		self.assertEqual(first.context['total_responses'], 25)
+
+		second = self.client.get(self.url, {'cursor': first.context['page_obj'].next_cursor})
+		self.assertEqual(self._usernames(second)[0], 'student14')
+
+		back = self.client.get(self.url, {'cursor': second.context['page_obj'].previous_cursor, 'direction': 'prev'})
+		self.assertEqual(self._usernames(back), self._usernames(first))
+
+	def test_new_submissions_do_not_shift_older_pages(self):
+		first = self.client.get(self.url)
+		late = get_user_model().objects.create_user(username='late', password='pass')
+		submit_survey(self.survey, late, {})
+		second = self.client.get(self.url, {'cursor': first.context['page_obj'].next_cursor})
+		self.assertEqual(self._usernames(second)[0], 'student14')
+
+	def test_malformed_cursor_falls_back_to_first_page(self):
+		result = self.client.get(self.url, {'cursor': '!!garbage'})
+		self.assertEqual(self._usernames(result)[0], 'student24')
+		self.assertFalse(result.context['page_obj'].has_previous)
+
+
+class ResponseSearchTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Essay', created_by=self.teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Favourite animal?', question_type='text')
+		self.alice = User.objects.create_user(username='alice', email='alice@example.com', password='pass')
+		self.bob = User.objects.create_user(username='bob', first_name='Robert', password='pass')
+		submit_survey(self.survey, self.alice, {f'question_{self.question.id}': 'penguins are great'})
+		submit_survey(self.survey, self.bob, {f'question_{self.question.id}': 'definitely cats'})
+		self.client.force_login(self.teacher)
+		self.url = reverse('survey_responses', args=[self.survey.id])
+
+	def _search(self, term):
+		result = self.client.get(self.url, {'search': term})
+		return sorted(response.student.username for response in result.context['page_obj'])
+
+	def test_search_matches_identity_prefixes_and_answer_text(self):
+		self.assertEqual(self._search('ali'), ['alice'])
+		self.assertEqual(self._search('rob'), ['bob'])
+		self.assertEqual(self._search('penguin'), ['alice'])
+		self.assertEqual(self._search('"); drop'), [])
+
+	def test_index_follows_student_rename(self):
+		self.bob.first_name = 'Bartholomew'
+		self.bob.save()
+		self.assertEqual(self._search('bartho'), ['bob'])
+		self.assertEqual(self._search('robert'), [])
+
+	def test_rebuild_command(self):
+		out = StringIO()
+		call_command('rebuild_search_index', stdout=out)
+		self.assertIn('Indexed 2 responses', out.getvalue())
+
+
+@override_settings(MIDDLEWARE=settings.MIDDLEWARE + ['my_app.middleware.QueryBudgetMiddleware'])
+class QueryBudgetMiddlewareTests(TestCase):
+	def setUp(self):
+		self.user = get_user_model().objects.create_user(username='student', password='pass')
+		self.client.force_login(self.user)
+
+	def test_fingerprint_ignores_parameters(self):
+		self.assertEqual(
+			fingerprint('SELECT * FROM t WHERE id IN (%s, %s, %s) LIMIT 21'),
+			fingerprint('SELECT * FROM t WHERE id IN (%s) LIMIT 1'),
+		)
+
+	@override_settings(DEBUG=True)
+	def test_header_reports_query_count_in_debug(self):
+		result = self.client.get(reverse('current_user'))
+		self.assertRegex(result['X-Query-Budget'], r'^queries=\d+; duplicates=\d+; db_ms=')
+
+	def test_no_header_without_debug(self):
+		result = self.client.get(reverse('current_user'))
+		self.assertNotIn('X-Query-Budget', result)
+
+	@override_settings(QUERY_BUDGET={'MAX_QUERIES': 0})
+	def test_warning_logged_when_budget_exceeded(self):
+		with self.assertLogs('my_app.query_budget', level='WARNING') as logs:
+			self.client.get(reverse('current_user'))
+		self.assertIn('current_user', logs.output[0])
+
+	@override_settings(QUERY_BUDGET={'MAX_QUERIES': 0})
+	def test_streamed_body_queries_are_counted(self):
+		teacher = get_user_model().objects.create_user(username='teacher', password='pass')
+		survey = Survey.objects.create(title='Quiz', created_by=teacher)
+		self.client.force_login(teacher)
+		with self.assertLogs('my_app.query_budget', level='WARNING') as logs:
+			result = self.client.get(reverse('export_survey_responses', args=[survey.id]))
+			self.assertEqual(logs.output, [])
+			b''.join(result.streaming_content)
+		self.assertIn('export_survey_responses', logs.output[0])
+
+
+def use_temporary_job_output(test):
+	"""Point JOB_OUTPUT_DIR at a directory removed after ``test``."""
+	directory = tempfile.TemporaryDirectory()
+	test.addCleanup(directory.cleanup)
+	override = override_settings(JOB_OUTPUT_DIR=directory.name)
+	override.enable()
+	test.addCleanup(override.disable)
+	return directory.name
+
+
+# The benchmark clients send Host: localhost, like a local deployment
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class SeedAndBenchmarkTests(TestCase):
+	def setUp(self):
+		self.output = use_temporary_job_output(self)
+
+	def test_seed_then_benchmark_every_route(self):
+		before = get_versions(('section', 'all'))
+		call_command(
+			'seed_data', '--sections', '2', '--students', '6', '--surveys', '2',
+			'--questions', '3', '--responses', '3', stdout=StringIO(),
+		)
+		self.assertEqual(Survey.objects.count(), 2)
+		self.assertEqual(Profile.objects.filter(role='student').count(), 6)
+		# Seeded surveys reach dashboards cached before the seed
+		self.assertNotEqual(get_versions(('section', 'all')), before)
+		self.assertEqual(SurveyStats.objects.aggregate(total=models.Sum('response_count'))['total'], Response.objects.count())
+		# Seeded responses are graded and have history like submitted ones
+		self.assertEqual(HistoryEntry.objects.count(), Response.objects.count())
+		for response in Response.objects.prefetch_related('answers'):
+			graded = [answer.is_correct for answer in response.answers.all() if answer.question.question_type == 'mcq']
+			self.assertEqual(response.max_score, len(graded))
+			self.assertEqual(response.score, sum(graded))
+			self.assertEqual(response.history_entry.score, response.score)
+
+		report = run_benchmark(iterations=1)
+		self.assertEqual(report['unplanned'], [])
+		for name, row in report['routes'].items():
+			self.assertTrue(all(status < 400 for status in row['status']), (name, row['status']))
+		# Writes made while benchmarking are rolled back, job files included
+		self.assertEqual(Survey.objects.count(), 2)
+		self.assertEqual(os.listdir(self.output), [])
+
+
+class DashboardCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.teacher.profile.role = 'teacher'
+		self.teacher.profile.save()
+		self.section_a = Section.objects.create(name='A')
+		self.section_b = Section.objects.create(name='B')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.student.profile.section = self.section_a
+		self.student.profile.save()
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.survey.assigned_sections.set([self.section_a])
+
+	def _query_count(self, url):
+		with CaptureQueriesContext(connection) as queries:
+			self.client.get(url)
+		return len(queries)
+
+	def test_student_dashboard_served_from_cache_until_submission(self):
+		self.client.force_login(self.student)
+		url = reverse('student_dashboard')
+		cold = self._query_count(url)
+		warm = self._query_count(url)
+		self.assertLess(warm, cold)
+
+		submit_survey(self.survey, self.student, {})
+		result = self.client.get(url)
+		self.assertEqual(result.context['total_completed'], 1)
+
+	def test_teacher_dashboard_refreshes_after_submission(self):
+		self.client.force_login(self.teacher)
+		url = reverse('teacher_dashboard')
+		self.assertEqual(self.client.get(url).context['total_responses'], 0)
+		submit_survey(self.survey, self.student, {})
+		self.assertEqual(self.client.get(url).context['total_responses'], 1)
+
+	def test_only_affected_sections_are_bumped(self):
+		before_a, before_b = get_versions(('section', self.section_a.id), ('section', self.section_b.id))
+		Question.objects.create(survey=self.survey, text='New?', question_type='text')
+		after_a, after_b = get_versions(('section', self.section_a.id), ('section', self.section_b.id))
+		self.assertNotEqual(before_a, after_a)
+		self.assertEqual(before_b, after_b)
+
+
+class StoredScoreTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.data = {}
+		for i in range(3):
+			question = Question.objects.create(survey=self.survey, text=f'Q{i}', question_type='mcq')
+			right = Choice.objects.create(question=question, text='right', is_correct=True)
+			wrong = Choice.objects.create(question=question, text='wrong')
+			self.data[f'question_{question.id}'] = str(right.id if i < 2 else wrong.id)
+		likert = Question.objects.create(survey=self.survey, text='Agree?', question_type='likert')
+		self.data[f'question_{likert.id}'] = str(Choice.objects.create(question=likert, text='Yes').id)
+
+	def test_score_and_correctness_stored_on_submit(self):
+		response = submit_survey(self.survey, self.student, self.data)
+		response.refresh_from_db()
+		self.assertEqual((response.score, response.max_score, response.correct_count), (2, 3, 2))
+		self.assertEqual(
+			sorted(response.answers.values_list('is_correct', flat=True), key=str),
+			[False, None, True, True],
+		)
+
+	def test_history_does_not_query_per_answer(self):
+		submit_survey(self.survey, self.student, self.data)
+		self.client.force_login(self.student)
+		with CaptureQueriesContext(connection) as small:
+			result = self.client.get(reverse('student_history'))
+		self.assertEqual(result.context['history'][0].score, 2)
+
+		for i in range(5):
+			Question.objects.create(survey=self.survey, text=f'Extra {i}', question_type='text')
+		Response.objects.all().delete()
+		data = dict(self.data, **{f'question_{q.id}': 'text' for q in self.survey.questions.filter(question_type='text')})
+		submit_survey(self.survey, self.student, data)
+		with CaptureQueriesContext(connection) as large:
+			self.client.get(reverse('student_history'))
+		self.assertEqual(len(small), len(large))
+
+
+class HistorySnapshotTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher, survey_type='likert')
+		self.question = Question.objects.create(survey=self.survey, text='Capital of France?', question_type='mcq')
+		Choice.objects.create(question=self.question, text='Paris', is_correct=True)
+		self.wrong = Choice.objects.create(question=self.question, text='Lyon')
+		submit_survey(self.survey, self.student, {f'question_{self.question.id}': str(self.wrong.id)})
+		self.client.force_login(self.student)
+
+	def test_snapshot_holds_answers_and_correct_text(self):
+		entry = HistoryEntry.objects.get(student=self.student)
+		self.assertEqual(entry.survey_type, 'Likert')
+		self.assertEqual(entry.sections, 'All sections')
+		self.assertEqual(entry.answers, [{
+			'question_id': self.question.id,
+			'question': 'Capital of France?',
+			'question_type': 'mcq',
+			'answer': 'Lyon',
+			'is_correct': False,
+			'correct_answer': 'Paris',
+		}])
+
+	def test_history_is_unaffected_by_later_edits(self):
+		self.survey.title = 'Renamed'
+		self.survey.save()
+		result = self.client.get(reverse('student_history'), {'format': 'json'})
+		self.assertEqual(result.json()[0]['survey_title'], 'Quiz')
+		self.assertEqual(result.json()[0]['answers'], [{'question': 'Capital of France?', 'response': 'Lyon'}])
+
+
+class SurveyBuilderTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.mcq = Question.objects.create(survey=self.survey, text='Pick one', question_type='mcq')
+		self.keep = Choice.objects.create(question=self.mcq, text='Keep', is_correct=True)
+		self.drop = Choice.objects.create(question=self.mcq, text='Drop')
+		self.text = Question.objects.create(survey=self.survey, text='Explain', question_type='text')
+		submit_survey(self.survey, self.student, {f'question_{self.mcq.id}': str(self.keep.id)})
+		self.url = reverse('survey_questions', args=[self.survey.id])
+		self.client.force_login(self.teacher)
+
+	def _save(self, questions):
+		return self.client.post(self.url, json.dumps({'questions': questions}), content_type='application/json')
+
+	def test_diff_keeps_unchanged_choice_ids(self):
+		result = self._save([
+			{'id': self.mcq.id, 'text': 'Pick one!', 'question_type': 'mcq', 'choices': [
+				{'id': self.keep.id, 'text': 'Keep', 'is_correct': True},
+				{'text': 'New'},
+			]},
+			{'text': 'Rate it', 'question_type': 'likert', 'choices': [{'text': 'Good'}, {'text': 'Bad'}]},
+		])
+		self.assertEqual(result.status_code, 200)
+		self.assertFalse(Question.objects.filter(id=self.text.id).exists())
+		self.assertFalse(Choice.objects.filter(id=self.drop.id).exists())
+		self.assertEqual(Answer.objects.get(question=self.mcq).selected_choice_id, self.keep.id)
+		saved = result.json()['questions']
+		self.assertEqual(saved[0]['text'], 'Pick one!')
+		self.assertEqual([c['text'] for c in saved[0]['choices']], ['Keep', 'New'])
+		self.assertEqual(saved[0]['choices'][0]['id'], self.keep.id)
+		self.assertEqual(Choice.objects.filter(question_id=saved[1]['id']).count(), 2)
+
+	def test_write_queries_do_not_grow_with_changes(self):
+		def payload(count):
+			return [
+				{'id': self.mcq.id, 'text': 'Pick one', 'question_type': 'mcq', 'choices': [
+					{'id': self.keep.id, 'text': f'Keep {count}', 'is_correct': True},
+				]},
+			] + [
+				{'text': f'Q{i}', 'question_type': 'mcq', 'choices': [{'text': 'A'}, {'text': 'B'}]}
+				for i in range(count)
+			]
+		with CaptureQueriesContext(connection) as small:
+			self._save(payload(2))
+		with CaptureQueriesContext(connection) as large:
+			self._save(payload(20))
+		self.assertEqual(len(small), len(large))
+
+	def test_rejects_rows_from_other_surveys(self):
+		other = Survey.objects.create(title='Other', created_by=self.teacher)
+		foreign = Question.objects.create(survey=other, text='Not here', question_type='text')
+		result = self._save([{'id': foreign.id, 'text': 'Hijack', 'question_type': 'text'}])
+		self.assertEqual(result.status_code, 400)
+		self.assertEqual(Question.objects.filter(survey=self.survey).count(), 2)
+
+	def test_edit_form_keeps_matching_choices(self):
+		self.client.post(
+			reverse('edit_question', args=[self.survey.id, self.mcq.id]),
+			{'text': 'Pick one', 'required': 'on', 'choices': ['Keep', 'Other']},
+		)
+		self.assertTrue(Choice.objects.filter(id=self.keep.id, is_correct=True).exists())
+		self.assertFalse(Choice.objects.filter(id=self.drop.id).exists())
+		self.assertEqual(Answer.objects.get(question=self.mcq).selected_choice_id, self.keep.id)
+
+
+class SurveyImportCloneTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.teacher.profile.role = 'teacher'
+		self.teacher.profile.save()
+		self.section_a = Section.objects.create(name='A')
+		self.section_b = Section.objects.create(name='B')
+		self.client.force_login(self.teacher)
+
+	def _document(self, question_count):
+		return {
+			'title': 'Term quiz',
+			'survey_type': 'multiple_choice',
+			'sections': ['A'],
+			'questions': [
+				{'text': f'Q{i}', 'question_type': 'mcq', 'choices': [
+					{'text': 'Right', 'is_correct': True},
+					{'text': 'Wrong'},
+				]}
+				for i in range(question_count)
+			],
+		}
+
+	def test_import_command_creates_everything(self):
+		path = os.path.join(self._tmpdir(), 'surveys.json')
+		with open(path, 'w') as handle:
+			json.dump([self._document(3), {'title': 'Empty'}], handle)
+		call_command('import_surveys', path, teacher='teacher', stdout=StringIO())
+		survey = Survey.objects.get(title='Term quiz')
+		self.assertFalse(survey.assigned_to_all)
+		self.assertEqual(list(survey.assigned_sections.all()), [self.section_a])
+		self.assertEqual(survey.questions.count(), 3)
+		self.assertEqual(Choice.objects.filter(question__survey=survey, is_correct=True).count(), 3)
+		self.assertTrue(Survey.objects.get(title='Empty').assigned_to_all)
+
+	def test_import_rejects_unknown_sections(self):
+		from my_app.services import InvalidQuestionSet, import_surveys
+		document = self._document(1)
+		document['sections'] = ['Nope']
+		with self.assertRaises(InvalidQuestionSet):
+			import_surveys(document, self.teacher)
+		self.assertFalse(Survey.objects.exists())
+
+	def test_clone_uses_constant_queries_and_retargets(self):
+		from my_app.services import import_surveys
+		# 100 questions keep every INSERT within one SQLite parameter batch
+		small, large = import_surveys([self._document(2), self._document(100)], self.teacher)
+		counts = []
+		for survey in (small, large):
+			with CaptureQueriesContext(connection) as queries:
+				result = self.client.post(
+					reverse('clone_survey', args=[survey.id]),
+					{'sections': [self.section_b.id], 'title': 'Next term'},
+				)
+			self.assertEqual(result.status_code, 201)
+			counts.append(len(queries))
+		self.assertEqual(counts[0], counts[1])
+		clone = Survey.objects.get(id=result.json()['id'])
+		self.assertEqual(clone.title, 'Next term')
+		self.assertEqual(list(clone.assigned_sections.all()), [self.section_b])
+		self.assertEqual(clone.questions.count(), 100)
+		self.assertEqual(Choice.objects.filter(question__survey=clone).count(), 200)
+
+	def _tmpdir(self):
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		return directory.name
+
+
+class RosterImportTests(TestCase):
+	def setUp(self):
+		self.section = Section.objects.create(name='7A')
+		self.directory = tempfile.TemporaryDirectory()
+		self.addCleanup(self.directory.cleanup)
+
+	def _roster(self, text):
+		path = os.path.join(self.directory.name, 'roster.csv')
+		with open(path, 'w') as handle:
+			handle.write(text)
+		return path
+
+	def test_import_creates_users_and_profiles_without_signals(self):
+		path = self._roster(
+			'username,email,password,role,section\n'
+			'amy,amy@example.com,pw-amy,student,7A\n'
+			'bob,bob@example.com,pw-bob,,8B\n'
+			'tess,tess@example.com,pw-tess,teacher,7A\n'
+		)
+		with CaptureQueriesContext(connection) as queries:
+			call_command('import_roster', path, workers=2, create_sections=True, stdout=StringIO())
+		User = get_user_model()
+		amy = User.objects.get(username='amy')
+		self.assertTrue(amy.check_password('pw-amy'))
+		self.assertEqual((amy.profile.role, amy.profile.section), ('student', self.section))
+		self.assertEqual(User.objects.get(username='bob').profile.section.name, '8B')
+		self.assertEqual(User.objects.get(username='tess').profile.section, None)
+		# No per-row profile saves from the post_save receiver
+		self.assertFalse(any(q['sql'].startswith('UPDATE') for q in queries.captured_queries))
+		self.assertFalse(User.objects.filter(profile__isnull=True).exists())
+
+	def test_invalid_rows_reject_the_whole_roster(self):
+		get_user_model().objects.create_user(username='amy', email='old@example.com', password='x')
+		path = self._roster(
+			'username,email,section\n'
+			'amy,amy@example.com,7A\n'
+			'cat,cat@example.com,\n'
+			'dan,dan@example.com,7A\n'
+		)
+		err = StringIO()
+		with self.assertRaises(CommandError):
+			call_command('import_roster', path, workers=1, stdout=StringIO(), stderr=err)
+		self.assertIn("username 'amy' already taken", err.getvalue())
+		self.assertIn('section is required', err.getvalue())
+		self.assertFalse(get_user_model().objects.filter(username='dan').exists())
+
+
+class AuthQueryCountTests(TestCase):
+	# Tracked query counts for the auth hot path (savepoints and the
+	# database session writes included); update them deliberately
+	LOGIN_QUERIES = 9
+	REGISTER_QUERIES = 14
+
+	def setUp(self):
+		self.section = Section.objects.create(name='7A')
+		self.user = get_user_model().objects.create_user(username='amy', email='amy@example.com', password='pass')
+
+	def test_login_does_not_touch_the_profile(self):
+		with CaptureQueriesContext(connection) as queries:
+			result = self.client.post(reverse('login'), {'username': 'amy', 'password': 'pass'})
+		self.assertEqual(result.status_code, 302)
+		self.assertEqual(len(queries), self.LOGIN_QUERIES, [q['sql'] for q in queries.captured_queries])
+		self.assertFalse(any('UPDATE "my_app_profile"' in q['sql'] for q in queries.captured_queries))
+
+	def test_register_inserts_profile_once(self):
+		data = {
+			'username': 'bob', 'email': 'bob@example.com', 'password': 'pw', 'password_confirm': 'pw',
+			'role': 'student', 'section': self.section.id,
+		}
+		with CaptureQueriesContext(connection) as queries:
+			result = self.client.post(reverse('register'), data)
+		self.assertEqual(result.status_code, 302)
+		self.assertEqual(len(queries), self.REGISTER_QUERIES, [q['sql'] for q in queries.captured_queries])
+		profile = Profile.objects.get(user__username='bob')
+		self.assertEqual((profile.role, profile.section), ('student', self.section))
+		self.assertFalse(any('UPDATE "my_app_profile"' in q['sql'] for q in queries.captured_queries))
+
+	def test_register_reports_taken_username_and_email_together(self):
+		result = self.client.post(reverse('register'), {
+			'username': 'amy', 'email': 'amy@example.com', 'password': 'pw', 'password_confirm': 'pw',
+			'role': 'teacher',
+		})
+		self.assertEqual(set(result.json()['errors']), {'username', 'email'})
+
+
+class ConcurrentSubmissionTests(TransactionTestCase):
+	STUDENTS = 40
+
+	def setUp(self):
+		self._use_file_database()
+		User = get_user_model()
+		teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Storm', created_by=teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Pick', question_type='mcq')
+		self.choice = Choice.objects.create(question=self.question, text='A', is_correct=True)
+		self.students = User.objects.bulk_create(User(username=f'student{i}') for i in range(self.STUDENTS))
+
+	def _use_file_database(self):
+		"""Run the test on a file copy of the in-memory test database.
+
+		The submitting threads open their own connections, which need a
+		file to share; they use the production SQLite profile (WAL, busy
+		timeout, IMMEDIATE). The rest of the suite stays in memory.
+		"""
+		directory = tempfile.TemporaryDirectory()
+		self.addCleanup(directory.cleanup)
+		path = os.path.join(directory.name, 'concurrent.sqlite3')
+		connection.ensure_connection()
+		with closing(sqlite3.connect(path)) as target:
+			connection.connection.backup(target)
+
+		# New connections, including each thread's, are built from these settings
+		database = mock.patch.dict(connection.settings_dict, {
+			'NAME': path, 'OPTIONS': {**connection.settings_dict['OPTIONS'], **settings.SQLITE_PRODUCTION_OPTIONS},
+		})
+		database.start()
+		self.addCleanup(database.stop)
+		in_memory = connections[DEFAULT_DB_ALIAS]
+		connections[DEFAULT_DB_ALIAS] = connections.create_connection(DEFAULT_DB_ALIAS)
+
+		def restore():
+			connections[DEFAULT_DB_ALIAS].close()
+			connections[DEFAULT_DB_ALIAS] = in_memory
+		self.addCleanup(restore)
+
+	def test_simultaneous_submissions_are_all_stored(self):
+		barrier = threading.Barrier(self.STUDENTS)
+		errors = []
+
+		def submit(student):
+			try:
+				barrier.wait()
+				submit_survey(self.survey, student, {f'question_{self.question.id}': str(self.choice.id)})
+			except Exception as e:
+				errors.append(e)
+			finally:
+				connection.close()
+
+		threads = [threading.Thread(target=submit, args=(student,)) for student in self.students]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(errors, [])
+		self.assertEqual(Response.objects.filter(survey=self.survey).count(), self.STUDENTS)
+		self.assertEqual(Answer.objects.filter(question=self.question).count(), self.STUDENTS)
+		self.assertEqual(HistoryEntry.objects.filter(survey=self.survey).count(), self.STUDENTS)
+		self.assertEqual(SurveyStats.objects.get(survey=self.survey).response_count, self.STUDENTS)
+		self.assertEqual(ChoiceStats.objects.get(choice=self.choice).selection_count, self.STUDENTS)
+
+	def test_double_submit_with_one_key_is_stored_once(self):
+		barrier = threading.Barrier(2)
+		results, errors = [], []
+
+		def submit():
+			try:
+				barrier.wait()
+				response = submit_survey(
+					self.survey, self.students[0], {f'question_{self.question.id}': str(self.choice.id)},
+					idempotency_key='double-click',
+				)
+				results.append(response.id)
+			except Exception as e:
+				errors.append(e)
+			finally:
+				connection.close()
+
+		threads = [threading.Thread(target=submit) for _i in range(2)]
+		for thread in threads:
+			thread.start()
+		for thread in threads:
+			thread.join()
+
+		self.assertEqual(errors, [])
+		self.assertEqual(len(set(results)), 1)
+		self.assertEqual(Answer.objects.filter(question=self.question).count(), 1)
+		self.assertEqual(SurveyStats.objects.get(survey=self.survey).response_count, 1)
+
+
+class AsyncEndpointTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		teacher = User.objects.create_user(username='teacher', password='pass')
+		self.section = Section.objects.create(name='7A')
+		self.student = User.objects.create_user(username='student', email='s@example.com', password='pass')
+		self.student.profile.section = self.section
+		self.student.profile.save()
+		survey = Survey.objects.create(title='Open', created_by=teacher)
+		question = Question.objects.create(survey=survey, text='Why?', question_type='text')
+		Survey.objects.create(title='Pending', created_by=teacher)
+		submit_survey(survey, self.student, {f'question_{question.id}': 'Because'})
+		self.client.force_login(self.student)
+
+	def test_async_twins_match_sync_payloads(self):
+		for sync_url, async_url in (
+			(reverse('current_user'), reverse('async_current_user')),
+			(reverse('assigned_surveys'), reverse('async_assigned_surveys')),
+			(reverse('student_history') + '?format=json', reverse('async_student_history')),
+		):
+			expected = self.client.get(sync_url).json()
+			self.assertEqual(self.client.get(async_url).json(), expected, async_url)
+		self.assertEqual(self.client.get(reverse('async_current_user')).json()['section'], '7A')
+
+	def test_anonymous_requests_redirect_to_login(self):
+		self.client.logout()
+		self.assertEqual(self.client.get(reverse('async_student_history')).status_code, 302)
+
+	def test_async_comparison_report(self):
+		from my_app.benchmark import run_async_comparison
+		report = run_async_comparison(requests=4, concurrency=2)
+		self.assertEqual(set(report['routes']), {'current_user', 'assigned_surveys', 'student_history'})
+		for row in report['routes'].values():
+			self.assertEqual(row['sync']['status'], [200])
+			self.assertEqual(row['async']['status'], [200])
+
+
+@override_settings(ALLOWED_HOSTS=['localhost'])
+class QueryPlanTests(TestCase):
+	def setUp(self):
+		self.output = use_temporary_job_output(self)
+
+	def test_no_route_runs_a_full_table_scan(self):
+		call_command(
+			'seed_data', '--sections', '2', '--students', '6', '--surveys', '2',
+			'--questions', '3', '--responses', '3', stdout=StringIO(),
+		)
+		offenders = audit_routes()
+		report = '\n'.join(
+			f'{route}: {scans} in {sql[:200]}'
+			for route, problems in offenders.items()
+			for sql, scans in problems
+		)
+		self.assertEqual(offenders, {}, report)
+		self.assertEqual(os.listdir(self.output), [])
+
+	def test_hot_filters_use_their_indexes(self):
+		user = get_user_model().objects.create_user(username='teacher', email='t@example.com', password='pass')
+		for queryset in (
+			Response.objects.filter(survey_id=1).order_by('-submitted_at', '-id'),
+			Response.objects.filter(student_id=1).order_by('-submitted_at'),
+			Survey.objects.open_on('2026-01-01'),
+			Survey.objects.visible_to_section(1).active(),
+			Survey.objects.filter(created_by=user).order_by('-created_at'),
+			Choice.objects.filter(question_id__in=[1, 2], is_correct=True),
+			get_user_model().objects.filter(email='t@example.com'),
+		):
+			self.assertEqual(queryset_full_scans(queryset), [], str(queryset.query))
+
+
+class SurveyStructureCacheTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Pick', question_type='mcq')
+		self.right = Choice.objects.create(question=self.question, text='Right', is_correct=True)
+		Choice.objects.create(question=self.question, text='Wrong')
+
+	def _structure_queries(self, queries):
+		return [
+			q['sql'] for q in queries.captured_queries
+			if 'FROM "my_app_question"' in q['sql'] or 'FROM "my_app_choice"' in q['sql']
+		]
+
+	def test_detail_and_submit_reuse_the_cached_structure(self):
+		self.client.force_login(self.student)
+		url = reverse('survey_detail', args=[self.survey.id])
+		self.client.get(url)
+		with CaptureQueriesContext(connection) as queries:
+			result = self.client.get(url)
+			self.client.post(url, {f'question_{self.question.id}': str(self.right.id)})
+		self.assertContains(result, 'Right')
+		self.assertEqual(self._structure_queries(queries), [])
+		self.assertEqual(Response.objects.get(student=self.student).score, 1)
+
+	def test_question_edits_invalidate_the_structure(self):
+		get_survey_structure(self.survey.id)
+		self.client.force_login(self.teacher)
+		self.client.post(
+			reverse('edit_question', args=[self.survey.id, self.question.id]),
+			{'text': 'Pick again', 'required': 'on', 'choices': ['Right', 'Other']},
+		)
+		question = get_survey_structure(self.survey.id)['questions'][0]
+		self.assertEqual(question['text'], 'Pick again')
+		self.assertEqual([c['text'] for c in question['choices']], ['Right', 'Other'])
+		self.assertEqual(question['correct_choice_id'], self.right.id)
+
+		self.client.post(reverse('delete_question', args=[self.survey.id, self.question.id]))
+		self.assertEqual(get_survey_structure(self.survey.id)['questions'], [])
+
+	def test_builder_choice_changes_invalidate_the_structure(self):
+		get_survey_structure(self.survey.id)
+		save_survey_questions(self.survey, [{
+			'id': self.question.id, 'text': 'Pick', 'question_type': 'mcq',
+			'choices': [{'id': self.right.id, 'text': 'Right', 'is_correct': False}, {'text': 'New', 'is_correct': True}],
+		}])
+		question = get_survey_structure(self.survey.id)['questions'][0]
+		self.assertEqual(question['correct_text'], 'New')
+
+
+class SurveyAnalyticsTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.mcq = Question.objects.create(survey=self.survey, text='Pick', question_type='mcq')
+		self.right = Choice.objects.create(question=self.mcq, text='Right', is_correct=True)
+		self.wrong = Choice.objects.create(question=self.mcq, text='Wrong')
+		self.text = Question.objects.create(survey=self.survey, text='Why?', question_type='text')
+		self.url = reverse('survey_analytics', args=[self.survey.id])
+		self.client.force_login(self.teacher)
+
+	def _submit(self, count, choice, name='student'):
+		User = get_user_model()
+		for i in range(count):
+			student = User.objects.create_user(username=f'{name}{i}', password='pass')
+			submit_survey(self.survey, student, {
+				f'question_{self.mcq.id}': str(choice.id),
+				f'question_{self.text.id}': 'because' if i % 2 == 0 else '',
+			})
+
+	def test_distribution_counts_and_percentages(self):
+		self._submit(3, self.right)
+		self._submit(1, self.wrong, name='other')
+		data = self.client.get(self.url).json()
+		self.assertEqual(data['responses'], 4)
+		mcq, text = data['questions']
+		self.assertEqual(mcq['answered'], 4)
+		self.assertEqual([(c['text'], c['count'], c['percent']) for c in mcq['choices']], [('Right', 3, 75.0), ('Wrong', 1, 25.0)])
+		self.assertEqual((mcq['correct'], mcq['correct_percent']), (3, 75.0))
+		self.assertEqual(text['text_answers'], 3)
+
+	def test_filters_apply_and_queries_do_not_grow(self):
+		self._submit(2, self.right)
+		with CaptureQueriesContext(connection) as few:
+			self.client.get(self.url)
+		self._submit(10, self.wrong, name='other')
+		with CaptureQueriesContext(connection) as many:
+			data = self.client.get(self.url, {'search': 'other'}).json()
+		self.assertEqual(len(few), len(many))
+		self.assertEqual(data['responses'], 10)
+		self.assertEqual(data['questions'][0]['correct'], 0)
+
+
+class CompletionMatrixTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.teacher.profile.role = 'teacher'
+		self.teacher.profile.save()
+		self.section_a = Section.objects.create(name='A')
+		self.section_b = Section.objects.create(name='B')
+		self.for_a = Survey.objects.create(title='For A', created_by=self.teacher)
+		self.for_a.assigned_sections.add(self.section_a)
+		self.for_all = Survey.objects.create(title='For all', created_by=self.teacher)
+		self.students = {}
+		for name, section in (('a1', self.section_a), ('a2', self.section_a), ('b1', self.section_b), ('none', None)):
+			student = User.objects.create_user(username=name, password='pass')
+			student.profile.section = section
+			student.profile.save()
+			self.students[name] = student
+		self.client.force_login(self.teacher)
+
+	def _cells(self, data):
+		return {row['name']: row['cells'] for row in data['sections']}
+
+	def test_matrix_counts_expected_and_submitted(self):
+		for name in ('a1', 'b1', 'none'):
+			submit_survey(self.for_all, self.students[name], {})
+		submit_survey(self.for_a, self.students['a2'], {})
+		data = self.client.get(reverse('completion_matrix')).json()
+		self.assertEqual([survey['title'] for survey in data['surveys']], ['For all', 'For A'])
+		cells = self._cells(data)
+		self.assertEqual(cells['A'], [
+			{'expected': 2, 'submitted': 1, 'percent': 50.0},
+			{'expected': 2, 'submitted': 1, 'percent': 50.0},
+		])
+		self.assertEqual(cells['B'], [{'expected': 1, 'submitted': 1, 'percent': 100.0}, None])
+		self.assertEqual(cells['No section'], [{'expected': 1, 'submitted': 1, 'percent': 100.0}, None])
+
+	def test_cached_until_submission_or_roster_change(self):
+		completion_matrix(self.teacher.id)
+		with self.assertNumQueries(0):
+			completion_matrix(self.teacher.id)
+
+		submit_survey(self.for_a, self.students['a1'], {})
+		self.assertEqual(self._cells(completion_matrix(self.teacher.id))['A'][1]['submitted'], 1)
+
+		moved = self.students['b1'].profile
+		moved.section = self.section_a
+		moved.save()
+		self.assertEqual(self._cells(completion_matrix(self.teacher.id))['A'][1]['expected'], 3)
+
+	def test_students_are_forbidden(self):
+		self.client.force_login(self.students['a1'])
+		self.assertEqual(self.client.get(reverse('completion_matrix')).status_code, 403)
+
+
+class BackgroundJobTests(TestCase):
+	def setUp(self):
+		self.output = use_temporary_job_output(self)
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		question = Question.objects.create(survey=self.survey, text='Why?', question_type='text')
+		for i in range(3):
+			student = User.objects.create_user(username=f'student{i}', password='pass')
+			submit_survey(self.survey, student, {f'question_{question.id}': f'answer {i}'})
+		self.client.force_login(self.teacher)
+
+	def test_export_job_runs_in_worker_and_reports_progress(self):
+		response = self.client.post(reverse('export_survey_responses_job', args=[self.survey.id]), {'search': 'student1'})
+		self.assertEqual(response.status_code, 202)
+		status_url = response.json()['status_url']
+		self.assertEqual(self.client.get(status_url).json()['status'], 'queued')
+
+		self.assertEqual(run_worker(drain=True), 1)
+		job = self.client.get(status_url).json()
+		self.assertEqual((job['status'], job['progress'], job['total'], job['percent']), ('done', 1, 1, 100.0))
+		download = self.client.get(job['download_url'])
+		lines = b''.join(download.streaming_content).decode().splitlines()
+		self.assertEqual(len(lines), 2)
+		self.assertIn('answer 1', lines[1])
+
+	def test_failures_are_recorded_and_jobs_are_private(self):
+		job = enqueue('export_responses', self.teacher, survey_id=self.survey.id + 100)
+		run_worker(drain=True)
+		payload = self.client.get(reverse('job_status', args=[job.id])).json()
+		self.assertEqual(payload['status'], 'failed')
+		self.assertIn('DoesNotExist', payload['error'])
+		self.assertEqual(self.client.get(reverse('job_download', args=[job.id])).status_code, 404)
+
+		self.client.force_login(get_user_model().objects.get(username='student0'))
+		self.assertEqual(self.client.get(reverse('job_status', args=[job.id])).status_code, 404)
+
+	def test_a_job_is_claimed_once(self):
+		job = enqueue('rebuild_stats')
+		self.assertEqual(claim_next().id, job.id)
+		self.assertIsNone(claim_next())
+		self.assertEqual(Job.objects.get(id=job.id).status, 'running')
+
+	def test_rebuild_reports_progress_and_reporting_jobs_are_not_stale(self):
+		job = enqueue('rebuild_stats')
+		run_worker(drain=True)
+		job.refresh_from_db()
+		self.assertEqual((job.status, job.progress, job.total), ('done', 3, 3))
+
+		reporting, silent = enqueue('rebuild_stats'), enqueue('rebuild_stats')
+		Job.objects.filter(id__in=[reporting.id, silent.id]).update(status='running', updated_at=timezone.now())
+		Job.objects.filter(id=silent.id).update(updated_at=timezone.now() - timedelta(hours=1))
+		self.assertEqual(requeue_stale(), 1)
+		self.assertEqual(Job.objects.get(id=reporting.id).status, 'running')
+		self.assertEqual(Job.objects.get(id=silent.id).status, 'queued')
+
+	def test_big_survey_delete_is_handed_to_a_worker(self):
+		import my_app.views
+		original = my_app.views.DELETE_IN_BACKGROUND_AFTER
+		my_app.views.DELETE_IN_BACKGROUND_AFTER = 2
+		self.addCleanup(setattr, my_app.views, 'DELETE_IN_BACKGROUND_AFTER', original)
+
+		self.client.post(reverse('delete_survey', args=[self.survey.id]))
+		self.survey.refresh_from_db()
+		self.assertFalse(self.survey.is_active)
+
+		run_worker(drain=True)
+		self.assertFalse(Survey.objects.filter(id=self.survey.id).exists())
+		self.assertEqual(Job.objects.get().result, {'deleted': True, 'responses': 3})
+
+
+class RegradeTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=self.teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Pick', question_type='mcq')
+		self.a = Choice.objects.create(question=self.question, text='A', is_correct=True)
+		self.b = Choice.objects.create(question=self.question, text='B')
+		for i, choice in enumerate((self.a, self.a, self.b)):
+			student = User.objects.create_user(username=f'student{i}', password='pass')
+			submit_survey(self.survey, student, {f'question_{self.question.id}': str(choice.id)})
+
+	def _scores(self):
+		return sorted(Response.objects.values_list('student__username', 'score'))
+
+	def test_flipping_the_key_in_the_builder_regrades_in_the_background(self):
+		payload = [{
+			'id': self.question.id, 'text': 'Pick', 'question_type': 'mcq',
+			'choices': [
+				{'id': self.a.id, 'text': 'A', 'is_correct': False},
+				{'id': self.b.id, 'text': 'B', 'is_correct': True},
+			],
+		}]
+		with self.captureOnCommitCallbacks(execute=True):
+			save_survey_questions(self.survey, payload)
+		self.assertEqual(self._scores(), [('student0', 1), ('student1', 1), ('student2', 0)])
+
+		self.assertEqual(run_worker(drain=True), 1)
+		self.assertEqual(Job.objects.get().result, {'responses': 3, 'changed': 3})
+		self.assertEqual(self._scores(), [('student0', 0), ('student1', 0), ('student2', 1)])
+		self.assertEqual(
+			sorted(HistoryEntry.objects.values_list('student__username', 'score')),
+			[('student0', 0), ('student1', 0), ('student2', 1)],
+		)
+		# The marks in the history snapshot agree with the new score
+		entry = HistoryEntry.objects.get(student__username='student2')
+		self.assertEqual((entry.answers[0]['is_correct'], entry.answers[0]['correct_answer']), (True, 'B'))
+		self.assertEqual(QuestionStats.objects.get(question=self.question).correct_count, 1)
+		self.assertEqual(Answer.objects.filter(is_correct=True).get().selected_choice_id, self.b.id)
+
+	def test_regrade_in_batches_only_counts_real_changes(self):
+		Choice.objects.filter(id=self.b.id).update(is_correct=True)
+		self.assertEqual(regrade_questions([self.question.id], batch_size=2), {'responses': 3, 'changed': 1})
+		self.assertEqual(self._scores(), [('student0', 1), ('student1', 1), ('student2', 1)])
+		self.assertEqual(regrade_questions([self.question.id], batch_size=2), {'responses': 3, 'changed': 0})
+
+	def test_removing_the_correct_choice_queues_a_regrade(self):
+		self.client.force_login(self.teacher)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(
+				reverse('edit_question', args=[self.survey.id, self.question.id]),
+				{'text': 'Pick', 'choices': ['B', 'C']},
+			)
+		run_worker(drain=True)
+		self.assertEqual(self._scores(), [('student0', 0), ('student1', 0), ('student2', 0)])
+
+	def test_changing_a_question_to_mcq_regrades_the_max_score(self):
+		rate = Question.objects.create(survey=self.survey, text='Rate', question_type='likert')
+		good = Choice.objects.create(question=rate, text='Good', is_correct=True)
+		student = get_user_model().objects.create_user(username='student3', password='pass')
+		submit_survey(self.survey, student, {
+			f'question_{self.question.id}': str(self.a.id), f'question_{rate.id}': str(good.id),
+		})
+		payload = [
+			{'id': self.question.id, 'text': 'Pick', 'question_type': 'mcq', 'choices': [
+				{'id': self.a.id, 'text': 'A', 'is_correct': True},
+				{'id': self.b.id, 'text': 'B', 'is_correct': False},
+			]},
+			{'id': rate.id, 'text': 'Rate', 'question_type': 'mcq', 'choices': [
+				{'id': good.id, 'text': 'Good', 'is_correct': True},
+			]},
+		]
+		with self.captureOnCommitCallbacks(execute=True):
+			save_survey_questions(self.survey, payload)
+		run_worker(drain=True)
+		self.assertEqual(
+			sorted(Response.objects.values_list('student__username', 'score', 'max_score')),
+			[('student0', 1, 2), ('student1', 1, 2), ('student2', 0, 2), ('student3', 2, 2)],
+		)
+		entry = HistoryEntry.objects.get(student=student)
+		self.assertEqual((entry.score, entry.max_score), (2, 2))
+		self.assertEqual([item['is_correct'] for item in entry.answers], [True, True])
+
+	def test_deleting_an_mcq_question_rescores(self):
+		self.client.force_login(self.teacher)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('delete_question', args=[self.survey.id, self.question.id]))
+		run_worker(drain=True)
+		self.assertEqual(
+			sorted(Response.objects.values_list('student__username', 'score', 'max_score')),
+			[('student0', 0, 0), ('student1', 0, 0), ('student2', 0, 0)],
+		)
+		entry = HistoryEntry.objects.get(student__username='student0')
+		self.assertEqual((entry.score, entry.max_score), (0, 0))
+		self.assertEqual((entry.answers[0]['answer'], entry.answers[0]['is_correct']), ('A', None))
+
+	def test_bulk_deleting_choices_in_the_admin_regrades(self):
+		before = get_versions(('survey', self.survey.id))
+		admin = get_user_model().objects.create_superuser(username='admin', password='pass')
+		self.client.force_login(admin)
+		with self.captureOnCommitCallbacks(execute=True):
+			self.client.post(reverse('admin:my_app_choice_changelist'), {
+				'action': 'delete_selected', '_selected_action': [self.a.id], 'post': 'yes',
+			})
+		self.assertFalse(Choice.objects.filter(id=self.a.id).exists())
+		self.assertNotEqual(get_versions(('survey', self.survey.id)), before)
+		run_worker(drain=True)
+		self.assertEqual(self._scores(), [('student0', 0), ('student1', 0), ('student2', 0)])
+
+
+class TextSummaryTests(TestCase):
+	def setUp(self):
+		cache.clear()
+		User = get_user_model()
+		self.teacher = User.objects.create_user(username='teacher', password='pass')
+		self.survey = Survey.objects.create(title='Feedback', created_by=self.teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Thoughts?', question_type='text')
+		self.count = 0
+
+	def _answer(self, *texts):
+		for text in texts:
+			self.count += 1
+			student = get_user_model().objects.create_user(username=f'student{self.count}', password='pass')
+			submit_survey(self.survey, student, {f'question_{self.question.id}': text})
+
+	def test_summary_terms_bigrams_lengths_and_clusters(self):
+		self._answer(
+			'The group project was great fun.',
+			'Great fun, the group project!',
+			'Too much homework and not enough group project time this term',
+		)
+		self.client.force_login(self.teacher)
+		summary = self.client.get(reverse('question_text_summary', args=[self.survey.id, self.question.id])).json()
+		self.assertEqual(summary['answers'], 3)
+		self.assertEqual(summary['top_terms'][:2], [{'term': 'group', 'count': 3}, {'term': 'project', 'count': 3}])
+		self.assertEqual(summary['top_bigrams'][0], {'bigram': 'group project', 'count': 3})
+		self.assertEqual(summary['length']['buckets'], {'0-4': 0, '5-9': 2, '10-19': 1, '20-49': 0, '50+': 0})
+		self.assertEqual(summary['length']['median_words'], 6)
+		self.assertEqual(summary['clusters'], [{'example': 'Great fun, the group project!', 'count': 2}])
+
+	def test_new_answers_are_folded_in_and_deletes_rebuild(self):
+		self._answer('first answer')
+		self.assertEqual(text_summary(self.question)['answers'], 1)
+
+		self._answer('second answer')
+		# Only answers after the last one folded in are read
+		with CaptureQueriesContext(connection) as queries:
+			self.assertEqual(text_summary(self.question)['answers'], 2)
+		self.assertIn('"my_app_answer"."id" >', queries.captured_queries[-1]['sql'])
+
+		Response.objects.filter(student__username='student1').delete()
+		summary = text_summary(self.question)
+		self.assertEqual(summary['answers'], 1)
+		self.assertEqual(summary['top_terms'], [{'term': 'second', 'count': 1}, {'term': 'answer', 'count': 1}])
+
+
+class IdempotentSubmissionTests(TestCase):
+	def setUp(self):
+		User = get_user_model()
+		teacher = User.objects.create_user(username='teacher', password='pass')
+		self.student = User.objects.create_user(username='student', password='pass')
+		self.survey = Survey.objects.create(title='Quiz', created_by=teacher)
+		self.question = Question.objects.create(survey=self.survey, text='Pick', question_type='mcq')
+		self.right = Choice.objects.create(question=self.question, text='Right', is_correct=True)
+		self.url = reverse('submit_survey', args=[self.survey.id])
+		self.data = {f'question_{self.question.id}': str(self.right.id)}
+		self.client.force_login(self.student)
+
+	def test_retry_with_the_same_key_returns_the_original_result(self):
+		first = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='abc')
+		self.assertEqual(first.status_code, 201)
+		with CaptureQueriesContext(connection) as queries:
+			retry = self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='abc')
+		self.assertEqual(retry.status_code, 200)
+		self.assertEqual(retry.json()['response_id'], first.json()['response_id'])
+		self.assertEqual(retry.json()['score'], 1)
+		self.assertTrue(retry.json()['replayed'])
+		# Only the Response insert is attempted; no answer, stats or history writes
+		writes = [q['sql'] for q in queries.captured_queries if q['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))]
+		self.assertEqual(len(writes), 1)
+		self.assertIn('"my_app_response"', writes[0])
+		self.assertEqual(Answer.objects.count(), 1)
+		self.assertEqual(SurveyStats.objects.get(survey=self.survey).response_count, 1)
+
+	def test_a_different_key_is_still_rejected(self):
+		self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='abc')
+		self.assertEqual(self.client.post(self.url, self.data, HTTP_IDEMPOTENCY_KEY='other').status_code, 400)
+		self.assertEqual(self.client.post(self.url, self.data).status_code, 400)
+
+	def test_survey_form_carries_a_key_and_double_posts_store_once(self):
+		page = self.client.get(reverse('survey_detail', args=[self.survey.id]))
+		key = page.context['idempotency_key']
+		self.assertContains(page, f'name="idempotency_key" value="{key}"')
+		for _i in range(2):
+			result = self.client.post(reverse('survey_detail', args=[self.survey.id]), {**self.data, 'idempotency_key': key})
+			self.assertRedirects(result, reverse('survey_detail', args=[self.survey.id]))
+		self.assertEqual(Response.objects.get().idempotency_key, key)
+		self.assertEqual(Answer.objects.count(), 1)
@@ -0,0 +1,177 @@
+"""Summaries of the free-text answers to one question.
+
+Term, bigram, length and near-duplicate counts are kept as running
+counters in the cache, together with the id of the last answer folded
+in. Each read fetches only the answers written since and adds them to the
+counters, so a question with tens of thousands of answers is scanned once
+and then costs one small indexed query per read. SQLite has one writer at
+a time, so answer ids grow in commit order and nothing is skipped.
+
+The counters are dropped with the survey's structure version (questions
+edited or removed) and its answers version (responses deleted), and are
+then rebuilt with one chunked pass.
+
+The project has no numerical dependencies, so the pass is not vectorized
+in the numpy sense: answers are tokenized one by one, and each chunk of
+FOLD_CHUNK_SIZE answers then reaches every counter in a single
+``Counter.update``. A read that folded in new answers writes the whole
+state back to the cache once. That pickles every tracked key, up to about
+three times MAX_TRACKED (terms, bigrams and clusters) plus cluster
+examples. On a large question that is about a megabyte and ten
+milliseconds per write. Reads that find nothing new skip the write.
+"""
+import hashlib
+import re
+from collections import Counter
+from itertools import islice
+
+from django.core.cache import cache
+
+from .caching import DASHBOARD_TIMEOUT, get_versions
+from .models import Answer
+
+
+FOLD_CHUNK_SIZE = 2000
+TOP_TERMS = 20
+TOP_CLUSTERS = 10
+# Once a counter tracks this many keys, keys seen only once are pruned, so
+# the cached state stays bounded; the top of each list is unaffected
+MAX_TRACKED = 20000
+
+# Answer lengths in words: (lower bound, label)
+LENGTH_BUCKETS = ((0, '0-4'), (5, '5-9'), (10, '10-19'), (20, '20-49'), (50, '50+'))
+
+STOP_WORDS = frozenset("""
+a about after all also am an and any are as at be because been but by can could did do does doing
+for from had has have he her here him his how i if in into is it its just me more most my no not
+of on or our out over she so some such than that the their them then there these they this to too
+up very was we were what when where which while who why will with would you your
+""".split())
+
+_WORD = re.compile(r"[^\W\d_]+(?:'[^\W\d_]+)*")
+
+
+def tokenize(text):
+    """Lowercase words of ``text``, with apostrophes kept inside words."""
+    return _WORD.findall(text.lower())
+
+
+def _signature(terms, words):
+    # Answers with the same set of content words (in any order, repeated or
+    # not, with any punctuation) are treated as near duplicates
+    basis = ' '.join(sorted(set(terms))) or ' '.join(words)
+    return hashlib.blake2b(basis.encode(), digest_size=8).hexdigest()
+
+
+def _empty_state():
+    return {
+        'last_id': 0,
+        'answers': 0,
+        'words': 0,
+        'lengths': Counter(),
+        'terms': Counter(),
+        'bigrams': Counter(),
+        'clusters': Counter(),
+        'examples': {},
+    }
+
+
+def _prune(counter):
+    if len(counter) > MAX_TRACKED:
+        for key in [key for key, count in counter.items() if count == 1]:
+            del counter[key]
+
+
+def _fold(state, rows):
+    """Add ``(id, text)`` rows, in id order, to ``state``, one chunk of rows at a time."""
+    rows = iter(rows)
+    while chunk := list(islice(rows, FOLD_CHUNK_SIZE)):
+        lengths, terms, bigrams, signatures = [], [], [], []
+        # The first two texts of each signature, for clusters formed by this chunk
+        texts = {}
+        for _answer_id, text in chunk:
+            words = tokenize(text)
+            if not words:
+                continue
+            content = [word for word in words if word not in STOP_WORDS and len(word) > 1]
+            lengths.append(len(words))
+            terms.extend(content)
+            bigrams.extend(' '.join(pair) for pair in zip(content, content[1:]))
+            signature = _signature(content, words)
+            signatures.append(signature)
+            seen = texts.setdefault(signature, [])
+            if len(seen) < 2:
+                seen.append(text)
+
+        # Each counter takes the whole chunk in one update
+        state['last_id'] = chunk[-1][0]
+        state['answers'] += len(lengths)
+        state['words'] += sum(lengths)
+        state['lengths'].update(lengths)
+        state['terms'].update(terms)
+        state['bigrams'].update(bigrams)
+        clusters = Counter(signatures)
+        for signature, count in clusters.items():
+            before = state['clusters'][signature]
+            if before < 2 <= before + count:
+                # Only clusters get an example (their second answer), so
+                # unique answers cost no text
+                state['examples'][signature] = texts[signature][1 - before].strip()
+        state['clusters'].update(clusters)
+        for name in ('terms', 'bigrams', 'clusters'):
+            _prune(state[name])
+
+
+def _median(lengths, total):
+    seen = 0
+    for length in sorted(lengths):
+        seen += lengths[length]
+        if seen * 2 >= total:
+            return length
+    return 0
+
+
+def _summarize(state):
+    total = state['answers']
+    buckets = {label: 0 for _low, label in LENGTH_BUCKETS}
+    for length, count in state['lengths'].items():
+        label = next(label for low, label in reversed(LENGTH_BUCKETS) if length >= low)
+        buckets[label] += count
+    return {
+        'answers': total,
+        'length': {
+            'mean_words': round(state['words'] / total, 1) if total else 0.0,
+            'median_words': _median(state['lengths'], total),
+            'buckets': buckets,
+        },
+        'top_terms': [{'term': term, 'count': count} for term, count in state['terms'].most_common(TOP_TERMS)],
+        'top_bigrams': [
+            {'bigram': bigram, 'count': count} for bigram, count in state['bigrams'].most_common(TOP_TERMS)
+        ],
+        'clusters': [
+            {'example': state['examples'][signature], 'count': count}
+            for signature, count in state['clusters'].most_common(TOP_CLUSTERS)
+            if count > 1
+        ],
+    }
+
+
+def text_summary(question):
+    """Return the text-answer summary of ``question``, folding in answers written since the last call."""
+    versions = get_versions(('survey', question.survey_id), ('answers', question.survey_id))
+    key = ':'.join(['dashboard', f'text-summary:{question.id}', *(str(v) for v in versions)])
+    state = cache.get(key) or _empty_state()
+
+    rows = (
+        Answer.objects.filter(question_id=question.id, id__gt=state['last_id'])
+        .exclude(text_answer__isnull=True)
+        .exclude(text_answer='')
+        .order_by('id')
+        .values_list('id', 'text_answer')
+        .iterator(chunk_size=FOLD_CHUNK_SIZE)
+    )
+    last_id = state['last_id']
+    _fold(state, rows)
+    if state['last_id'] != last_id:
+        cache.set(key, state, DASHBOARD_TIMEOUT)
+    return _summarize(state)
@@ -1,5 +1,5 @@
 from django.urls import path
-from . import views
+from . import async_views, views
 
 urlpatterns = [
     # Home page
@@ -13,20 +13,34 @@ urlpatterns = [
 
     # Dashboards
     path('dashboard/teacher/', views.TeacherDashboardView.as_view(), name='teacher_dashboard'),
+    path('dashboard/teacher/completion/', views.CompletionMatrixView.as_view(), name='completion_matrix'),
     path('dashboard/student/', views.StudentDashboardView.as_view(), name='student_dashboard'),
     path('survey/<int:survey_id>/', views.SurveyDetailView.as_view(), name='survey_detail'),
 
     # Survey Builder (Teacher)
     path('survey/create/', views.CreateSurveyFormView.as_view(), name='create_survey_form'),
     path('survey/<int:survey_id>/edit/', views.EditSurveyView.as_view(), name='edit_survey'),
+    path('survey/<int:survey_id>/questions/', views.SurveyQuestionSetView.as_view(), name='survey_questions'),
     path('survey/<int:survey_id>/add_question/', views.SurveyQuestionCreateView.as_view(), name='add_question'),
     path('survey/<int:survey_id>/question/<int:question_id>/edit/', views.EditQuestionView.as_view(), name='edit_question'),
     path('survey/<int:survey_id>/question/<int:question_id>/delete/', views.DeleteQuestionView.as_view(), name='delete_question'),
+    path('survey/<int:survey_id>/clone/', views.CloneSurveyView.as_view(), name='clone_survey'),
     path('survey/<int:survey_id>/delete/', views.DeleteSurveyView.as_view(), name='delete_survey'),
     path('survey/<int:survey_id>/responses/', views.SurveyResponsesAnalyticsView.as_view(), name='survey_responses'),
+    path('survey/<int:survey_id>/responses/analytics/', views.SurveyAnalyticsView.as_view(), name='survey_analytics'),
+    path('survey/<int:survey_id>/question/<int:question_id>/text-summary/', views.QuestionTextSummaryView.as_view(), name='question_text_summary'),
+    path('survey/<int:survey_id>/responses/export/', views.SurveyResponsesExportView.as_view(), name='export_survey_responses'),
+    path('survey/<int:survey_id>/responses/export/jobs/', views.SurveyExportJobView.as_view(), name='export_survey_responses_job'),
+    path('jobs/<int:job_id>/', views.JobStatusView.as_view(), name='job_status'),
+    path('jobs/<int:job_id>/download/', views.JobDownloadView.as_view(), name='job_download'),
 
     # Student endpoints
     path('student/surveys/', views.AssignedSurveyListView.as_view(), name='assigned_surveys'),
     path('survey/<int:survey_id>/submit/', views.SubmitSurveyView.as_view(), name='submit_survey'),
     path('student/history/', views.StudentHistoryView.as_view(), name='student_history'),
+
+    # Async JSON endpoints for ASGI deployments (same payloads as the sync views)
+    path('api/async/me/', async_views.AsyncCurrentUserView.as_view(), name='async_current_user'),
+    path('api/async/surveys/', async_views.AsyncAssignedSurveyListView.as_view(), name='async_assigned_surveys'),
+    path('api/async/history/', async_views.AsyncStudentHistoryView.as_view(), name='async_student_history'),
 ]
@@ -1,15 +1,38 @@
+import json
+import uuid
+
 from django.shortcuts import get_object_or_404, redirect, render
 from django.views import View
-from django.http import JsonResponse, HttpResponseForbidden
+from django.http import FileResponse, Http404, JsonResponse, HttpResponseForbidden, StreamingHttpResponse
 from .models import (
     Answer,
     Choice,
+    HistoryEntry,
+    Job,
     Profile,
     Question,
     Response,
     Section,
     Survey,
+    SurveyStats,
+)
+from .analytics import completion_matrix, question_distributions
+from .caching import ALL_SECTIONS, cached_fragment
+from .exports import EXPORT_FORMATS, iter_export
+from .jobs import enqueue, job_output_path
+from .pagination import keyset_paginate
+from .services import (
+    AlreadySubmitted,
+    InvalidQuestionSet,
+    clone_survey,
+    filter_responses,
+    queue_regrade,
+    save_survey_questions,
+    submit_survey,
+    sync_question_choices,
 )
+from .structure import get_survey_structure
+from .text_analytics import text_summary
 from django.contrib.auth.models import User
 from django.utils import timezone
 from django.contrib.auth.mixins import LoginRequiredMixin
@@ -17,12 +40,11 @@ from django.utils.dateparse import parse_date
 from django.contrib.auth import login, logout
 from django.contrib.auth.forms import AuthenticationForm
 from django.urls import reverse
-from django.utils.http import url_has_allowed_host_and_scheme
-from django.db import transaction, models
+from django.utils.http import url_has_allowed_host_and_scheme, urlencode
+from django.db import IntegrityError, transaction, models
 from django.views.generic import TemplateView
-from django.core.paginator import Paginator
-from django.db.models import Q
-from datetime import datetime
+from django.db.models import Count, Exists, OuterRef
+from django.db.models.functions import Coalesce
 
 
 # === TEACHER VIEWS ===
@@ -36,17 +58,19 @@ class SurveyQuestionCreateView(LoginRequiredMixin, View):
 
         survey = get_object_or_404(Survey, id=survey_id)
         q_type = request.POST.get('question_type') or 'text'
-        question = Question.objects.create(
-            survey=survey,
-            text=request.POST.get('text', '').strip(),
-            question_type=q_type,
-        )
-        if q_type in ['mcq', 'likert']:
-            # accept either 'choices' or 'choices[]' form names
-            choices = request.POST.getlist('choices') or request.POST.getlist('choices[]')
-            for choice_text in choices:
-                if choice_text:
-                    Choice.objects.create(question=question, text=choice_text)
+        # One transaction, so the structure cache is bumped after the choices land
+        with transaction.atomic():
+            question = Question.objects.create(
+                survey=survey,
+                text=request.POST.get('text', '').strip(),
+                question_type=q_type,
+            )
+            if q_type in ['mcq', 'likert']:
+                # accept either 'choices' or 'choices[]' form names
+                choices = request.POST.getlist('choices') or request.POST.getlist('choices[]')
+                Choice.objects.bulk_create(
+                    Choice(question=question, text=choice_text) for choice_text in choices if choice_text
+                )
         return JsonResponse({'message': 'Question added', 'id': question.id}, status=201)
 
 
@@ -59,123 +83,80 @@ class AssignedSurveyListView(LoginRequiredMixin, View):
         if not profile:
             return JsonResponse([], safe=False)
 
-        surveys = self._get_open_surveys_for_section(profile.section)
-        payload = [
-            {
-                'id': survey.id,
-                'title': survey.title,
-                'description': survey.description,
-                'due_date': survey.due_date,
-            }
-            for survey in surveys
-        ]
-        return JsonResponse(payload, safe=False)
+        surveys = open_surveys_for_section(profile.section_id)
+        return JsonResponse([assigned_survey_payload(survey) for survey in surveys], safe=False)
 
-    def _get_open_surveys_for_section(self, section):
-        today = timezone.localdate()
-        all_surveys = Survey.objects.filter(
-            is_active=True
-        ).filter(
-            models.Q(due_date__isnull=True) | models.Q(due_date__gte=today)
-        ).prefetch_related('assigned_sections')
-        
-        # Filter surveys: show if no assigned sections OR if student's section is in assigned sections
-        filtered_surveys = []
-        for survey in all_surveys:
-            if survey.assigned_sections.count() == 0:
-                filtered_surveys.append(survey)
-            elif section and section in survey.assigned_sections.all():
-                filtered_surveys.append(survey)
-        
-        return filtered_surveys
+
+def open_surveys_for_section(section):
+    """Active surveys visible to ``section`` whose due date has not passed."""
+    return Survey.objects.visible_to_section(section).open_on(timezone.localdate())
+
+
+def assigned_survey_payload(survey):
+    return {
+        'id': survey.id,
+        'title': survey.title,
+        'description': survey.description,
+        'due_date': survey.due_date,
+    }
 
 
 # Submit survey response
 class SubmitSurveyView(LoginRequiredMixin, View):
     def post(self, request, survey_id):
         survey = get_object_or_404(Survey, id=survey_id)
-        user = request.user
+        key = submission_key(request)
+        if key is not None and len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            return JsonResponse({'error': 'Idempotency key is too long.'}, status=400)
 
-        if Response.objects.filter(survey=survey, student=user).exists():
+        try:
+            response = submit_survey(survey, request.user, request.POST, idempotency_key=key)
+        except AlreadySubmitted:
             return JsonResponse({'error': 'Already submitted'}, status=400)
+        payload = {
+            'message': 'Survey submitted successfully',
+            'response_id': response.id,
+            'score': response.score,
+            'max_score': response.max_score,
+            'submitted_at': response.submitted_at.isoformat(),
+        }
+        if response.replayed:
+            # A retry of a stored submission gets the original result back
+            payload['replayed'] = True
+            return JsonResponse(payload)
+        return JsonResponse(payload, status=201)
+
+
+# Matches Response.idempotency_key
+IDEMPOTENCY_KEY_MAX_LENGTH = 64
 
-        response = Response.objects.create(survey=survey, student=user)
-        for question in survey.questions.all():
-            answer_key = f'question_{question.id}'
-            if question.question_type in ['mcq', 'likert']:
-                choice_id = request.POST.get(answer_key)
-                if choice_id:
-                    # selected_choice_id assignment is okay; cast/validate if needed
-                    Answer.objects.create(
-                        response=response, question=question, selected_choice_id=choice_id
-                    )
-            else:
-                text_value = request.POST.get(answer_key, '')
-                Answer.objects.create(response=response, question=question, text_answer=text_value)
-        return JsonResponse({'message': 'Survey submitted successfully'}, status=201)
+
+def submission_key(request):
+    """The idempotency key of a submission, from the Idempotency-Key header or the form."""
+    key = (request.headers.get('Idempotency-Key') or request.POST.get('idempotency_key') or '').strip()
+    return key or None
 
 
 # View submission history
 class StudentHistoryView(LoginRequiredMixin, TemplateView):
+    """Submission history, served from the HistoryEntry snapshots written at submit time."""
     template_name = 'my_app/student_history.html'
 
     def get(self, request, *args, **kwargs):
         if self._wants_json(request):
-            responses = self._get_responses(request)
-            data = [
-                {
-                    'survey_title': r.survey.title,
-                    'submitted_at': r.submitted_at,
-                    'survey_id': r.survey.id,
-                    'answers': [
-                        {
-                            'question': answer.question.text,
-                            'response': answer.selected_choice.text if answer.selected_choice else answer.text_answer,
-                        }
-                        for answer in r.answers.all()
-                    ],
-                }
-                for r in responses
-            ]
+            data = [history_entry_payload(entry) for entry in self._get_entries(request)]
             return JsonResponse(data, safe=False)
 
         return super().get(request, *args, **kwargs)
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        responses = self._get_responses(self.request)
+        history = self._get_entries(self.request)
         profile = getattr(self.request.user, 'profile', None)
-        history = []
-        for response in responses:
-            answer_details = []
-            for answer in response.answers.all():
-                if answer.selected_choice:
-                    value = answer.selected_choice.text
-                else:
-                    value = answer.text_answer or '—'
-                answer_details.append(
-                    {
-                        'question': answer.question.text,
-                        'question_type': answer.question.question_type,
-                        'answer': value,
-                        'is_correct': answer.is_correct,  # True, False, or None
-                        'correct_answer': answer.correct_answer,  # The correct answer text if MCQ
-                        'answer_obj': answer,  # Pass the answer object for template access
-                    }
-                )
-
-            history.append(
-                {
-                    'survey': response.survey,
-                    'submitted_at': response.submitted_at,
-                    'answers': answer_details,
-                }
-            )
-
         context.update(
             {
                 'history': history,
-                'response_count': responses.count(),
+                'response_count': len(history),
                 'profile': profile,
                 'section': profile.section if profile else None,
                 'dashboard_url': reverse('student_dashboard'),
@@ -183,19 +164,33 @@ class StudentHistoryView(LoginRequiredMixin, TemplateView):
         )
         return context
 
-    def _get_responses(self, request):
-        return (
-            Response.objects.filter(student=request.user)
-            .select_related('survey', 'survey__created_by')
-            .prefetch_related('answers__question', 'answers__selected_choice', 'survey__assigned_sections')
-            .order_by('-submitted_at')
-        )
+    def _get_entries(self, request):
+        return list(student_history_entries(request.user))
 
     def _wants_json(self, request):
         accept = request.headers.get('Accept', '')
         return 'application/json' in accept or request.GET.get('format') == 'json'
 
 
+def student_history_entries(user):
+    # One read on the (student, -submitted_at) index; no joins or prefetches
+    return HistoryEntry.objects.filter(student=user).order_by('-submitted_at')
+
+
+def history_entry_payload(entry):
+    return {
+        'survey_title': entry.survey_title,
+        'submitted_at': entry.submitted_at,
+        'survey_id': entry.survey_id,
+        'score': entry.score,
+        'max_score': entry.max_score,
+        'answers': [
+            {'question': answer['question'], 'response': answer['answer']}
+            for answer in entry.answers
+        ],
+    }
+
+
 # === AUTHENTICATION VIEWS ===
 
 class RegisterView(View):
@@ -236,42 +231,46 @@ class RegisterView(View):
                 if not selected_section:
                     errors['section'] = 'Selected section does not exist.'
         
-        # Check if username/email already exists
-        if User.objects.filter(username=username).exists():
-            errors['username'] = 'Username already taken.'
-        if User.objects.filter(email=email).exists():
-            errors['email'] = 'Email already registered.'
+        # Check if username/email already exists, in one query
+        for taken_username, taken_email in User.objects.filter(
+            models.Q(username=username) | models.Q(email=email)
+        ).values_list('username', 'email'):
+            if taken_username == username:
+                errors['username'] = 'Username already taken.'
+            if taken_email == email:
+                errors['email'] = 'Email already registered.'
         
         if errors:
             return JsonResponse({'errors': errors}, status=400)
         
-        # Create user and profile within a transaction
+        # Create user and profile within a transaction; the profile is
+        # inserted once, already carrying its role and section
         try:
             with transaction.atomic():
-                user = User.objects.create_user(
-                    username=username,
-                    email=email,
-                    password=password
+                user = User(
+                    username=User.normalize_username(username),
+                    email=User.objects.normalize_email(email),
                 )
-                # Profile is auto-created by post_save signal, just update it
-                user.profile.role = role
-                if role == 'student':
-                    user.profile.section = selected_section
-                else:
-                    user.profile.section = None
-                user.profile.save()
-            
-            # Auto-login after registration (optional)
-            login(request, user)
-            # Redirect to appropriate dashboard based on role
-            if role == 'teacher':
-                return redirect('teacher_dashboard')
-            else:
-                return redirect('student_dashboard')
-        
+                user.set_password(password)
+                user.pending_profile = Profile(
+                    role=role,
+                    section=selected_section if role == 'student' else None,
+                )
+                user.save()
+        except IntegrityError:
+            # Lost a race with a concurrent registration of the same username
+            return JsonResponse({'errors': {'username': 'Username already taken.'}}, status=400)
         except Exception as e:
             return JsonResponse({'error': str(e)}, status=500)
 
+        # Auto-login after registration (optional)
+        login(request, user)
+        # Redirect to appropriate dashboard based on role
+        if role == 'teacher':
+            return redirect('teacher_dashboard')
+        else:
+            return redirect('student_dashboard')
+
 
 class LoginView(View):
     """Login view for both teacher and student."""
@@ -294,7 +293,8 @@ class LoginView(View):
         if form.is_valid():
             user = form.get_user()
             login(request, user)
-            profile = getattr(user, 'profile', None)
+            # Read with the user (see backends.py); users older than profiles get one now
+            profile = getattr(user, 'profile', None) or Profile.objects.create(user=user)
             redirect_url = self._get_safe_redirect_url(request, next_url, profile)
             return redirect(redirect_url)
 
@@ -338,13 +338,17 @@ class CurrentUserView(LoginRequiredMixin, View):
     def get(self, request):
         """Get current user details."""
         profile = getattr(request.user, 'profile', None)
-        return JsonResponse({
-            'user_id': request.user.id,
-            'username': request.user.username,
-            'email': request.user.email,
-            'role': profile.role if profile else 'unknown',
-            'section': profile.section.name if profile and profile.section else None,
-        }, status=200)
+        return JsonResponse(current_user_payload(request.user, profile), status=200)
+
+
+def current_user_payload(user, profile):
+    return {
+        'user_id': user.id,
+        'username': user.username,
+        'email': user.email,
+        'role': profile.role if profile else 'unknown',
+        'section': profile.section.name if profile and profile.section else None,
+    }
 
 
 # === DASHBOARDS ===
@@ -506,20 +510,20 @@ class AddQuestionView(LoginRequiredMixin, View):
         if not question_text:
             return redirect('edit_survey', survey_id=survey_id)
         
-        question = Question.objects.create(
-            survey=survey,
-            text=question_text,
-            question_type=question_type,
-            required=required
-        )
-        
-        # Add choices if MCQ or Likert
-        if question_type in ['mcq', 'likert']:
-            choices_data = request.POST.getlist('choices')
-            for choice_text in choices_data:
-                choice_text = choice_text.strip()
-                if choice_text:
-                    Choice.objects.create(question=question, text=choice_text)
+        with transaction.atomic():
+            question = Question.objects.create(
+                survey=survey,
+                text=question_text,
+                question_type=question_type,
+                required=required
+            )
+            
+            # Add choices if MCQ or Likert
+            if question_type in ['mcq', 'likert']:
+                choices_data = [text.strip() for text in request.POST.getlist('choices')]
+                Choice.objects.bulk_create(
+                    Choice(question=question, text=choice_text) for choice_text in choices_data if choice_text
+                )
         
         return redirect('edit_survey', survey_id=survey_id)
 
@@ -534,22 +538,82 @@ class EditQuestionView(LoginRequiredMixin, View):
         
         question.text = request.POST.get('text', question.text).strip()
         question.required = request.POST.get('required') == 'on'
-        question.save()
-        
-        # Update choices if MCQ or Likert
-        if question.question_type in ['mcq', 'likert']:
-            # Clear old choices
-            question.choices.all().delete()
-            # Add new choices
-            choices_data = request.POST.getlist('choices')
-            for choice_text in choices_data:
-                choice_text = choice_text.strip()
-                if choice_text:
-                    Choice.objects.create(question=question, text=choice_text)
+        with transaction.atomic():
+            question.save()
+            # Update choices if MCQ or Likert; unchanged choices keep their
+            # ids so existing answers stay attached to them
+            if question.question_type in ['mcq', 'likert']:
+                sync_question_choices(question, request.POST.getlist('choices'))
         
         return redirect('edit_survey', survey_id=survey_id)
 
 
+class SurveyQuestionSetView(LoginRequiredMixin, View):
+    """Read or save a survey's whole question set as JSON (survey builder API)."""
+
+    def get(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
+        questions = survey.questions.prefetch_related('choices').order_by('id')
+        return JsonResponse(
+            {'questions': [_question_payload(q, q.choices.all()) for q in questions]}
+        )
+
+    def post(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
+        try:
+            payload = json.loads(request.body or b'null')
+        except ValueError:
+            return JsonResponse({'error': 'Invalid JSON.'}, status=400)
+        if isinstance(payload, dict):
+            payload = payload.get('questions')
+        try:
+            questions = save_survey_questions(survey, payload)
+        except InvalidQuestionSet as e:
+            return JsonResponse({'error': str(e)}, status=400)
+        return JsonResponse(
+            {'questions': [_question_payload(q, q.saved_choices) for q in questions]}
+        )
+
+
+class CloneSurveyView(LoginRequiredMixin, View):
+    """Copy one of the teacher's surveys, optionally for other sections."""
+
+    def post(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
+        section_ids = None
+        if 'sections' in request.POST or request.POST.get('retarget') == 'on':
+            try:
+                section_ids = {int(value) for value in request.POST.getlist('sections')}
+            except ValueError:
+                return JsonResponse({'error': 'Invalid section id.'}, status=400)
+            if len(section_ids) != Section.objects.filter(id__in=section_ids).count():
+                return JsonResponse({'error': 'Unknown section.'}, status=400)
+        clone = clone_survey(
+            survey,
+            request.user,
+            section_ids=section_ids,
+            title=request.POST.get('title', '').strip() or None,
+        )
+        return JsonResponse({
+            'message': 'Survey cloned',
+            'id': clone.id,
+            'edit_url': reverse('edit_survey', args=[clone.id]),
+        }, status=201)
+
+
+def _question_payload(question, choices):
+    return {
+        'id': question.id,
+        'text': question.text,
+        'question_type': question.question_type,
+        'required': question.required,
+        'choices': [
+            {'id': choice.id, 'text': choice.text, 'is_correct': choice.is_correct}
+            for choice in choices
+        ],
+    }
+
+
 class DeleteQuestionView(LoginRequiredMixin, View):
     """Delete a question from a survey."""
     
@@ -557,22 +621,43 @@ class DeleteQuestionView(LoginRequiredMixin, View):
         """Delete question."""
         survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
         question = get_object_or_404(Question, id=question_id, survey=survey)
-        question.delete()
+        with transaction.atomic():
+            question.delete()
+            if question.question_type == 'mcq':
+                queue_regrade([question_id], survey_ids=[survey.id])
         
         return redirect('edit_survey', survey_id=survey_id)
 
 
+# Surveys with more responses than this are deleted by a background job
+DELETE_IN_BACKGROUND_AFTER = 1000
+
+
 class DeleteSurveyView(LoginRequiredMixin, View):
     """Delete an entire survey."""
     
     def post(self, request, survey_id):
         """Delete survey."""
         survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
-        survey.delete()
+        response_count = (
+            SurveyStats.objects.filter(survey=survey).values_list('response_count', flat=True).first() or 0
+        )
+        if response_count > DELETE_IN_BACKGROUND_AFTER:
+            # Closed right away so no new submissions arrive while the worker deletes
+            survey.is_active = False
+            survey.save(update_fields=['is_active'])
+            enqueue('delete_survey', request.user, survey_id=survey.id)
+        else:
+            survey.delete()
         
         return redirect('teacher_dashboard')
 
 
+RESPONSES_PER_PAGE = 10
+# Filtered result sets are counted up to this many rows, then shown as "N+"
+RESPONSE_COUNT_CAP = 1000
+
+
 class SurveyResponsesAnalyticsView(LoginRequiredMixin, TemplateView):
     """View survey responses and analytics with pagination, search, and date filtering."""
     template_name = 'my_app/survey_responses.html'
@@ -584,53 +669,165 @@ class SurveyResponsesAnalyticsView(LoginRequiredMixin, TemplateView):
         # Get all responses for this survey
         responses = Response.objects.filter(survey=survey).select_related('student').prefetch_related('answers__question', 'answers__selected_choice').order_by('-submitted_at')
         
-        # Apply search filter (by student name/username)
+        # Apply search and date filters
         search_query = self.request.GET.get('search', '').strip()
-        if search_query:
-            responses = responses.filter(
-                Q(student__username__icontains=search_query) |
-                Q(student__first_name__icontains=search_query) |
-                Q(student__last_name__icontains=search_query) |
-                Q(student__email__icontains=search_query)
-            )
-        
-        # Apply date filter
         date_from = self.request.GET.get('date_from', '').strip()
         date_to = self.request.GET.get('date_to', '').strip()
-        if date_from:
-            try:
-                date_from_obj = datetime.strptime(date_from, '%Y-%m-%d').date()
-                responses = responses.filter(submitted_at__date__gte=date_from_obj)
-            except ValueError:
-                pass
-        if date_to:
-            try:
-                date_to_obj = datetime.strptime(date_to, '%Y-%m-%d').date()
-                responses = responses.filter(submitted_at__date__lte=date_to_obj)
-            except ValueError:
-                pass
-        
-        # Get total count before pagination
-        total_responses = responses.count()
+        responses = filter_responses(responses, search_query, date_from, date_to)
+        
+        # Unfiltered totals come from the counters; filtered ones are capped
+        # so a broad search never turns into a full COUNT(*) over the survey.
+        total_is_capped = False
+        if search_query or date_from or date_to:
+            total_responses = responses.order_by()[:RESPONSE_COUNT_CAP + 1].count()
+            if total_responses > RESPONSE_COUNT_CAP:
+                total_responses, total_is_capped = RESPONSE_COUNT_CAP, True
+        else:
+            stats = SurveyStats.objects.filter(survey=survey).first()
+            total_responses = stats.response_count if stats else 0
         questions = survey.questions.all().prefetch_related('choices')
         
-        # Pagination
-        paginator = Paginator(responses, 10)  # 10 responses per page
-        page_number = self.request.GET.get('page', 1)
-        page_obj = paginator.get_page(page_number)
+        # Keyset pagination on (submitted_at, id): stable while new submissions arrive
+        page_obj = keyset_paginate(
+            responses,
+            cursor=self.request.GET.get('cursor', ''),
+            direction=self.request.GET.get('direction', 'next'),
+            per_page=RESPONSES_PER_PAGE,
+        )
+        filter_params = {
+            key: value
+            for key, value in (('search', search_query), ('date_from', date_from), ('date_to', date_to))
+            if value
+        }
         
         context['survey'] = survey
         context['total_responses'] = total_responses
+        context['total_is_capped'] = total_is_capped
         context['responses'] = page_obj
         context['questions'] = questions
         context['page_obj'] = page_obj
         context['search_query'] = search_query
         context['date_from'] = date_from
         context['date_to'] = date_to
+        context['filter_query'] = urlencode(filter_params)
         
         return context
 
 
+class SurveyAnalyticsView(LoginRequiredMixin, View):
+    """Per-question answer distributions as JSON, honouring the page filters."""
+
+    def get(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
+        search_query = request.GET.get('search', '').strip()
+        date_from = request.GET.get('date_from', '').strip()
+        date_to = request.GET.get('date_to', '').strip()
+        responses = filter_responses(
+            Response.objects.filter(survey=survey), search_query, date_from, date_to
+        )
+        payload = question_distributions(survey, responses)
+        payload['survey_id'] = survey.id
+        payload['filters'] = {'search': search_query, 'date_from': date_from, 'date_to': date_to}
+        return JsonResponse(payload)
+
+
+class QuestionTextSummaryView(LoginRequiredMixin, View):
+    """Summary of a question's free-text answers as JSON."""
+
+    def get(self, request, survey_id, question_id):
+        question = get_object_or_404(
+            Question, id=question_id, survey_id=survey_id, survey__created_by=request.user
+        )
+        payload = text_summary(question)
+        payload['question_id'] = question.id
+        return JsonResponse(payload)
+
+
+class SurveyResponsesExportView(LoginRequiredMixin, View):
+    """Stream a survey's responses as CSV or NDJSON, honouring the page filters."""
+
+    def get(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
+        export_format = request.GET.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': 'Unsupported export format.'}, status=400)
+
+        responses = filter_responses(
+            Response.objects.filter(survey=survey),
+            request.GET.get('search', '').strip(),
+            request.GET.get('date_from', '').strip(),
+            request.GET.get('date_to', '').strip(),
+        )
+        content_type = 'text/csv' if export_format == 'csv' else 'application/x-ndjson'
+        streaming = StreamingHttpResponse(
+            iter_export(survey, responses, export_format), content_type=content_type
+        )
+        streaming['Content-Disposition'] = (
+            f'attachment; filename="survey-{survey.id}-responses.{export_format}"'
+        )
+        return streaming
+
+
+class SurveyExportJobView(LoginRequiredMixin, View):
+    """Queue an export of the survey's responses and return the job to poll."""
+
+    def post(self, request, survey_id):
+        survey = get_object_or_404(Survey, id=survey_id, created_by=request.user)
+        export_format = request.POST.get('format', 'csv').lower()
+        if export_format not in EXPORT_FORMATS:
+            return JsonResponse({'error': 'Unsupported export format.'}, status=400)
+        job = enqueue(
+            'export_responses', request.user,
+            survey_id=survey.id,
+            format=export_format,
+            search=request.POST.get('search', '').strip(),
+            date_from=request.POST.get('date_from', '').strip(),
+            date_to=request.POST.get('date_to', '').strip(),
+        )
+        return JsonResponse(job_payload(job), status=202)
+
+
+class JobStatusView(LoginRequiredMixin, View):
+    """Progress and outcome of one of the user's background jobs."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(Job, id=job_id, created_by=request.user)
+        return JsonResponse(job_payload(job))
+
+
+class JobDownloadView(LoginRequiredMixin, View):
+    """The file written by a finished export job."""
+
+    def get(self, request, job_id):
+        job = get_object_or_404(Job, id=job_id, created_by=request.user, kind='export_responses', status='done')
+        try:
+            handle = open(job_output_path(job), 'rb')
+        except FileNotFoundError:
+            raise Http404("The export file is no longer available.")
+        filename = f"survey-{job.params['survey_id']}-responses.{job.params.get('format', 'csv')}"
+        return FileResponse(handle, as_attachment=True, filename=filename)
+
+
+def job_payload(job):
+    payload = {
+        'id': job.id,
+        'kind': job.kind,
+        'status': job.status,
+        'progress': job.progress,
+        'total': job.total,
+        'percent': round(job.progress * 100 / job.total, 1) if job.total else None,
+        'result': job.result,
+        'error': job.error.strip().splitlines()[-1] if job.error else '',
+        'created_at': job.created_at.isoformat(),
+        'started_at': job.started_at.isoformat() if job.started_at else None,
+        'finished_at': job.finished_at.isoformat() if job.finished_at else None,
+        'status_url': reverse('job_status', args=[job.id]),
+    }
+    if job.kind == 'export_responses' and job.status == 'done':
+        payload['download_url'] = reverse('job_download', args=[job.id])
+    return payload
+
+
 class TeacherDashboardView(LoginRequiredMixin, TemplateView):
     """Teacher dashboard - create and manage surveys."""
     template_name = 'my_app/teacher_dashboard.html'
@@ -644,17 +841,39 @@ class TeacherDashboardView(LoginRequiredMixin, TemplateView):
             raise HttpResponseForbidden("Access denied. Only teachers can access this page.")
         
         # Get all surveys created by this teacher
-        surveys = (
+        # Served from the versioned cache until one of this teacher's surveys
+        # or responses changes (see caching.py)
+        context.update(cached_fragment(
+            f'teacher:{self.request.user.id}',
+            [('teacher', self.request.user.id)],
+            self._build_dashboard,
+        ))
+        
+        return context
+
+    def _build_dashboard(self):
+        # Response totals come from the SurveyStats counters instead of COUNT(*)
+        surveys = list(
             Survey.objects.filter(created_by=self.request.user)
+            .annotate(response_total=Coalesce('stats__response_count', 0))
             .prefetch_related('assigned_sections')
             .order_by('-created_at')
         )
-        
-        context['surveys'] = surveys
-        context['total_surveys'] = surveys.count()
-        context['total_responses'] = Response.objects.filter(survey__created_by=self.request.user).count()
-        
-        return context
+        return {
+            'surveys': surveys,
+            'total_surveys': len(surveys),
+            'total_responses': sum(survey.response_total for survey in surveys),
+        }
+
+
+class CompletionMatrixView(LoginRequiredMixin, View):
+    """Sections x surveys completion report for the teacher's surveys, as JSON."""
+
+    def get(self, request):
+        profile = getattr(request.user, 'profile', None)
+        if not profile or profile.role != 'teacher':
+            return HttpResponseForbidden()
+        return JsonResponse(completion_matrix(request.user.id))
 
 
 class StudentDashboardView(LoginRequiredMixin, TemplateView):
@@ -674,35 +893,17 @@ class StudentDashboardView(LoginRequiredMixin, TemplateView):
         allowed_tabs = {'overview', 'pending', 'completed'}
         active_tab = requested_tab if requested_tab in allowed_tabs else 'overview'
         
-        # Get surveys assigned to this student's section
-        # Surveys with no assigned_sections are available to all students
-        # Surveys with assigned_sections are only available to students in those sections
-        all_active_surveys = Survey.objects.filter(is_active=True).prefetch_related('assigned_sections')
-        
-        assigned_surveys = []
-        for survey in all_active_surveys:
-            # If survey has no assigned sections, it's available to all
-            if survey.assigned_sections.count() == 0:
-                assigned_surveys.append(survey)
-            elif profile.section and profile.section in survey.assigned_sections.all():
-                # If student's section is in the assigned sections
-                assigned_surveys.append(survey)
-        
-        # Convert to queryset for consistency
-        survey_ids = [s.id for s in assigned_surveys]
-        assigned_surveys = Survey.objects.filter(id__in=survey_ids).prefetch_related('assigned_sections').order_by('-created_at')
-        
-        # Get student's responses
-        submitted_surveys = Response.objects.filter(student=self.request.user).values_list('survey_id', flat=True)
-        
-        # Separate pending and completed surveys
-        pending_surveys = assigned_surveys.exclude(id__in=submitted_surveys)
-        completed_surveys = assigned_surveys.filter(id__in=submitted_surveys)
-        
-        context['pending_surveys'] = pending_surveys
-        context['completed_surveys'] = completed_surveys
-        context['total_assigned'] = assigned_surveys.count()
-        context['total_completed'] = completed_surveys.count()
+        # Served from the versioned cache until the student submits or a
+        # survey visible to their section changes (see caching.py)
+        context.update(cached_fragment(
+            f'student:{self.request.user.id}:{profile.section_id}',
+            [
+                ('student', self.request.user.id),
+                ('section', profile.section_id or 'none'),
+                ('section', ALL_SECTIONS),
+            ],
+            lambda: self._build_dashboard(profile),
+        ))
         context['section'] = profile.section
         context['active_tab'] = active_tab
         context['show_pending'] = active_tab in ('overview', 'pending')
@@ -710,6 +911,29 @@ class StudentDashboardView(LoginRequiredMixin, TemplateView):
         
         return context
 
+    def _build_dashboard(self, profile):
+        # Surveys with no assigned_sections are available to all students;
+        # the others only to students in one of their sections
+        assigned_surveys = list(
+            Survey.objects.visible_to_section(profile.section_id)
+            .active()
+            .annotate(
+                question_count=Count('questions'),
+                is_completed=Exists(
+                    Response.objects.filter(student=self.request.user, survey=OuterRef('pk'))
+                ),
+            )
+            .order_by('-created_at')
+        )
+        pending_surveys = [survey for survey in assigned_surveys if not survey.is_completed]
+        completed_surveys = [survey for survey in assigned_surveys if survey.is_completed]
+        return {
+            'pending_surveys': pending_surveys,
+            'completed_surveys': completed_surveys,
+            'total_assigned': len(assigned_surveys),
+            'total_completed': len(completed_surveys),
+        }
+
 
 class SurveyDetailView(LoginRequiredMixin, TemplateView):
     """View survey details with all questions for students to fill."""
@@ -720,7 +944,9 @@ class SurveyDetailView(LoginRequiredMixin, TemplateView):
         profile = getattr(self.request.user, 'profile', None)
         
         # Get survey
-        survey = get_object_or_404(Survey, id=survey_id)
+        survey = get_object_or_404(Survey.objects.select_related('created_by'), id=survey_id)
+        # Questions and choices come from the cached structure (see structure.py)
+        questions = get_survey_structure(survey.id)['questions']
         
         # Check if student has already submitted
         existing_response = Response.objects.filter(
@@ -730,19 +956,41 @@ class SurveyDetailView(LoginRequiredMixin, TemplateView):
         if existing_response:
             context['already_submitted'] = True
             context['submitted_at'] = existing_response.submitted_at
-            # Get student's answers
-            answers = existing_response.answers.all()
-            context['answers'] = answers
-        
-        # Get all questions with their choices
-        questions = survey.questions.all().prefetch_related('choices')
+            # Get student's answers, labelled from the structure
+            context['answers'] = self._answer_rows(existing_response, questions)
+        else:
+            # Sent back with the form, so a double-clicked submit is stored once
+            context['idempotency_key'] = uuid.uuid4().hex
         
         context['survey'] = survey
         context['questions'] = questions
+        context['section_names'] = list(survey.assigned_sections.values_list('name', flat=True))
         context['profile'] = profile
         context['section'] = profile.section if profile else None
         
         return context
+
+    def _answer_rows(self, response, questions):
+        answers = {
+            question_id: (choice_id, text_answer, is_correct)
+            for question_id, choice_id, text_answer, is_correct in response.answers.values_list(
+                'question_id', 'selected_choice_id', 'text_answer', 'is_correct'
+            )
+        }
+        rows = []
+        for question in questions:
+            if question['id'] not in answers:
+                continue
+            choice_id, text_answer, is_correct = answers[question['id']]
+            choice_text = next((c['text'] for c in question['choices'] if c['id'] == choice_id), None)
+            rows.append({
+                'question': question,
+                'choice_text': choice_text,
+                'text_answer': text_answer,
+                'is_correct': is_correct,
+                'correct_answer': question['correct_text'],
+            })
+        return rows
     
     def post(self, request, survey_id):
         """Handle survey submission."""
@@ -753,37 +1001,14 @@ class SurveyDetailView(LoginRequiredMixin, TemplateView):
             return redirect('login')
         
         survey = get_object_or_404(Survey, id=survey_id)
+        key = submission_key(request)
+        if key is not None and len(key) > IDEMPOTENCY_KEY_MAX_LENGTH:
+            key = None
         
-        # Check if already submitted
-        if Response.objects.filter(survey=survey, student=request.user).exists():
-            return redirect('survey_detail', survey_id=survey_id)
-        
-        # Create response and answers
-        response = Response.objects.create(survey=survey, student=request.user)
-        
-        for question in survey.questions.all():
-            answer_key = f'question_{question.id}'
-            
-            if question.question_type in ['mcq', 'likert']:
-                choice_id = request.POST.get(answer_key)
-                if choice_id:
-                    try:
-                        choice = Choice.objects.get(id=choice_id, question=question)
-                        Answer.objects.create(
-                            response=response,
-                            question=question,
-                            selected_choice=choice
-                        )
-                    except Choice.DoesNotExist:
-                        pass
-            else:  # text answer
-                text_value = request.POST.get(answer_key, '').strip()
-                if text_value:
-                    Answer.objects.create(
-                        response=response,
-                        question=question,
-                        text_answer=text_value
-                    )
-        
+        try:
+            submit_survey(survey, request.user, request.POST, idempotency_key=key)
+        except AlreadySubmitted:
+            pass
+
         # Redirect back with success message
         return redirect('survey_detail', survey_id=survey_id)
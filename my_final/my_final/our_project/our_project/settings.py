@@ -10,6 +10,7 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
+import os
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -49,9 +50,20 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
-    # no custom middleware configured
 ]
 
+# Opt-in query instrumentation: set QUERY_BUDGET_ENABLED=1 in the environment
+# to log views that exceed QUERY_BUDGET (and, with DEBUG, add an
+# X-Query-Budget response header).
+QUERY_BUDGET_ENABLED = os.environ.get('QUERY_BUDGET_ENABLED') == '1'
+QUERY_BUDGET = {
+    'MAX_QUERIES': 30,     # total queries per request
+    'MAX_DUPLICATES': 3,   # executions of the same query shape (N+1 smell)
+    'MAX_DB_MS': 200,      # time spent waiting on the database
+}
+if QUERY_BUDGET_ENABLED:
+    MIDDLEWARE.append('my_app.middleware.QueryBudgetMiddleware')
+
 ROOT_URLCONF = 'our_project.urls'
 
 TEMPLATES = [
@@ -82,6 +94,57 @@ DATABASES = {
     }
 }
 
+# Production SQLite profile: set SQLITE_PRODUCTION=1 in the environment when
+# many students submit at once. Every connection switches to WAL journaling
+# (readers no longer block the writer), waits up to SQLITE_BUSY_TIMEOUT
+# seconds for the write lock instead of failing with "database is locked",
+# and takes that lock when a transaction starts (IMMEDIATE), so two writers
+# can never deadlock upgrading from a read lock. Connections are reused
+# across requests.
+SQLITE_PRODUCTION = os.environ.get('SQLITE_PRODUCTION') == '1'
+SQLITE_BUSY_TIMEOUT = int(os.environ.get('SQLITE_BUSY_TIMEOUT', '20'))
+SQLITE_PRODUCTION_OPTIONS = {
+    'timeout': SQLITE_BUSY_TIMEOUT,
+    'transaction_mode': 'IMMEDIATE',
+    'init_command': (
+        'PRAGMA journal_mode=WAL;'
+        'PRAGMA synchronous=NORMAL;'
+        'PRAGMA temp_store=MEMORY;'
+        'PRAGMA cache_size=-20000;'
+        'PRAGMA mmap_size=134217728;'
+    ),
+}
+if SQLITE_PRODUCTION:
+    DATABASES['default'].update({
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': SQLITE_PRODUCTION_OPTIONS,
+    })
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# The dashboard and structure caches are invalidated by bumping version
+# numbers stored in the cache, and those bumps also come from other
+# processes (the run_jobs worker and the import, seed and rebuild
+# commands). The cache therefore has to be shared by every process on the
+# box: a per-process local-memory cache would keep serving stale pages.
+# With no broker to run memcached or redis next to, files are the shared
+# store; CACHE_DIR should be on local disk.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.environ.get('CACHE_DIR', BASE_DIR / 'cache'),
+        'OPTIONS': {'MAX_ENTRIES': 20000},
+    }
+}
+
+
+# Authentication
+# https://docs.djangoproject.com/en/5.2/topics/auth/customizing/
+
+AUTHENTICATION_BACKENDS = ['my_app.backends.ProfileModelBackend']
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -119,6 +182,9 @@ USE_TZ = True
 
 STATIC_URL = 'static/'
 
+# Files written by background jobs (see my_app/jobs.py), e.g. response exports
+JOB_OUTPUT_DIR = BASE_DIR / 'job_output'
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 